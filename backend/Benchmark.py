@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from GridRecords import createAdjacencyIndex, createNetwork, networkFromScenario
+from ModelFunctions import buildModel, exportEdgeJSON, exportNodesJSON, exportPlantsJSON, getPowerBase, solveModel
+from ModelStore import importModel
+from ScenarioLoader import DEMAND_FILE, LINES_FILE, PLANTS_FILE, loadScenario
+from SolverStats import STATUS_NAMES
+
+
+MODES = ["simple", "binary", "complex"]
+
+# bundled scenarios with system demand they were prepared for
+BUNDLED_SCENARIOS = [
+    {"name": "Scenario#1", "directory": "Scenario#1", "globalDemand": [1]},
+    {"name": "Scenario#2", "directory": "Scenario#2", "globalDemand": [1]},
+    {"name": "Scenario#3", "directory": "Scenario#3", "globalDemand": [16000]},
+]
+
+
+def generateGrid(nodeCount, lineCount = None, plantsPerNode = 1.0, periods = 1, meshing = 1.5, seed = 0):
+    """
+    Generates random but always feasible grid in the same format as loadScenario().
+    Nodes are first connected by random spanning tree, so the grid has no islands, remaining lines
+    connect random pairs of nodes. Demand follows daily profile, total Pmin of all blocks is lower and
+    total Pmax is higher than demand in every period.
+
+    ----ARGUMENTS----
+
+    nodeCount - number of nodes
+
+    lineCount - number of lines, by default nodeCount * meshing
+
+    plantsPerNode - average number of blocks per node, blocks are placed in random nodes
+
+    periods - number of demand periods
+
+    meshing - lines per node, used when lineCount is not given. 1 gives almost radial grid, higher values meshed grids
+
+    seed - seed of random generator, the same arguments and seed give the same grid
+
+    ----RETURNS----
+
+    scenario dictionary, demand is already in MW ( use global demand 1)
+    """
+    generator = np.random.default_rng(seed)
+    if lineCount is None:
+        lineCount = int(round(nodeCount * meshing))
+    lineCount = max(lineCount, nodeCount - 1)
+    nodeNames = ["N%d" % index for index in range(nodeCount)]
+
+    # random spanning tree - every node is connected to one of the nodes before it
+    order = generator.permutation(nodeCount)
+    parents = [order[generator.integers(0, position)] for position in range(1, nodeCount)]
+    nodeA = list(order[1:])
+    nodeB = parents
+    pairs = set((min(a, b), max(a, b)) for a, b in zip(nodeA, nodeB))
+    maximumLines = nodeCount * (nodeCount - 1) // 2
+    while len(pairs) < min(lineCount, maximumLines):
+        a, b = generator.integers(0, nodeCount, 2)
+        if a != b and (min(a, b), max(a, b)) not in pairs:
+            pairs.add((min(a, b), max(a, b)))
+            nodeA.append(a)
+            nodeB.append(b)
+    lines = len(nodeA)
+
+    plantCount = max(1, int(round(nodeCount * plantsPerNode)))
+    Pmax = generator.uniform(50, 400, plantCount)
+    plants = {
+        "node": np.sort(generator.integers(0, nodeCount, plantCount)).astype(np.int32),
+        "plantName": ["P%d" % index for index in range(plantCount)],
+        "blockName": ["B%d" % index for index in range(plantCount)],
+        "Pmin": np.round(Pmax * generator.uniform(0.0, 0.1, plantCount), 1),
+        "Pmax": np.round(Pmax, 1),
+        "cost": np.round(generator.uniform(1, 10, plantCount), 2),
+        "ramp": np.round(Pmax * generator.uniform(0.3, 1.0, plantCount), 1),
+    }
+
+    # daily profile between 50% and 100% of peak, peak demand is 60% of installed capacity
+    hours = np.arange(periods)
+    profile = 0.75 - 0.25 * np.cos(2 * np.pi * (hours - 3) / 24)
+    shares = generator.uniform(0, 1, nodeCount)
+    shares /= shares.sum()
+    peak = 0.6 * plants["Pmax"].sum()
+    demand = np.round(profile[:, None] * shares[None, :] * peak, 3)
+
+    nodeA = np.array(nodeA, dtype=np.int32)
+    nodeB = np.array(nodeB, dtype=np.int32)
+    return {
+        "nodeNames": nodeNames,
+        "nodeIndex": {name: index for index, name in enumerate(nodeNames)},
+        "demand": demand,
+        "lines": {
+            "nodeA": nodeA,
+            "nodeB": nodeB,
+            "capacity": np.full(lines, np.round(peak, 0)),
+            "admitance": np.round(generator.uniform(0.01, 0.05, lines), 4),
+            "voltageA": np.full(lines, 220.0),
+            "voltageB": np.full(lines, 220.0),
+        },
+        "plants": plants,
+        "adjacency": createAdjacencyIndex(nodeCount, nodeA, nodeB),
+    }
+
+
+def writeScenario(directory, scenario):
+    """
+    Writes scenario ( ie. generated by generateGrid()) as Demand.txt, Lines.txt and PowerPlants.txt files
+    """
+    os.makedirs(directory, exist_ok=True)
+    names = scenario["nodeNames"]
+    with open(os.path.join(directory, DEMAND_FILE), 'w') as file:
+        for index, name in enumerate(names):
+            file.write("%s,%s\n" % (name, " ".join(repr(value) for value in scenario["demand"][:, index].tolist())))
+    lines = scenario["lines"]
+    with open(os.path.join(directory, LINES_FILE), 'w') as file:
+        for a, b, capacity, admitance, voltageA, voltageB in zip(*[lines[key].tolist() for key in ["nodeA", "nodeB", "capacity", "admitance", "voltageA", "voltageB"]]):
+            file.write("%s,%s,%r,%r,%r,%r\n" % (names[a], names[b], capacity, admitance, voltageA, voltageB))
+    plants = scenario["plants"]
+    with open(os.path.join(directory, PLANTS_FILE), 'w') as file:
+        for position, node in enumerate(plants["node"].tolist()):
+            file.write("%s,%s,%s,%r,%r,%r,%r\n" % (
+                names[node], plants["plantName"][position], plants["blockName"][position], plants["Pmin"][position].item(),
+                plants["Pmax"][position].item(), plants["cost"][position].item(), plants["ramp"][position].item()))
+
+
+def runCase(name, loadFunction, mode, periods, globalDemand, timeLimit = None, strict = True, options = None):
+    """
+    Runs one benchmark case and measures each phase separately
+
+    ----ARGUMENTS----
+
+    name - name of the case used in results
+
+    loadFunction - function returning scenario dictionary, timed as load phase
+
+    mode - simple, binary or complex
+
+    periods - number of periods to optimize, None for all periods of the scenario
+
+    globalDemand - system demand scaling
+
+    timeLimit - solver time limit in seconds
+
+    strict - enforceStrict of the model
+
+    options - additional toolConfig entries, ie. {"twoStage": True}
+
+    ----RETURNS----
+
+    dictionary with case description, model size, times of phases ( seconds), solver status and objective
+    """
+    started = time.perf_counter()
+    scenario = loadFunction()
+    if periods is None:
+        periods = scenario["demand"].shape[0]
+    network = networkFromScenario(scenario)
+    nodes = network.nodeDicts(scenario["demand"])
+    edges = network.edgeDicts()
+    loaded = time.perf_counter()
+
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    if timeLimit:
+        solver.SetTimeLimit(int(timeLimit * 1000))
+    toolConfig = {"mode": mode, "enforceStrict": strict, "timeMax": periods}
+    toolConfig.update(options or {})
+    model = buildModel(solver, nodes, edges, toolConfig, globalDemand, None, createNetwork(nodes, edges))
+    built = time.perf_counter()
+
+    status = solveModel(model)
+    solved = time.perf_counter()
+
+    feasible = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    if feasible:
+        for t in range(periods):
+            exportEdgeJSON(model["edgeSolutionPeriods"][t], getPowerBase(model))
+            exportNodesJSON(nodes, t, globalDemand, model["demandMatrix"])
+            exportPlantsJSON(model["periodOfTime"][t], nodes, mode, getPowerBase(model))
+    exported = time.perf_counter()
+
+    return {
+        "case": name,
+        "mode": mode,
+        "nodes": len(network.nodeNames),
+        "lines": len(network.lines),
+        "plants": len(network.plants),
+        "periods": periods,
+        "variables": solver.NumVariables(),
+        "constraints": solver.NumConstraints(),
+        "binaries": model["size"]["binaries"],
+        "loadTime": loaded - started,
+        "buildTime": built - loaded,
+        "solveTime": solved - built,
+        "exportTime": exported - solved,
+        "status": STATUS_NAMES.get(status, str(status)),
+        "objective": solver.Objective().Value() * getPowerBase(model) if feasible else None,
+        "iterations": solver.iterations(),
+        "branchNodes": solver.nodes(),
+        "options": options or {},
+    }
+
+
+def runModelFile(path, timeLimit = None):
+    """
+    Solves model read from file written by exportModel() or saveModel(), ie. model exported by /api/export-model
+    or stored in the model cache, without building it
+
+    ----ARGUMENTS----
+
+    path - model file, see importModel()
+
+    timeLimit - solver time limit in seconds
+
+    ----RETURNS----
+
+    dictionary with model size, load and solve time ( seconds), solver status and objective of the model file
+    ( in per unit if the model was built in per unit system)
+    """
+    started = time.perf_counter()
+    solver = importModel(path)
+    loaded = time.perf_counter()
+    if timeLimit:
+        solver.SetTimeLimit(int(timeLimit * 1000))
+    status = solver.Solve()
+    solved = time.perf_counter()
+    feasible = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    return {
+        "case": path,
+        "variables": solver.NumVariables(),
+        "constraints": solver.NumConstraints(),
+        "binaries": sum(1 for variable in solver.variables() if variable.integer()),
+        "loadTime": loaded - started,
+        "solveTime": solved - loaded,
+        "status": STATUS_NAMES.get(status, str(status)),
+        "objective": solver.Objective().Value() if feasible else None,
+        "iterations": solver.iterations(),
+        "branchNodes": solver.nodes(),
+    }
+
+
+def optimalityGap(objective, reference):
+    """
+    Returns relative difference of objective to objective of the full model, None if either is missing
+    """
+    if objective is None or reference is None:
+        return None
+    return (objective - reference) / max(abs(reference), 1e-9)
+
+
+def benchmarkCases(arguments):
+    """
+    Yields ( name, loadFunction, periods, globalDemand) for every case selected by command line arguments
+    """
+    if not arguments.no_bundled:
+        for scenario in BUNDLED_SCENARIOS:
+            directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), scenario["directory"])
+            yield scenario["name"], (lambda directory=directory: loadScenario(directory)), arguments.bundled_periods, scenario["globalDemand"]
+    for nodeCount in arguments.sizes:
+        for periods in arguments.periods:
+            name = "synthetic-n%d-p%d-m%g-s%d" % (nodeCount, periods, arguments.meshing, arguments.seed)
+            loadFunction = lambda nodeCount=nodeCount, periods=periods: generateGrid(
+                nodeCount, None, arguments.plants_per_node, periods, arguments.meshing, arguments.seed)
+            yield name, loadFunction, periods, [1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures load, build, solve and export time of the model")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--sizes", nargs="*", type=int, default=[10, 30, 100], help="node counts of synthetic grids")
+    parser.add_argument("--periods", nargs="+", type=int, default=[1, 4], help="periods of synthetic grids")
+    parser.add_argument("--meshing", type=float, default=1.5, help="lines per node of synthetic grids")
+    parser.add_argument("--plants-per-node", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bundled-periods", type=int, default=1, help="periods used for Scenario#1-3")
+    parser.add_argument("--no-bundled", action="store_true", help="skip Scenario#1-3")
+    parser.add_argument("--time-limit", type=float, default=60, help="solver time limit in seconds")
+    parser.add_argument("--builder", default="expressions", choices=["expressions", "coefficients"], help="model builder")
+    parser.add_argument("--per-unit", action="store_true", help="build the model in per unit system")
+    parser.add_argument("--two-stage", action="store_true",
+                        help="also solve binary and complex cases in two stages and report gap to the full model")
+    parser.add_argument("--model-files", nargs="+", default=[],
+                        help="solve model files ( .mps, .pb or saved .npz) instead of building cases")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file with all results")
+    arguments = parser.parse_args()
+
+    options = {"builder": arguments.builder}
+    if arguments.per_unit:
+        options["perUnit"] = True
+    results = []
+    for path in arguments.model_files:
+        result = runModelFile(path, arguments.time_limit)
+        results.append(result)
+        print("%-32s vars %7d cons %7d  load %7.3fs solve %7.3fs  %s" % (
+            path, result["variables"], result["constraints"], result["loadTime"], result["solveTime"], result["status"]))
+        sys.stdout.flush()
+    cases = benchmarkCases(arguments) if not arguments.model_files else []
+    for name, loadFunction, periods, globalDemand in cases:
+        for mode in arguments.modes:
+            result = runCase(name, loadFunction, mode, periods, globalDemand, arguments.time_limit, True, options)
+            results.append(result)
+            print("%-32s %-8s vars %7d cons %7d  load %7.3fs build %7.3fs solve %7.3fs export %7.3fs  %s" % (
+                name, mode, result["variables"], result["constraints"], result["loadTime"], result["buildTime"],
+                result["solveTime"], result["exportTime"], result["status"]))
+            sys.stdout.flush()
+            if arguments.two_stage and mode != "simple":
+                twoStage = runCase(name, loadFunction, mode, periods, globalDemand, arguments.time_limit, True, dict(options, twoStage=True))
+                twoStage["gap"] = optimalityGap(twoStage["objective"], result["objective"])
+                results.append(twoStage)
+                print("%-32s %-8s two stage solve %7.3fs ( full %7.3fs)  gap %s  %s" % (
+                    name, mode, twoStage["solveTime"], result["solveTime"],
+                    "-" if twoStage["gap"] is None else "%.4f%%" % (twoStage["gap"] * 100), twoStage["status"]))
+                sys.stdout.flush()
+
+    with open(arguments.output, 'w') as file:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "arguments": vars(arguments),
+            "results": results,
+        }, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import hashlib
+import math
+import os
+import numpy as np
+
+from ScenarioPaths import CACHE_DIRECTORY
+
+
+COMMITMENT_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "commitments")
+COMMITMENT_CACHE_VERSION = 2
+# total demand is bucketed by DEMAND_BUCKET relative steps, shares of nodes in DEMAND_BUCKET steps
+DEMAND_BUCKET = 0.01
+# patterns of demand further than this ( relative L1 distance) are not used
+MAX_DISTANCE = 0.1
+MAX_PATTERNS = 256
+# relative gap the full solve started from pattern of similar demand ends at
+MAX_GAP = 0.01
+
+commitmentCacheStatistics = {
+    "hits": 0,
+    "misses": 0,
+    "warmStarts": 0,
+    "fallbacks": 0,
+}
+
+_patterns = {}
+
+
+def commitmentKey(network, mode, enforceStrict, periods):
+    """
+    Computes key identifying network and model type commitment patterns are valid for - parameters of blocks,
+    lines, mode, enforceStrict and number of cycles. Demand is not part of the key
+    """
+    digest = hashlib.sha256()
+    digest.update(("%d|%s|%s|%d" % (COMMITMENT_CACHE_VERSION, mode, enforceStrict, periods)).encode())
+    digest.update("|".join(network.nodeNames).encode())
+    plants, lines = network.plants, network.lines
+    for column in (network.plantStart, plants.Pmin, plants.Pmax, plants.ramp, plants.cost,
+                   lines.nodeA, lines.nodeB, lines.capacity, lines.admitance, lines.voltageA, lines.voltageB):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def demandSignature(demandMatrix):
+    """
+    Quantizes demand matrix - total demand of every cycle into relative buckets and share of every node
+    in the cycle into DEMAND_BUCKET steps. Demand matrices with the same signature get the same pattern
+    """
+    totals = demandMatrix.sum(axis=1)
+    logBuckets = [round(math.log(total) / math.log(1 + DEMAND_BUCKET)) if total > 0 else 0 for total in totals.tolist()]
+    shares = np.round(demandMatrix / np.where(totals > 0, totals, 1)[:, None] / DEMAND_BUCKET).astype(np.int64)
+    return hashlib.sha256(np.array(logBuckets, dtype=np.int64).tobytes() + shares.tobytes()).hexdigest()[:32]
+
+
+def _cachePath(key, cacheDirectory):
+    return os.path.join(cacheDirectory, "commitment-%s.npz" % key)
+
+
+def _entries(key, cacheDirectory):
+    """
+    Returns patterns stored for the key, read from disk on first use
+    """
+    if key not in _patterns:
+        entries = {"signatures": [], "demands": [], "patterns": [], "objectives": [], "bounds": []}
+        path = _cachePath(key, cacheDirectory)
+        if os.path.exists(path):
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    entries["signatures"] = [str(signature) for signature in data["signatures"]]
+                    entries["demands"] = list(np.array(data["demands"]))
+                    entries["patterns"] = list(np.array(data["patterns"]))
+                    entries["objectives"] = np.array(data["objectives"]).tolist()
+                    entries["bounds"] = np.array(data["bounds"]).tolist()
+            except (OSError, ValueError, KeyError):
+                pass
+        _patterns[key] = entries
+    return _patterns[key]
+
+
+def findPattern(key, demandMatrix, cacheDirectory = COMMITMENT_CACHE_DIRECTORY):
+    """
+    Finds commitment pattern stored for demand nearest to given demand matrix
+
+    ----ARGUMENTS----
+
+    key - key from commitmentKey()
+
+    demandMatrix - demand of the request, array of shape ( periods, nodes)
+
+    cacheDirectory - directory of cache files
+
+    ----RETURNS----
+
+    dictionary with pattern ( values of commitment binaries), relative L1 distance of its demand ( 0 for the same
+    signature), objective and best bound of the solve the pattern comes from. None if no stored demand is closer
+    than MAX_DISTANCE
+    """
+    entries = _entries(key, cacheDirectory)
+    if not entries["patterns"]:
+        return None
+    signature = demandSignature(demandMatrix)
+    if signature in entries["signatures"]:
+        nearest, distance = entries["signatures"].index(signature), 0.0
+    else:
+        demands = np.array(entries["demands"])
+        if demands.shape[1:] != demandMatrix.shape:
+            return None
+        distances = np.abs(demands - demandMatrix).sum(axis=(1, 2)) / max(np.abs(demandMatrix).sum(), 1e-9)
+        nearest = int(np.argmin(distances))
+        distance = float(distances[nearest])
+        if distance > MAX_DISTANCE:
+            return None
+    return {
+        "pattern": entries["patterns"][nearest],
+        "distance": distance,
+        "objective": entries["objectives"][nearest],
+        "bound": entries["bounds"][nearest],
+    }
+
+
+def storePattern(key, demandMatrix, pattern, objective, bound, cacheDirectory = COMMITMENT_CACHE_DIRECTORY):
+    """
+    Stores commitment pattern solved for demand matrix with objective and best bound of the solve,
+    replacing pattern with the same demand signature. Only MAX_PATTERNS newest patterns are kept for every key.
+    Cache file is written to temporary file first
+    """
+    entries = _entries(key, cacheDirectory)
+    signature = demandSignature(demandMatrix)
+    if signature in entries["signatures"]:
+        position = entries["signatures"].index(signature)
+        for column in entries.values():
+            del column[position]
+    entries["signatures"].append(signature)
+    entries["demands"].append(np.array(demandMatrix, dtype=np.float64))
+    entries["patterns"].append(np.asarray(pattern, dtype=np.int8))
+    entries["objectives"].append(float(objective))
+    entries["bounds"].append(float(bound))
+    for column in entries.values():
+        del column[:-MAX_PATTERNS]
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        path = _cachePath(key, cacheDirectory)
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, 'wb') as file:
+            np.savez(
+                file,
+                signatures=np.array(entries["signatures"], dtype=np.str_),
+                demands=np.array(entries["demands"]),
+                patterns=np.array(entries["patterns"]),
+                objectives=np.array(entries["objectives"], dtype=np.float64),
+                bounds=np.array(entries["bounds"], dtype=np.float64),
+            )
+        os.replace(temporaryPath, path)
+    except OSError:
+        pass
@@ -0,0 +1,256 @@
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from ModelFunctions import buildModel, getPowerBase, solveModel
+from PowerFlow import createSusceptanceMatrix
+from SolverStats import STATUS_NAMES
+
+
+# relative overload tolerance, flows up to capacity * ( 1 + OVERLOAD_TOLERANCE) are accepted
+OVERLOAD_TOLERANCE = 1e-6
+
+
+def createContingencyFactors(network):
+    """
+    Precomputes DC power flow sensitivities of the network, used to evaluate all single line outages at once.
+    Flows and slack nodes are the same as in createSusceptanceMatrix()
+
+    ptdf[l, n] - change of flow on line l when 1 MW is injected in node n and taken out in slack node of its island
+
+    lodf[l, k] - part of pre-outage flow of line k which moves to line l when line k is switched off
+
+    islanding[k] - True if switching off line k splits the island ( lodf column k is then zero)
+
+    ----ARGUMENTS----
+
+    network - Network from createNetwork()
+
+    ----RETURNS----
+
+    dictionary with susceptance, ptdf, lodf, islanding and slack ( slack node of every node)
+    """
+    matrices = createSusceptanceMatrix(network)
+    susceptance, nodal, free = matrices["susceptance"], matrices["nodal"], matrices["free"]
+    nodeA, nodeB = network.lines.nodeA, network.lines.nodeB
+    nodeCount = len(network.nodeNames)
+    lineCount = len(susceptance)
+
+    reactance = np.zeros((nodeCount, nodeCount))
+    if free.any():
+        reactance[np.ix_(free, free)] = np.linalg.inv(nodal[np.ix_(free, free)])
+    ptdf = susceptance[:, None] * (reactance[nodeA] - reactance[nodeB])
+
+    # effect on every line of transfer of 1 MW from nodeA to nodeB of line k
+    transfer = ptdf[:, nodeA] - ptdf[:, nodeB]
+    denominator = 1.0 - np.diag(transfer)
+    islanding = np.abs(denominator) < 1e-9
+    lodf = np.zeros((lineCount, lineCount))
+    connected = ~islanding
+    lodf[:, connected] = transfer[:, connected] / denominator[connected]
+    lodf[np.arange(lineCount), np.arange(lineCount)] = -1.0
+    lodf[:, islanding] = 0.0
+    return {
+        "susceptance": susceptance,
+        "ptdf": ptdf,
+        "lodf": lodf,
+        "islanding": islanding,
+        "slack": matrices["slack"],
+    }
+
+
+def postOutageFlows(factors, flows):
+    """
+    Computes flows of all lines after outage of each line in one vectorized pass
+
+    ----ARGUMENTS----
+
+    factors - result of createContingencyFactors()
+
+    flows - pre-outage flows of lines, array of shape ( lines)
+
+    ----RETURNS----
+
+    array of shape ( lines, lines), element [l, k] is flow of line l after outage of line k
+    """
+    return flows[:, None] + factors["lodf"] * flows[None, :]
+
+
+def screenContingencies(factors, flows, capacity):
+    """
+    Finds single line outages which overload any of the remaining lines
+
+    ----ARGUMENTS----
+
+    factors - result of createContingencyFactors()
+
+    flows - pre-outage flows of lines, array of shape ( lines)
+
+    capacity - capacities of lines, array of shape ( lines)
+
+    ----RETURNS----
+
+    list of ( outaged line, overloaded lines, their post-outage flows) for every overloading outage
+    """
+    post = postOutageFlows(factors, flows)
+    overloaded = np.abs(post) > capacity[:, None] * (1 + OVERLOAD_TOLERANCE) + OVERLOAD_TOLERANCE
+    np.fill_diagonal(overloaded, False)
+    result = []
+    for outage in np.flatnonzero(overloaded.any(axis=0)).tolist():
+        lines = np.flatnonzero(overloaded[:, outage])
+        result.append((outage, lines, post[lines, outage]))
+    return result
+
+
+def modelLineFlows(model, network, time):
+    """
+    Reads solved flows of all lines of the network in given cycle, in MW from nodeA to nodeB of each line
+    """
+    edgeFlowVariables = model["edgeSolutionPeriods"][time]
+    powerBase = getPowerBase(model)
+    return np.array([
+        edgeFlowVariables[a][b]["var"].solution_value() * powerBase
+        for a, b in zip(network.lines.nodeA.tolist(), network.lines.nodeB.tolist())
+    ])
+
+
+def reoptimizeWithoutLine(nodes, edges, toolConfig, _globalDemand, demandMatrix, nodeA, nodeB, solveRunner = None):
+    """
+    Builds and solves the model again without the line between nodeA and nodeB ( names of the nodes),
+    with solveRunner of the model if given ( see runSolve())
+
+    ----RETURNS----
+
+    dictionary with solver status and objective ( None if not feasible)
+    """
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    remaining = [edge for edge in edges if {edge["nodeA"], edge["nodeB"]} != {nodeA, nodeB}]
+    model = buildModel(solver, nodes, remaining, toolConfig, _globalDemand, demandMatrix)
+    if solveRunner is not None:
+        model["solveRunner"] = solveRunner
+    status = solveModel(model)
+    feasible = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    return {
+        "status": STATUS_NAMES.get(status, str(status)),
+        "objective": solver.Objective().Value() * getPowerBase(model) if feasible else None,
+    }
+
+
+def lineEnds(network):
+    """
+    Returns names of end nodes of every line of the network
+    """
+    return [(network.nodeNames[a], network.nodeNames[b]) for a, b in zip(network.lines.nodeA.tolist(), network.lines.nodeB.tolist())]
+
+
+def screenModel(model, network, factors = None):
+    """
+    Evaluates post-outage flows of every single line outage in every cycle of solved model with line outage
+    distribution factors. Solution of the model is read at once, outages can be optimized again later
+    with reoptimizeOutages()
+
+    ----ARGUMENTS----
+
+    model - solved model created by buildModel()
+
+    network - Network in MW the model was built from ( not scaled)
+
+    factors - result of createContingencyFactors(), computed if not given
+
+    ----RETURNS----
+
+    ( dictionary with number of screened outages, overloads in every cycle and empty list of re-optimized outages,
+    sorted positions of lines whose outage overloads some line)
+    """
+    if factors is None:
+        factors = createContingencyFactors(network)
+    names = [nameA + nameB for nameA, nameB in lineEnds(network)]
+    capacity = network.lines.capacity
+    periods = []
+    overloading = set()
+    for time in range(len(model["edgeSolutionPeriods"])):
+        contingencies = []
+        for outage, lines, flows in screenContingencies(factors, modelLineFlows(model, network, time), capacity):
+            overloading.add(outage)
+            contingencies.append({
+                "line": names[outage],
+                "overloads": [
+                    {
+                        "line": names[line],
+                        "flow": round(flow, 2),
+                        "capacity": capacity[line].item(),
+                        "percentage": round(abs(flow / capacity[line]) * 100, 2),
+                    }
+                    for line, flow in zip(lines.tolist(), flows.tolist())
+                ],
+            })
+        periods.append({"period": time, "contingencies": contingencies})
+    return {
+        "screened": len(names),
+        "islanding": [names[line] for line in np.flatnonzero(factors["islanding"]).tolist()],
+        "overloading": [names[line] for line in sorted(overloading)],
+        "periods": periods,
+        "reoptimized": [],
+    }, sorted(overloading)
+
+
+def reoptimizeOutages(outages, network, nodes, edges, toolConfig, _globalDemand, demandMatrix, baseObjective, solveRunner = None):
+    """
+    Optimizes the model again without each of outaged lines
+
+    ----ARGUMENTS----
+
+    outages - positions of outaged lines in the network, from screenModel()
+
+    network, nodes, edges - network and lists of nodes and edges the model was built from
+
+    toolConfig, _globalDemand, demandMatrix - configuration and demand of the model
+
+    baseObjective - objective of the model with all lines, in the units of results
+
+    solveRunner - solve runner of re-optimized models ( see runSolve()), ie. worker process of the server
+
+    ----RETURNS----
+
+    list of results of reoptimizeWithoutLine() with name of the line and cost increase
+    """
+    ends = lineEnds(network)
+    reoptimized = []
+    for outage in outages:
+        result = reoptimizeWithoutLine(nodes, edges, toolConfig, _globalDemand, demandMatrix, *ends[outage], solveRunner)
+        result["line"] = "".join(ends[outage])
+        result["costIncrease"] = result["objective"] - baseObjective if result["objective"] is not None else None
+        reoptimized.append(result)
+    return reoptimized
+
+
+def analyseContingencies(model, network, nodes, edges, _globalDemand, reoptimize = True, factors = None, solveRunner = None):
+    """
+    N-1 analysis of solved model. Post-outage flows of every single line outage are evaluated with line outage
+    distribution factors in every cycle, only outages which overload some line are optimized again without the line
+
+    ----ARGUMENTS----
+
+    model - solved model created by buildModel()
+
+    network - Network in MW the model was built from ( not scaled)
+
+    nodes, edges - lists of nodes and edges the model was built from, used for re-optimization
+
+    _globalDemand - system demand scaling
+
+    reoptimize - whether overloading outages are optimized again
+
+    factors - result of createContingencyFactors(), computed if not given
+
+    solveRunner - solve runner of re-optimized models ( see runSolve()), ie. worker process of the server
+
+    ----RETURNS----
+
+    dictionary with number of screened outages, overloads in every cycle and results of re-optimization
+    """
+    analysis, outages = screenModel(model, network, factors)
+    if reoptimize and outages:
+        baseObjective = model["solver"].Objective().Value() * getPowerBase(model)
+        analysis["reoptimized"] = reoptimizeOutages(outages, network, nodes, edges, model["config"], _globalDemand,
+                                                    model["demandMatrix"], baseObjective, solveRunner)
+    return analysis
@@ -0,0 +1,147 @@
+import os
+import sys
+import numpy as np
+
+from ModelFunctions import scaleDemandMatrix
+
+
+DEMAND_STORE_FILE = "Demand.npy"
+DEMAND_NODES_FILE = "DemandNodes.txt"
+
+
+def writeDemandStore(directory, nodeNames, demand):
+    """
+    Writes demand store next to scenario text files. Store consists of binary .npy file
+    with demand array of shape ( periods, nodes) - so that consecutive hours are stored next to each other -
+    and text file with node names, one per line, in the same order as columns of the array.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory
+
+    nodeNames - list of node names
+
+    demand - array of shape ( periods, nodes)
+
+    ----RETURNS----
+
+    path to written .npy file
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    if demand.ndim != 2 or demand.shape[1] != len(nodeNames):
+        raise ValueError("demand must have shape ( periods, %d), got %s" % (len(nodeNames), demand.shape))
+    path = os.path.join(directory, DEMAND_STORE_FILE)
+    store = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=demand.shape)
+    store[:] = demand
+    store.flush()
+    del store
+    with open(os.path.join(directory, DEMAND_NODES_FILE), 'w') as file:
+        file.write("\n".join(nodeNames))
+    return path
+
+
+def convertDemandFile(directory):
+    """
+    Parses Demand.txt in scenario directory once and writes its content to the demand store
+    """
+    from ScenarioLoader import DEMAND_FILE, loadDemandFile
+    nodeNames, nodeIndex, demand = loadDemandFile(os.path.join(directory, DEMAND_FILE))
+    return writeDemandStore(directory, nodeNames, demand)
+
+
+def hasDemandStore(directory):
+    """
+    Checks whether scenario directory contains demand store which is not older than Demand.txt
+    """
+    from ScenarioLoader import DEMAND_FILE
+    storePath = os.path.join(directory, DEMAND_STORE_FILE)
+    textPath = os.path.join(directory, DEMAND_FILE)
+    if not os.path.exists(storePath) or not os.path.exists(os.path.join(directory, DEMAND_NODES_FILE)):
+        return False
+    if os.path.exists(textPath) and os.path.getmtime(textPath) > os.path.getmtime(storePath):
+        return False
+    return True
+
+
+def openDemandStore(directory):
+    """
+    Opens demand store as read only memory map. Nothing besides the header is read from disk
+    until the array is sliced.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory
+
+    ----RETURNS----
+
+    list of node names and memory mapped array of shape ( periods, nodes)
+    """
+    with open(os.path.join(directory, DEMAND_NODES_FILE), 'r') as file:
+        nodeNames = file.read().splitlines()
+    demand = np.load(os.path.join(directory, DEMAND_STORE_FILE), mmap_mode='r')
+    if demand.ndim != 2 or demand.shape[1] != len(nodeNames):
+        raise ValueError("demand store in %s does not match its node list" % directory)
+    return nodeNames, demand
+
+
+def loadDemandWindow(directory, start, periods, nodeNames = None):
+    """
+    Reads only given window of periods from demand store.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory
+
+    start - first period to read ( ie. hour of the year)
+
+    periods - number of periods to read, None reads till the end of the store
+
+    nodeNames - order of node columns in returned array, by default the order of the store
+
+    ----RETURNS----
+
+    list of node names and in-memory array of shape ( periods, nodes)
+    """
+    storeNames, demand = openDemandStore(directory)
+    if periods is None:
+        periods = demand.shape[0] - start
+    if start < 0 or periods < 0 or start + periods > demand.shape[0]:
+        raise ValueError("periods %d-%d outside of demand store with %d periods" % (start, start + periods, demand.shape[0]))
+    window = demand[start:start + periods]
+    if nodeNames is None:
+        return storeNames, np.array(window)
+    storeIndex = {name: index for index, name in enumerate(storeNames)}
+    missing = [name for name in nodeNames if name not in storeIndex]
+    if missing:
+        raise ValueError("nodes missing from demand store: %s" % ", ".join(missing))
+    return list(nodeNames), np.array(window[:, [storeIndex[name] for name in nodeNames]])
+
+
+def createDemandMatrixFromStore(directory, nodes, _globalDemand, start, periods):
+    """
+    Equivalent of createDemandMatrix() that takes demand profiles from demand store instead of nodes
+
+    ----ARGUMENTS----
+
+    directory - scenario directory with demand store
+
+    nodes - list of all nodes
+
+    _globalDemand - system demand scaling, single value or one value per period of the window
+
+    start - first period of the window
+
+    periods - number of periods in the window
+
+    ----RETURNS----
+
+    demand matrix of shape ( periods, nodes) indexed by node["index"]
+    """
+    orderedNodes = sorted(nodes, key=lambda node: node["index"])
+    nodeNames, demand = loadDemandWindow(directory, start, periods, [node["nodeName"] for node in orderedNodes])
+    return scaleDemandMatrix(demand, _globalDemand)
+
+
+if __name__ == '__main__':
+    for scenarioDirectory in sys.argv[1:]:
+        print(convertDemandFile(scenarioDirectory))
@@ -0,0 +1,141 @@
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from ModelFunctions import buildModel, createDemandMatrix, getPowerBase, runSolve
+from SolverStats import STATUS_NAMES
+
+
+# generation closer than this ( relative to Pmax) to Pmin or Pmax is treated as being at the limit
+MARGINAL_TOLERANCE = 1e-6
+GLOP_PARAMETERS = "use_preprocessing:false use_dual_simplex:true"
+
+
+def sweepLevels(start, stop, points):
+    """
+    Returns evenly spaced system demand levels from start to stop ( both included)
+    """
+    if points < 1:
+        raise ValueError("sweep needs at least one point")
+    return np.linspace(float(start), float(stop), int(points)).tolist()
+
+
+def marginalUnits(model, nodes):
+    """
+    Returns names of blocks which are neither at Pmin nor at Pmax in every cycle of solved model -
+    blocks which serve the next MW of demand
+    """
+    powerBase = getPowerBase(model)
+    units = []
+    for plantsInNodes in model["periodOfTime"]:
+        names = []
+        for node in nodes:
+            for plant, variable in zip(node["plants"], plantsInNodes[node["index"]]["plants"]):
+                value = variable.solution_value() * powerBase
+                tolerance = MARGINAL_TOLERANCE * max(plant["Pmax"], 1)
+                if plant["Pmin"] + tolerance < value < plant["Pmax"] - tolerance:
+                    names.append(plant["blockName"])
+        units.append(sorted(names))
+    return units
+
+
+def setSystemDemand(model, profileMatrix, level):
+    """
+    Changes right hand sides of node balance constraints to demand profiles multiplied by system demand level,
+    the model itself is not rebuilt
+    """
+    powerBase = getPowerBase(model)
+    demandMatrix = profileMatrix * level
+    model["demandMatrix"] = demandMatrix
+    scaled = (demandMatrix / powerBase).tolist()
+    for time, plantsInNodes in enumerate(model["periodOfTime"]):
+        for index, solverNode in enumerate(plantsInNodes):
+            demand = scaled[time][index]
+            solverNode["demand"] = demand
+            solverNode["balance"].SetBounds(demand, demand)
+
+
+def solveLevels(model, profileMatrix, levels):
+    """
+    Solves the model for every system demand level in turn, returns generator of solver status of every level
+    """
+    for level in levels:
+        setSystemDemand(model, profileMatrix, level)
+        yield runSolve(model, solverType='GLOP')
+
+
+def demandSweep(nodes, edges, toolConfig, levels, network = None, seriesRunner = None):
+    """
+    Solves simple mode model for a series of system demand levels ( _globalDemand) on one GLOP instance.
+    Only right hand sides of balance constraints change between points, so every solve starts from the simplex
+    basis of the previous one. Cost curve is piecewise linear in demand, points where set of marginal blocks
+    changes are returned as breakpoints, with demand level where neighbouring linear pieces intersect
+
+    ----ARGUMENTS----
+
+    nodes, edges - network to sweep
+
+    toolConfig - model configuration, model is always built in simple mode
+
+    levels - system demand levels, solved in given order ( ascending order gives the best basis reuse)
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
+    seriesRunner - function( solver, constraints, rightHandSides, solverType, parameters) solving the model for
+    every right hand side of balance constraints elsewhere, ie. SolverProcess.solveSeries() of worker process of the
+    server. It returns status of every solve with solution loaded to the solver, points are then solved on one GLOP
+    instance in the worker with the same parameters
+
+    ----RETURNS----
+
+    dictionary with points of the cost curve ( level, status, objective, marginal cost of system demand,
+    marginal blocks in every cycle) and breakpoints
+    """
+    config = dict(toolConfig, mode="simple")
+    profileMatrix = createDemandMatrix(nodes, [1], config["timeMax"])
+    solver = pywraplp.Solver.CreateSolver('GLOP')
+    # basis stays dual feasible when only demand changes, dual simplex then needs a few iterations per point.
+    # Presolve would transform the model differently for every point and drop the basis
+    solver.SetSolverSpecificParametersAsString(GLOP_PARAMETERS)
+    model = buildModel(solver, nodes, edges, config, [1], profileMatrix.copy(), network)
+    powerBase = getPowerBase(model)
+    balances = [[solverNode["balance"] for solverNode in plantsInNodes] for plantsInNodes in model["periodOfTime"]]
+
+    if seriesRunner is None:
+        statuses = solveLevels(model, profileMatrix, levels)
+    else:
+        rightHandSides = [(profileMatrix * level / powerBase).ravel().tolist() for level in levels]
+        statuses = seriesRunner(solver, [balance for row in balances for balance in row], rightHandSides, 'GLOP', GLOP_PARAMETERS)
+    points = []
+    for level, status in zip(levels, statuses):
+        point = {"globalDemand": level, "status": STATUS_NAMES.get(status, str(status)), "objective": None}
+        if status == pywraplp.Solver.OPTIMAL:
+            duals = np.array([[balance.dual_value() for balance in row] for row in balances])
+            point["objective"] = solver.Objective().Value() * powerBase
+            # derivative of the cost by system demand level, prices are per MW of demand
+            point["marginalCost"] = float((duals * profileMatrix).sum())
+            point["marginalUnits"] = marginalUnits(model, nodes)
+        points.append(point)
+
+    breakpoints = []
+    solved = [point for point in points if point["objective"] is not None]
+    for previous, current in zip(solved, solved[1:]):
+        if previous["marginalUnits"] == current["marginalUnits"]:
+            continue
+        slopeChange = previous["marginalCost"] - current["marginalCost"]
+        at = None
+        if abs(slopeChange) > 1e-9:
+            at = (current["objective"] - previous["objective"] + previous["marginalCost"] * previous["globalDemand"]
+                  - current["marginalCost"] * current["globalDemand"]) / slopeChange
+        breakpoints.append({
+            "between": [previous["globalDemand"], current["globalDemand"]],
+            "globalDemand": at,
+            "marginalCostBefore": previous["marginalCost"],
+            "marginalCostAfter": current["marginalCost"],
+            "marginalUnitsBefore": previous["marginalUnits"],
+            "marginalUnitsAfter": current["marginalUnits"],
+        })
+    return {
+        "points": points,
+        "breakpoints": breakpoints,
+        "size": model["size"],
+    }
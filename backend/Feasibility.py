@@ -0,0 +1,154 @@
+import numpy as np
+
+from PowerFlow import findIslands
+
+
+# shortage of every node is limited to this many MW in relaxed models, see buildModel()
+MAX_SHORTAGE = 1000
+# only this many offending nodes, blocks or lines are listed in one problem
+MAX_LISTED = 20
+TOLERANCE = 1e-6
+
+
+def _problem(check, message, severity = "error", **details):
+    problem = {"check": check, "severity": severity, "message": message}
+    for name, values in details.items():
+        problem[name] = list(values)[:MAX_LISTED]
+    return problem
+
+
+def _names(names, positions):
+    return [names[position] for position in np.flatnonzero(positions).tolist()]
+
+
+def unusableBlocks(network):
+    """
+    Returns mask of blocks which cannot generate within their limits - Pmin above Pmax or negative Pmin or Pmax
+    """
+    plants = network.plants
+    return (plants.Pmin > plants.Pmax + TOLERANCE) | (plants.Pmax < 0) | (plants.Pmin < 0)
+
+
+def checkParameters(network, demandMatrix, simple = True):
+    """
+    Finds parameters the model cannot be solved with - blocks with Pmin above Pmax or negative limits,
+    negative line capacity and demand which is not a finite number. Blocks with bad limits are errors
+    in simple mode only, in other modes the block is just never started and they are reported as warnings
+    """
+    plants, lines = network.plants, network.lines
+    blockNames = plants.blockName
+    lineNames = [network.nodeNames[a] + network.nodeNames[b] for a, b in zip(lines.nodeA.tolist(), lines.nodeB.tolist())]
+    severity = "error" if simple else "warning"
+    problems = []
+    badLimits = plants.Pmin > plants.Pmax + TOLERANCE
+    if badLimits.any():
+        problems.append(_problem("parameters", "%d blocks have Pmin above Pmax" % badLimits.sum(), severity, blocks=_names(blockNames, badLimits)))
+    negative = (plants.Pmax < 0) | (plants.Pmin < 0)
+    if negative.any():
+        problems.append(_problem("parameters", "%d blocks have negative Pmin or Pmax" % negative.sum(), severity, blocks=_names(blockNames, negative)))
+    badCapacity = ~(lines.capacity >= 0)
+    if badCapacity.any():
+        problems.append(_problem("parameters", "%d lines have negative capacity" % badCapacity.sum(), lines=_names(lineNames, badCapacity)))
+    badDemand = ~np.isfinite(demandMatrix).all(axis=0)
+    if badDemand.any():
+        problems.append(_problem("parameters", "%d nodes have demand which is not a number" % badDemand.sum(), nodes=_names(network.nodeNames, badDemand)))
+    return problems
+
+
+def hasErrors(problems):
+    """
+    Returns True if any of problems from checkFeasibility() makes the model infeasible
+    """
+    return any(problem["severity"] == "error" for problem in problems)
+
+
+def checkFeasibility(network, demandMatrix, toolConfig):
+    """
+    Fast checks of posted network and demand, run before the model is built. Every reported error makes
+    the model infeasible, so the request can be refused without calling the solver.
+    All checks are vectorized over nodes and cycles:
+
+    parameters - see checkParameters(), only these checks can report warnings
+
+    islandCapacity - Pmax of all blocks of an island ( nodes connected by lines) and allowed shortage
+    are lower than demand of the island
+
+    islandMinimum - in simple mode blocks cannot be switched off, Pmin of blocks of an island is higher than its demand
+
+    nodeImport - demand of a node not covered by its blocks and shortage is higher than capacity of its lines
+    ( upper bound of flow into the node). Nodes without lines are reported as isolated
+
+    nodeExport - in simple mode Pmin of blocks of a node minus its demand is higher than capacity of its lines
+
+    ----ARGUMENTS----
+
+    network - Network from createNetwork()
+
+    demandMatrix - demand matrix from createDemandMatrix()
+
+    toolConfig - dictionary with mode and enforceStrict
+
+    ----RETURNS----
+
+    list of problems, each with check, severity ( error or warning), message and offending nodes, blocks, lines
+    or periods. Empty list if no problem was found
+    """
+    simple = toolConfig["mode"] == "simple"
+    problems = checkParameters(network, demandMatrix, simple)
+    if hasErrors(problems):
+        return problems
+    nodeCount = len(network.nodeNames)
+    shortage = 0 if toolConfig["enforceStrict"] else MAX_SHORTAGE
+    plants, lines = network.plants, network.lines
+
+    # blocks with bad limits are never started outside simple mode
+    Pmax = np.bincount(plants.node, np.where(unusableBlocks(network), 0, plants.Pmax), minlength=nodeCount)
+    Pmin = np.bincount(plants.node, plants.Pmin, minlength=nodeCount) if simple else np.zeros(nodeCount)
+    lineCapacity = np.bincount(lines.nodeA, lines.capacity, minlength=nodeCount) + np.bincount(lines.nodeB, lines.capacity, minlength=nodeCount)
+    lineCount = np.bincount(lines.nodeA, minlength=nodeCount) + np.bincount(lines.nodeB, minlength=nodeCount)
+
+    island = findIslands(network)
+    islandCount = island.max() + 1 if nodeCount else 0
+    islandNodes = np.bincount(island, minlength=islandCount)
+    islandDemand = np.zeros((len(demandMatrix), islandCount))
+    np.add.at(islandDemand, (slice(None), island), demandMatrix)
+    islandPmax = np.bincount(island, Pmax, minlength=islandCount) + shortage * islandNodes
+    islandPmin = np.bincount(island, Pmin, minlength=islandCount)
+
+    def islandProblems(check, failing, message):
+        for number in np.flatnonzero(failing.any(axis=0)).tolist():
+            members = np.flatnonzero(island == number)
+            if len(members) == 1 and check == "islandCapacity":
+                # single node is reported by nodeImport check
+                continue
+            periods = np.flatnonzero(failing[:, number])
+            problems.append(_problem(check, message % (
+                network.nodeNames[members[0]], len(members), len(periods), islandDemand[periods[0], number],
+                islandPmin[number] if check == "islandMinimum" else islandPmax[number]),
+                nodes=[network.nodeNames[member] for member in members.tolist()], periods=periods.tolist()))
+
+    islandProblems("islandCapacity", islandDemand > islandPmax + TOLERANCE,
+                   "island of %s ( %d nodes) has demand above capacity in %d cycles ( demand %.2f, capacity %.2f)")
+    if simple:
+        islandProblems("islandMinimum", islandDemand < islandPmin - TOLERANCE,
+                       "island of %s ( %d nodes) has Pmin of blocks above demand in %d cycles ( demand %.2f, Pmin %.2f)")
+
+    deficit = demandMatrix - Pmax - shortage
+    importing = deficit > lineCapacity + TOLERANCE
+    for node in np.flatnonzero(importing.any(axis=0)).tolist():
+        periods = np.flatnonzero(importing[:, node])
+        if lineCount[node] == 0:
+            message = "node %s has demand %.2f not covered by its blocks and no lines" % (network.nodeNames[node], demandMatrix[periods[0], node])
+            check = "isolatedNode"
+        else:
+            message = "node %s needs %.2f from its lines, which can carry %.2f" % (network.nodeNames[node], deficit[periods[0], node], lineCapacity[node])
+            check = "nodeImport"
+        problems.append(_problem(check, message, nodes=[network.nodeNames[node]], periods=periods.tolist()))
+    if simple:
+        surplus = Pmin - demandMatrix
+        exporting = surplus > lineCapacity + TOLERANCE
+        for node in np.flatnonzero(exporting.any(axis=0)).tolist():
+            periods = np.flatnonzero(exporting[:, node])
+            problems.append(_problem("nodeExport", "node %s must send %.2f of Pmin to its lines, which can carry %.2f" % (
+                network.nodeNames[node], surplus[periods[0], node], lineCapacity[node]), nodes=[network.nodeNames[node]], periods=periods.tolist()))
+    return problems
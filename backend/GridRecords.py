@@ -0,0 +1,313 @@
+import numpy as np
+from numpy import double
+
+
+def createAdjacencyIndex(nodeCount, nodeA, nodeB):
+    """
+    Creates adjacency index of the network in compressed sparse row layout. Neighbours of node n
+    are node[start[n]:start[n+1]] and lines connecting them are line[start[n]:start[n+1]].
+    Every line is present twice - once for each of its ends.
+
+    ----ARGUMENTS----
+
+    nodeCount - number of nodes
+
+    nodeA, nodeB - arrays of node indexes at both ends of each line
+
+    ----RETURNS----
+
+    dictionary with arrays start, node and line
+    """
+    lineIds = np.arange(len(nodeA), dtype=np.int32)
+    source = np.concatenate([nodeA, nodeB]).astype(np.int32)
+    target = np.concatenate([nodeB, nodeA]).astype(np.int32)
+    lineIds = np.concatenate([lineIds, lineIds])
+    order = np.argsort(source, kind="stable")
+    start = np.zeros(nodeCount + 1, dtype=np.int32)
+    np.cumsum(np.bincount(source, minlength=nodeCount), out=start[1:])
+    return {
+        "start": start,
+        "node": target[order],
+        "line": lineIds[order],
+    }
+
+
+class PlantTable:
+    """
+    All generating blocks of the network stored as structure of arrays. Block i is described by
+    node[i], Pmin[i], Pmax[i], ramp[i], cost[i], plantName[i] and blockName[i]. Blocks are sorted by node,
+    blocks of node n are in range Network.plantStart[n] - Network.plantStart[n+1], in the same order as in node["plants"]
+    """
+    __slots__ = ("node", "Pmin", "Pmax", "ramp", "cost", "plantName", "blockName")
+
+    def __init__(self, node, Pmin, Pmax, ramp, cost, plantName, blockName):
+        self.node = np.asarray(node, dtype=np.int32)
+        self.Pmin = np.asarray(Pmin, dtype=np.float64)
+        self.Pmax = np.asarray(Pmax, dtype=np.float64)
+        self.ramp = np.asarray(ramp, dtype=np.float64)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.plantName = list(plantName)
+        self.blockName = list(blockName)
+
+    def __len__(self):
+        return len(self.node)
+
+    def record(self, index):
+        """
+        Returns block in the same dictionary format as created by createPlants()
+        """
+        return {
+            "plantName" : self.plantName[index],
+            "blockName" : self.blockName[index],
+            "Pmin" : double(self.Pmin[index]),
+            "Pmax" : double(self.Pmax[index]),
+            "ramp" : self.ramp[index].item(),
+            "cost" : self.cost[index].item(),
+        }
+
+
+class LineTable:
+    """
+    All power lines of the network stored as structure of arrays. Line i connects nodes nodeA[i] and nodeB[i]
+    ( node indexes) and has capacity[i], admitance[i], voltageA[i] and voltageB[i]
+    """
+    __slots__ = ("nodeA", "nodeB", "capacity", "admitance", "voltageA", "voltageB")
+
+    def __init__(self, nodeA, nodeB, capacity, admitance, voltageA, voltageB):
+        self.nodeA = np.asarray(nodeA, dtype=np.int32)
+        self.nodeB = np.asarray(nodeB, dtype=np.int32)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.admitance = np.asarray(admitance, dtype=np.float64)
+        self.voltageA = np.asarray(voltageA, dtype=np.float64)
+        self.voltageB = np.asarray(voltageB, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.nodeA)
+
+
+class Network:
+    """
+    Compact representation of the power grid used when building the model. Nodes are identified by index,
+    plants and lines are kept in PlantTable and LineTable. Dictionaries used by JSON endpoints
+    can be recreated with nodeDicts() and edgeDicts()
+    """
+    __slots__ = ("nodeNames", "nodeIndex", "plants", "plantStart", "lines", "adjacency", "_lists")
+
+    def __init__(self, nodeNames, plants, lines):
+        self.nodeNames = list(nodeNames)
+        self.nodeIndex = {name: index for index, name in enumerate(self.nodeNames)}
+        order = np.argsort(plants.node, kind="stable")
+        if np.any(order != np.arange(len(order))):
+            plants = PlantTable(
+                plants.node[order], plants.Pmin[order], plants.Pmax[order], plants.ramp[order], plants.cost[order],
+                [plants.plantName[i] for i in order], [plants.blockName[i] for i in order]
+            )
+        self.plants = plants
+        self.plantStart = np.zeros(len(self.nodeNames) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(plants.node, minlength=len(self.nodeNames)), out=self.plantStart[1:])
+        self.lines = lines
+        self.adjacency = createAdjacencyIndex(len(self.nodeNames), lines.nodeA, lines.nodeB)
+        self._lists = None
+
+    def lists(self):
+        """
+        Returns columns of the network converted to python lists, which are much faster than numpy arrays
+        when accessed element by element in model building loops. Lists are created once per network
+        """
+        if self._lists is None:
+            start = self.adjacency["start"].tolist()
+            neighbourNodes = self.adjacency["node"].tolist()
+            neighbourLines = self.adjacency["line"].tolist()
+            self._lists = {
+                "plantStart": self.plantStart.tolist(),
+                "Pmin": self.plants.Pmin.tolist(),
+                "Pmax": self.plants.Pmax.tolist(),
+                "ramp": self.plants.ramp.tolist(),
+                "cost": self.plants.cost.tolist(),
+                "nodeA": self.lines.nodeA.tolist(),
+                "nodeB": self.lines.nodeB.tolist(),
+                "capacity": self.lines.capacity.tolist(),
+                "admitance": self.lines.admitance.tolist(),
+                "voltageA": self.lines.voltageA.tolist(),
+                "voltageB": self.lines.voltageB.tolist(),
+                "neighbours": [
+                    list(zip(neighbourNodes[start[node]:start[node + 1]], neighbourLines[start[node]:start[node + 1]]))
+                    for node in range(len(self.nodeNames))
+                ],
+            }
+        return self._lists
+
+    def nodeDicts(self, demand = None):
+        """
+        Compatibility view - list of nodes with plants in the format of createNode() and createPlants()
+
+        ----ARGUMENTS----
+
+        demand - optional array of shape ( periods, nodes) used as demand of the nodes
+        """
+        profiles = demand.T.tolist() if demand is not None else [[0]] * len(self.nodeNames)
+        nodes = []
+        start = self.plantStart.tolist()
+        for index, name in enumerate(self.nodeNames):
+            nodes.append({
+                "nodeName" : name,
+                "demand" : profiles[index],
+                "index" : index,
+                "plants" : [self.plants.record(plant) for plant in range(start[index], start[index + 1])],
+            })
+        return nodes
+
+    def edgeDicts(self):
+        """
+        Compatibility view - list of edges in the format of createEdge()
+        """
+        lists = self.lists()
+        edges = []
+        for line in range(len(self.lines)):
+            nodeA = self.nodeNames[lists["nodeA"][line]]
+            nodeB = self.nodeNames[lists["nodeB"][line]]
+            edges.append({
+                "name" : nodeA + nodeB,
+                "capacity": double(lists["capacity"][line]),
+                "admitance" : double(lists["admitance"][line]),
+                "voltageA" : double(lists["voltageA"][line]),
+                "voltageB" : double(lists["voltageB"][line]),
+                "nodeA" : nodeA,
+                "nodeB" : nodeB,
+            })
+        return edges
+
+
+def _uniqueLines(nodeA, nodeB):
+    """
+    Returns positions of lines which are kept in the network - the first line between each pair of nodes,
+    self loops are skipped. Matches isNeighbour() which always returns the first matching edge
+    """
+    seen = set()
+    keep = []
+    for position, (a, b) in enumerate(zip(nodeA, nodeB)):
+        if a == b:
+            continue
+        pair = (a, b) if a < b else (b, a)
+        if pair not in seen:
+            seen.add(pair)
+            keep.append(position)
+    return keep
+
+
+def createNetwork(nodes, edges):
+    """
+    Creates Network from list of nodes ( with plants) and list of edges in dictionary format,
+    as posted to JSON endpoints or created by loadNode(), loadPlants() and loadEdges().
+    Edges to unknown nodes are ignored, as they were never matched by isNeighbour()
+
+    ----ARGUMENTS----
+
+    nodes - list of all nodes, node["index"] is used as node index in the network
+
+    edges - list of all edges
+
+    ----RETURNS----
+    Network
+    """
+    nodeNames = [None] * len(nodes)
+    plantColumns = ([], [], [], [], [], [], [])
+    for node in sorted(nodes, key=lambda node: node["index"]):
+        nodeNames[node["index"]] = node["nodeName"]
+        for plant in node["plants"]:
+            for column, value in zip(plantColumns, (
+                    node["index"], plant["Pmin"], plant["Pmax"], plant.get("ramp", 20), plant.get("cost", 1),
+                    plant["plantName"], plant["blockName"])):
+                column.append(value)
+    nodeIndex = {name: index for index, name in enumerate(nodeNames)}
+    known = [edge for edge in edges if edge["nodeA"] in nodeIndex and edge["nodeB"] in nodeIndex]
+    nodeA = [nodeIndex[edge["nodeA"]] for edge in known]
+    nodeB = [nodeIndex[edge["nodeB"]] for edge in known]
+    known = [known[position] for position in _uniqueLines(nodeA, nodeB)]
+    lines = LineTable(
+        [nodeIndex[edge["nodeA"]] for edge in known], [nodeIndex[edge["nodeB"]] for edge in known],
+        [double(edge["capacity"]) for edge in known], [double(edge["admitance"]) for edge in known],
+        [double(edge["voltageA"]) for edge in known], [double(edge["voltageB"]) for edge in known],
+    )
+    plants = PlantTable(
+        plantColumns[0], [double(value) for value in plantColumns[1]], [double(value) for value in plantColumns[2]],
+        [double(value) for value in plantColumns[3]], [double(value) for value in plantColumns[4]],
+        plantColumns[5], plantColumns[6],
+    )
+    return Network(nodeNames, plants, lines)
+
+
+def networkFromScenario(scenario):
+    """
+    Creates Network directly from scenario loaded by loadScenario() or loadScenarioCached(),
+    without creating node and plant dictionaries
+    """
+    plants = scenario["plants"]
+    lines = scenario["lines"]
+    keep = _uniqueLines(lines["nodeA"].tolist(), lines["nodeB"].tolist())
+    return Network(
+        scenario["nodeNames"],
+        PlantTable(plants["node"], plants["Pmin"], plants["Pmax"], plants["ramp"], plants["cost"], plants["plantName"], plants["blockName"]),
+        LineTable(*[lines[key][keep] for key in ["nodeA", "nodeB", "capacity", "admitance", "voltageA", "voltageB"]]),
+    )
+
+
+def scaleNetwork(network, powerBase, voltageBase):
+    """
+    Creates copy of the network in per unit system. Power values ( Pmin, Pmax, ramp, line capacity) are divided by
+    powerBase, voltages by voltageBase and admitances multiplied by voltageBase^2 / powerBase, so that
+    voltageA * voltageB * admitance gives power in per unit. Costs are kept per MW
+
+    ----ARGUMENTS----
+
+    network - Network in MW, kV and S
+
+    powerBase - base power in MW
+
+    voltageBase - base voltage in kV
+
+    ----RETURNS----
+    Network in per unit
+    """
+    plants = network.plants
+    lines = network.lines
+    return Network(
+        network.nodeNames,
+        PlantTable(plants.node, plants.Pmin / powerBase, plants.Pmax / powerBase, plants.ramp / powerBase, plants.cost,
+                   plants.plantName, plants.blockName),
+        LineTable(lines.nodeA, lines.nodeB, lines.capacity / powerBase, lines.admitance * voltageBase ** 2 / powerBase,
+                  lines.voltageA / voltageBase, lines.voltageB / voltageBase),
+    )
+
+
+def replacePlant(network, index, Pmin, Pmax, ramp, cost):
+    """
+    Creates copy of the network with changed parameters of block with given index ( position in network.plants).
+    Network given is not changed, it can be shared with other models
+
+    ----RETURNS----
+    Network with changed block
+    """
+    plants = network.plants
+    columns = [plants.Pmin.copy(), plants.Pmax.copy(), plants.ramp.copy(), plants.cost.copy()]
+    for column, value in zip(columns, (Pmin, Pmax, ramp, cost)):
+        column[index] = value
+    return Network(network.nodeNames, PlantTable(plants.node, *columns, plants.plantName, plants.blockName), network.lines)
+
+
+def replaceLine(network, nodeIndexA, nodeIndexB, capacity, admitance, voltageA, voltageB):
+    """
+    Creates copy of the network with changed parameters of the line connecting given nodes, voltageA is voltage
+    of the line end in node nodeIndexA. Network given is not changed, it can be shared with other models
+
+    ----RETURNS----
+    Network with changed line
+    """
+    lines = network.lines
+    line = next(line for node, line in network.lists()["neighbours"][nodeIndexA] if node == nodeIndexB)
+    if lines.nodeA[line] != nodeIndexA:
+        voltageA, voltageB = voltageB, voltageA
+    columns = [lines.capacity.copy(), lines.admitance.copy(), lines.voltageA.copy(), lines.voltageB.copy()]
+    for column, value in zip(columns, (capacity, admitance, voltageA, voltageB)):
+        column[line] = value
+    return Network(network.nodeNames, network.plants, LineTable(lines.nodeA, lines.nodeB, *columns))
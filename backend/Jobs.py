@@ -0,0 +1,224 @@
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from Metrics import cancelledRuns
+
+
+# finished jobs are dropped when there is more of them
+MAX_FINISHED_JOBS = 20
+# jobs whose status was not read for this many seconds are cancelled, see createJob()
+HEARTBEAT_TIMEOUT = 60
+# seconds between checks of heartbeats
+WATCH_INTERVAL = 1.0
+
+jobs = OrderedDict()
+_lock = threading.Lock()
+_watchdog = None
+
+
+def createJob(work, kind = "job", heartbeatTimeout = HEARTBEAT_TIMEOUT, run = None):
+    """
+    Creates job and runs work( job) in background thread. Work returns ( response, status code) like a route
+    and may publish incumbents with addIncumbent() while it runs
+
+    ----ARGUMENTS----
+
+    work - function of the job
+
+    kind - job ( started by /api/jobs) or request ( /api/get-results waiting for the job)
+
+    heartbeatTimeout - job is cancelled if jobStatus() is not called for this many seconds, None to never cancel
+
+    run - input of the work taken when the job was submitted, kept as run of the job
+
+    ----RETURNS----
+
+    job dictionary - id, state ( running, done, cancelled or failed), incumbents, response and code of finished work,
+    stopRequested set by requestStop() and cancelJob() and reason of cancellation set by cancelJob(). Work has
+    to check stopRequested while it runs, see SolverProcess.solve()
+    """
+    job = {
+        "id": uuid.uuid4().hex[:16],
+        "kind": kind,
+        "state": "running",
+        "created": time.time(),
+        "finished": None,
+        "lastSeen": time.time(),
+        "heartbeatTimeout": heartbeatTimeout,
+        "incumbents": [],
+        "response": None,
+        "code": None,
+        "stopRequested": False,
+        "cancelled": None,
+        "done": threading.Event(),
+        "run": run,
+    }
+    with _lock:
+        jobs[job["id"]] = job
+        _dropFinished()
+        _startWatchdog()
+
+    def run():
+        try:
+            response, code = work(job)
+            state = "done"
+        except Exception as error:
+            response, code, state = {"error": str(error)}, 500, "failed"
+        with _lock:
+            if job["cancelled"]:
+                response, code, state = {"error": "job %s was cancelled ( %s)" % (job["id"], job["cancelled"])}, 409, "cancelled"
+            job["response"], job["code"], job["state"] = response, code, state
+            job["finished"] = time.time()
+        job["done"].set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return job
+
+
+def _dropFinished():
+    finished = [id for id, job in jobs.items() if job["state"] != "running"]
+    for id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del jobs[id]
+
+
+def _startWatchdog():
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = threading.Thread(target=_watch, daemon=True)
+        _watchdog.start()
+
+
+def _watch():
+    """
+    Cancels running jobs without heartbeat
+    """
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        with _lock:
+            now = time.time()
+            for job in jobs.values():
+                if job["state"] != "running":
+                    continue
+                if job["cancelled"] is None and job["heartbeatTimeout"] is not None and now - job["lastSeen"] > job["heartbeatTimeout"]:
+                    _cancel(job, "heartbeat")
+
+
+def getJob(id):
+    with _lock:
+        return jobs.get(id)
+
+
+def runningJobs(kind = None):
+    """
+    Returns running jobs, only of given kind if it is not None
+    """
+    with _lock:
+        return [job for job in jobs.values() if job["state"] == "running" and kind in (None, job["kind"])]
+
+
+def addIncumbent(job, incumbent):
+    """
+    Publishes improving solution found while the job runs, numbered in order of arrival
+    """
+    with _lock:
+        incumbent["number"] = len(job["incumbents"])
+        job["incumbents"].append(incumbent)
+
+
+def _cancel(job, reason):
+    job["cancelled"] = reason
+    job["stopRequested"] = True
+    cancelledRuns.inc(reason)
+
+
+def requestStop(job):
+    """
+    Asks running job to stop, work ends with the best incumbent found so far
+    """
+    with _lock:
+        if job["state"] != "running":
+            return False
+        job["stopRequested"] = True
+    return True
+
+
+def cancelJob(job, reason = "cancel"):
+    """
+    Cancels running job - its solve is stopped, nothing is exported and the job finishes as cancelled
+
+    ----ARGUMENTS----
+
+    job - job from createJob()
+
+    reason - cancel ( by endpoint), disconnect ( client of the request disconnected) or heartbeat ( status of the job
+    was not read, or client of the request could not be watched, for its heartbeatTimeout)
+
+    ----RETURNS----
+
+    False if the job was not running or was already cancelled
+    """
+    with _lock:
+        if job["state"] != "running" or job["cancelled"] is not None:
+            return False
+        _cancel(job, reason)
+    return True
+
+
+def heartbeat(job):
+    """
+    Marks the job as watched, the same as reading its status with jobStatus()
+    """
+    with _lock:
+        job["lastSeen"] = time.time()
+
+
+def isCancelled(job):
+    return job is not None and job["cancelled"] is not None
+
+
+def waitJob(job, timeout = None):
+    """
+    Waits until the job finishes, returns False if it is still running after timeout seconds
+    """
+    return job["done"].wait(timeout)
+
+
+def clientDisconnected(connection):
+    """
+    Returns True if client closed the connection of the request. Connection with no data waiting is open,
+    closed connection is readable with no data. Without connection ( server does not expose it) returns False
+    """
+    if connection is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        return bool(readable) and connection.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+def jobStatus(job, since = 0):
+    """
+    Returns status of the job - state, seconds since start, incumbents numbered from since on and
+    response of finished work. Reading status is heartbeat of the job
+    """
+    with _lock:
+        job["lastSeen"] = time.time()
+        status = {
+            "id": job["id"],
+            "kind": job["kind"],
+            "state": job["state"],
+            "elapsed": (job["finished"] or time.time()) - job["created"],
+            "stopRequested": job["stopRequested"],
+            "cancelled": job["cancelled"],
+            "incumbentCount": len(job["incumbents"]),
+            "incumbents": job["incumbents"][since:],
+        }
+        if job["state"] != "running":
+            status["code"] = job["code"]
+            status["response"] = job["response"]
+    return status
@@ -0,0 +1,152 @@
+import numpy as np
+
+from GridRecords import createNetwork
+from ModelFunctions import createDemandMatrix, exportNodesJSON
+from PowerFlow import createSusceptanceMatrix, dcPowerFlow
+
+
+# relative overload tolerance, flows up to capacity * ( 1 + OVERLOAD_TOLERANCE) are accepted
+OVERLOAD_TOLERANCE = 1e-6
+
+
+def meritDispatch(network, demandMatrix):
+    """
+    Dispatches blocks in order of cost until demand of the whole system is covered, without solver.
+    Cheapest blocks are started until their Pmax covers demand, all started blocks generate at least Pmin
+    and the rest of demand is served in cost order up to Pmax. If Pmin of started blocks exceeds demand,
+    the most expensive started blocks are stopped again. Network limits are ignored
+
+    ----ARGUMENTS----
+
+    network - Network from createNetwork()
+
+    demandMatrix - demand matrix from createDemandMatrix()
+
+    ----RETURNS----
+
+    dictionary with generation and isWorking of every block ( arrays of shape ( periods, blocks) in network
+    order) and unserved demand of every period
+    """
+    plants = network.plants
+    order = np.argsort(plants.cost, kind="stable")
+    Pmin, Pmax = plants.Pmin[order], plants.Pmax[order]
+    demand = demandMatrix.sum(axis=1)
+    periods, blocks = len(demand), len(order)
+
+    # first block in cost order which brings started capacity over demand
+    last = np.searchsorted(np.cumsum(Pmax), demand, side="left")
+    working = np.arange(blocks)[None, :] <= last[:, None]
+    for time in np.flatnonzero((Pmin * working).sum(axis=1) > demand).tolist():
+        for block in range(min(last[time], blocks - 1), -1, -1):
+            if (Pmin * working[time]).sum() <= demand[time]:
+                break
+            working[time, block] = False
+
+    generation = Pmin * working
+    remaining = demand - generation.sum(axis=1)
+    headroom = (Pmax - Pmin) * working
+    before = np.cumsum(headroom, axis=1) - headroom
+    generation += np.clip(remaining[:, None] - before, 0, headroom)
+
+    unsorted = np.empty(blocks, dtype=np.int64)
+    unsorted[order] = np.arange(blocks)
+    return {
+        "generation": generation[:, unsorted],
+        "isWorking": working[:, unsorted],
+        "shortage": np.maximum(demand - generation.sum(axis=1), 0),
+    }
+
+
+def meritPreview(nodes, edges, toolConfig, _globalDemand, demandMatrix = None, network = None):
+    """
+    Merit order dispatch followed by one DC power flow of every cycle. Flows are computed with imbalance
+    of every island taken by its first node, lines with flow over capacity are flagged as overloaded
+
+    ----ARGUMENTS----
+
+    nodes - list of all nodes
+
+    edges - list of all edges
+
+    toolConfig - dictionary with timeMax
+
+    _globalDemand - system demand scaling, single value or one value per cycle
+
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
+    ----RETURNS----
+
+    dictionary with demandMatrix, dispatch from meritDispatch() and flows of lines ( array of shape ( periods, lines))
+    """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, toolConfig["timeMax"])
+    if network is None:
+        network = createNetwork(nodes, edges)
+    dispatch = meritDispatch(network, demandMatrix)
+    injections = -demandMatrix.astype(np.float64)
+    np.add.at(injections, (slice(None), network.plants.node), dispatch["generation"])
+    flows = dcPowerFlow(network, injections, createSusceptanceMatrix(network))
+    return {
+        "network": network,
+        "demandMatrix": demandMatrix,
+        "dispatch": dispatch,
+        "flows": flows,
+        "overloaded": np.abs(flows) > network.lines.capacity * (1 + OVERLOAD_TOLERANCE) + OVERLOAD_TOLERANCE,
+    }
+
+
+def exportMeritJSON(preview, nodes, time, _globalDemand):
+    """
+    Exports one cycle of meritPreview() in the same structure as /api/get-results - nodes, edges and plants.
+    Edges have additional overloaded flag
+
+    ----RETURNS----
+
+    dictionary with nodes, edges and plants
+    """
+    network = preview["network"]
+    lines = network.lists()
+    generation = preview["dispatch"]["generation"][time].tolist()
+    isWorking = preview["dispatch"]["isWorking"][time].tolist()
+    plantStart = lines["plantStart"]
+    plantResponse = []
+    for node in nodes:
+        for position, plant in enumerate(node["plants"]):
+            block = plantStart[node["index"]] + position
+            plantResponse.append({
+                "group": "nodes",
+                "data": {
+                    "id": plant["blockName"],
+                    "parent": node["nodeName"],
+                    "type": "node",
+                    "value": round(generation[block], 2),
+                    "isWorking": int(isWorking[block]),
+                }
+            })
+
+    flows = preview["flows"][time].tolist()
+    overloaded = preview["overloaded"][time].tolist()
+    edgeResponse = []
+    for line, flow in enumerate(flows):
+        a, b = lines["nodeA"][line], lines["nodeB"][line]
+        if a > b:
+            # edges of solved models are exported from the node with lower index
+            a, b, flow = b, a, -flow
+        edgeResponse.append({
+            "group": "edges",
+            "data": {
+                "id": network.nodeNames[a] + network.nodeNames[b],
+                "source": network.nodeNames[a],
+                "target": network.nodeNames[b],
+                "value": round(flow, 2),
+                "percentage": round(abs(flow / lines["capacity"][line]) * 100, 2),
+                "overloaded": overloaded[line],
+            }
+        })
+    return {
+        "nodes": exportNodesJSON(nodes, time, _globalDemand, preview["demandMatrix"]),
+        "edges": edgeResponse,
+        "plants": plantResponse,
+    }
@@ -0,0 +1,184 @@
+import os
+import resource
+import threading
+from contextlib import contextmanager
+
+from ModelStore import modelCacheStatistics
+from ScenarioCache import cacheStatistics
+
+
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+SIZE_BUCKETS = [10, 100, 1000, 10000, 100000, 1000000, 10000000]
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _formatLabels(labelNames, labelValues, extra = None):
+    pairs = list(zip(labelNames, labelValues))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _formatValue(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """
+    Monotonically increasing value, one per combination of label values.
+    If function is given, value is read from it when metrics are rendered
+    """
+    kind = "counter"
+
+    def __init__(self, name, description, labelNames = (), function = None):
+        self.name = name
+        self.description = description
+        self.labelNames = tuple(labelNames)
+        self.function = function
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *labelValues, amount = 1):
+        with _lock:
+            self.values[labelValues] = self.values.get(labelValues, 0) + amount
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, (), None, self.function())]
+        return [(self.name, labels, None, value) for labels, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """
+    Value which can go up and down
+    """
+    kind = "gauge"
+
+    def set(self, value, *labelValues):
+        with _lock:
+            self.values[labelValues] = value
+
+    def dec(self, *labelValues, amount = 1):
+        self.inc(*labelValues, amount=-amount)
+
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, with sum and count of observations
+    """
+    kind = "histogram"
+
+    def __init__(self, name, description, labelNames = (), buckets = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelNames = tuple(labelNames)
+        self.buckets = list(buckets) + [float("inf")]
+        self.values = {}
+        _registry.append(self)
+
+    def observe(self, value, *labelValues):
+        with _lock:
+            counts, total = self.values.get(labelValues, ([0] * len(self.buckets), 0.0))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+            self.values[labelValues] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        for labels, (counts, total) in self.values.items():
+            for bound, count in zip(self.buckets, counts):
+                samples.append((self.name + "_bucket", labels, ("le", _formatValue(bound)), count))
+            samples.append((self.name + "_sum", labels, None, total))
+            samples.append((self.name + "_count", labels, None, counts[-1]))
+        return samples
+
+
+def residentMemory():
+    """
+    Returns resident memory of the process in bytes. Current value is read from /proc on linux,
+    elsewhere peak resident memory is returned
+    """
+    try:
+        with open("/proc/self/statm", 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+solveCount = Counter("optimizer_solves_total", "Finished solves by mode and solver status", ["mode", "status"])
+phaseLatency = Histogram("optimizer_phase_seconds", "Time of phases of /api/get-results", ["mode", "phase"])
+buildLatency = Histogram("optimizer_build_phase_seconds", "Time of groups of model builders", ["mode", "phase"])
+modelVariables = Histogram("optimizer_model_variables", "Number of variables of solved models", ["mode"], SIZE_BUCKETS)
+modelConstraints = Histogram("optimizer_model_constraints", "Number of constraints of solved models", ["mode"], SIZE_BUCKETS)
+modelBinaries = Histogram("optimizer_model_binaries", "Number of binary variables of solved models", ["mode"], SIZE_BUCKETS)
+modelCache = Counter("optimizer_model_cache_total", "Solves reusing already built model ( hit) or building it ( miss)", ["result"])
+scenarioCacheHits = Counter("optimizer_scenario_cache_hits_total", "Scenarios read from parsed scenario cache",
+                            function=lambda: cacheStatistics["hits"])
+scenarioCacheMisses = Counter("optimizer_scenario_cache_misses_total", "Scenarios parsed from text files",
+                            function=lambda: cacheStatistics["misses"])
+modelStoreHits = Counter("optimizer_model_store_hits_total", "Models loaded from on-disk model cache",
+                         function=lambda: modelCacheStatistics["hits"])
+modelStoreMisses = Counter("optimizer_model_store_misses_total", "Models built and written to on-disk model cache",
+                           function=lambda: modelCacheStatistics["misses"])
+commitmentCache = Counter("optimizer_commitment_cache_total", "Solves by result of commitment pattern cache ( hit, warm, fallback or miss)", ["result"])
+cancelledRuns = Counter("optimizer_cancelled_total", "Runs cancelled by reason ( cancel, disconnect or heartbeat)", ["reason"])
+queueDepth = Gauge("optimizer_queue_depth", "Solve requests waiting for a worker")
+solvesInFlight = Gauge("optimizer_solves_in_flight", "Solves currently running")
+processMemory = Gauge("optimizer_process_resident_memory_bytes", "Resident memory of the server process", function=residentMemory)
+queueDepth.set(0)
+solvesInFlight.set(0)
+
+
+@contextmanager
+def trackSolve():
+    """
+    Counts solve as in flight while the block runs
+    """
+    solvesInFlight.inc()
+    try:
+        yield
+    finally:
+        solvesInFlight.dec()
+
+
+def observeRun(stats):
+    """
+    Updates metrics from stats of single run, as created in /api/get-results
+    """
+    mode = stats["mode"]
+    solveCount.inc(mode, stats["solver"]["status"])
+    modelCache.inc("miss" if stats["rebuilt"] else "hit")
+    for phase, seconds in stats["timings"].items():
+        phaseLatency.observe(seconds, mode, phase)
+    for phase, seconds in stats["buildTimings"].items():
+        buildLatency.observe(seconds, mode, phase)
+    if "commitmentCache" in stats:
+        commitmentCache.inc(stats["commitmentCache"]["result"])
+    modelVariables.observe(stats["model"]["variables"], mode)
+    modelConstraints.observe(stats["model"]["constraints"], mode)
+    modelBinaries.observe(stats["model"]["binaries"], mode)
+
+
+def renderMetrics():
+    """
+    Returns all metrics in Prometheus text exposition format
+    """
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append("# HELP %s %s" % (metric.name, metric.description))
+            lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+            for name, labels, extra, value in metric.samples():
+                lines.append("%s%s %s" % (name, _formatLabels(metric.labelNames, labels, extra), _formatValue(value)))
+    return "\n".join(lines) + "\n"
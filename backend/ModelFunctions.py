@@ -1,10 +1,16 @@
 from ipaddress import summarize_address_range
 from typing import List
+import numpy as np
 from numpy import double
+from ortools.linear_solver import linear_solver_pb2
 from ortools.linear_solver import pywraplp
 from ortools.init import pywrapinit
 from ortools.sat.python import cp_model
 import math
+import time
+from CommitmentCache import MAX_GAP, commitmentCacheStatistics, commitmentKey, findPattern, storePattern
+from GridRecords import createNetwork, replaceLine, replacePlant, scaleNetwork
+from SolverStats import STATUS_NAMES, PhaseTimer, modelSize
 
 
 def createNode(nodeName, demand, index):
@@ -87,6 +93,19 @@ def getNode(nodeList, nodeToFind):
             return node
     return 0
 
+def createNodeIndex(nodeList):
+    """
+    Creates dictionary allowing to retrieve node by its name without scanning whole list of nodes
+
+    ----ARGUMENTS----
+
+    nodeList - list of all nodes
+
+    ----RETURNS----
+    dictionary node name -> node
+    """
+    return {node["nodeName"]: node for node in nodeList}
+
 def loadNode(fileNodes):
     """
     Creates list of nodes from input file.
@@ -104,16 +123,13 @@ def loadNode(fileNodes):
     """
     nodeList = []
     count = 0
-    file = open(fileNodes, 'r')
-    for line in file:  
-        _initialData = []
-        for word in line.split(","):
-            _initialData.append(word)
-        nodeList.append(
-            createNode(_initialData[0], _initialData[1] , count)
-            )            
-        count = count + 1
-    file.close
+    with open(fileNodes, 'r') as file:
+        for line in file:  
+            _initialData = line.split(",")
+            nodeList.append(
+                createNode(_initialData[0], _initialData[1] , count)
+                )            
+            count = count + 1
     return nodeList
 
 
@@ -123,7 +139,8 @@ def loadPlants(nodeList, filePlants):
     For given list of nodes and input file ( see file formatting for further information),
     Populates node list with powerplants. 
     method will try to read additional arguemnt from file,
-    which should describe desired ramp
+    which should describe desired ramp. Columns are node,plantName,blockName,Pmin,Pmax[,cost[,ramp]],
+    missing cost and ramp get defaults of createPlants()
     
     ----ARGUMENTS----
 
@@ -135,18 +152,19 @@ def loadPlants(nodeList, filePlants):
     Nothing. Used to populate node list with powerplants.
   
      """
-    file = open(filePlants, 'r')
-
-    for line in file:  
-        _initialData = []
-        for word in line.split(","):
-            _initialData.append(word)
-        if(len(_initialData) == 8):
-             createPlants(getNode(nodeList, _initialData[0]), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], _initialData[6], _initialData[7])
-        elif(len(_initialData) == 7):
-            createPlants(getNode(nodeList, _initialData[0]), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], _initialData[6])
-        else:
-             createPlants(getNode(nodeList, _initialData[0]), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4])
+    nodeIndex = createNodeIndex(nodeList)
+    with open(filePlants, 'r') as file:
+        for line in file:  
+            if not line.strip():
+                continue
+            # node,plantName,blockName,Pmin,Pmax[,cost[,ramp]] - the same columns as ScenarioLoader.loadPlantsFile()
+            _initialData = line.strip().split(",")
+            if(len(_initialData) == 7):
+                createPlants(nodeIndex.get(_initialData[0], 0), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], double(_initialData[5]), double(_initialData[6]))
+            elif(len(_initialData) == 6):
+                createPlants(nodeIndex.get(_initialData[0], 0), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], double(_initialData[5]))
+            else:
+                 createPlants(nodeIndex.get(_initialData[0], 0), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4])
 
 
 def loadPlantsJSON(nodeList, JSONfile):
@@ -154,7 +172,8 @@ def loadPlantsJSON(nodeList, JSONfile):
     For given list of nodes and JSON file ( see file formatting for further information),
     Populates node list with powerplants. 
     method will try to read additional arguemnt from JSON,
-    which should describe desired ramp
+    which should describe desired ramp. Blocks already present in the node ( same blockName)
+    are updated instead of being added again
     
     ----ARGUMENTS----
     
@@ -167,21 +186,9 @@ def loadPlantsJSON(nodeList, JSONfile):
     Nothing. Used to populate node list with powerplants.
   
     """
+    networkIndex = createNetworkIndex(nodeList, [])
     for object in JSONfile:
-        _initialData = []
-        _initialData.append(object["sourceNode"])
-        _initialData.append(object["plantName"])
-        _initialData.append(object["blockName"])
-        _initialData.append(object["Pmin"])
-        _initialData.append(object["Pmax"])
-        _initialData.append(object["cost"])
-
-        if "ramp" in object:
-            _initialData.append(object["ramp"])
-        if(len(_initialData) == 7):
-            createPlants(getNode(nodeList, _initialData[0]), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], _initialData[5], _initialData[6])
-        else:
-            createPlants(getNode(nodeList, _initialData[0]), _initialData[1], _initialData[2],  _initialData[3],  _initialData[4], _initialData[5])
+        upsertPlant(networkIndex, object)
 
 
 def createEdge(nodeA, nodeB,  capacity, admitance, voltageA, voltageB):
@@ -227,13 +234,10 @@ def loadEdges(fileEdges):
     list of edges
     """
     edgeList = []
-    file = open(fileEdges, 'r')
-    for line in file:
-        _initialData = []
-        for word in line.split(","):
-            _initialData.append(word)
-        edgeList.append(createEdge(_initialData[0], _initialData[1], _initialData[2], _initialData[3], _initialData[4], _initialData[5]))
-    file.close
+    with open(fileEdges, 'r') as file:
+        for line in file:
+            _initialData = line.split(",")
+            edgeList.append(createEdge(_initialData[0], _initialData[1], _initialData[2], _initialData[3], _initialData[4], _initialData[5]))
     return edgeList
 
 def isNeighbour(nodeA, nodeB, edges):
@@ -279,7 +283,214 @@ def getSourceVoltage(nodeA,nodeB, edge):
     else: 
         return edge["voltageB"]
 
-def createNodeVariablesSimple(solver: pywraplp.Solver, nodes, _globalDemand, time):
+def edgeKey(nodeA, nodeB):
+    """
+    Returns key identifying edge between two nodes regardless of its direction
+    """
+    return (nodeA, nodeB) if nodeA <= nodeB else (nodeB, nodeA)
+
+def createNetworkIndex(nodes, edges):
+    """
+    Creates keyed indexes of nodes, plants and edges, allowing to find and edit single element
+    without scanning whole lists
+
+    ----ARGUMENTS----
+
+    nodes - list of all nodes
+
+    edges - list of all edges
+
+    ----RETURNS----
+    dictionary with keys:
+    nodes - node name -> node,
+    plants - ( node name, block name) -> position of plant in node["plants"],
+    edges - edgeKey() -> edge ( first edge if there are more edges between the same nodes)
+    """
+    networkIndex = {
+        "nodes": {},
+        "plants": {},
+        "edges": {},
+        "edgeList": edges,
+    }
+    for node in nodes:
+        networkIndex["nodes"][node["nodeName"]] = node
+        for position, plant in enumerate(node["plants"]):
+            networkIndex["plants"][(node["nodeName"], plant["blockName"])] = position
+    for edge in edges:
+        networkIndex["edges"].setdefault(edgeKey(edge["nodeA"], edge["nodeB"]), edge)
+    return networkIndex
+
+def upsertPlant(networkIndex, plantJSON):
+    """
+    Adds new block to the node or updates parameters of existing block with the same name
+
+    ----ARGUMENTS----
+
+    networkIndex - indexes created by createNetworkIndex()
+
+    plantJSON - block in the same format as in /api/post-plants
+
+    ----RETURNS----
+    node, position of the block in node["plants"] and True if block was added. KeyError is raised if new block
+    misses some parameter and ValueError for unknown node or parameter which is not a number, the node is not changed then
+    """
+    node = networkIndex["nodes"].get(plantJSON["sourceNode"])
+    if node is None:
+        raise ValueError("unknown node %s" % plantJSON["sourceNode"])
+    key = (node["nodeName"], plantJSON["blockName"])
+    position = networkIndex["plants"].get(key)
+    if position is None:
+        # cost and ramp are stored as given, so they are checked before the block is added
+        double(plantJSON["cost"]), double(plantJSON.get("ramp", 20))
+        if "ramp" in plantJSON:
+            createPlants(node, plantJSON["plantName"], plantJSON["blockName"], plantJSON["Pmin"], plantJSON["Pmax"], plantJSON["cost"], plantJSON["ramp"])
+        else:
+            createPlants(node, plantJSON["plantName"], plantJSON["blockName"], plantJSON["Pmin"], plantJSON["Pmax"], plantJSON["cost"])
+        networkIndex["plants"][key] = len(node["plants"]) - 1
+        return node, len(node["plants"]) - 1, True
+    plant = node["plants"][position]
+    Pmin, Pmax = double(plantJSON.get("Pmin", plant["Pmin"])), double(plantJSON.get("Pmax", plant["Pmax"]))
+    cost, ramp = plantJSON.get("cost", plant["cost"]), plantJSON.get("ramp", plant["ramp"])
+    # all parameters are checked before the block is changed
+    double(cost), double(ramp)
+    plant["plantName"] = plantJSON.get("plantName", plant["plantName"])
+    plant["Pmin"] = Pmin
+    plant["Pmax"] = Pmax
+    plant["cost"] = cost
+    plant["ramp"] = ramp
+    return node, position, False
+
+def deletePlant(networkIndex, nodeName, blockName):
+    """
+    Removes block from the node. Returns True if block was found
+    """
+    position = networkIndex["plants"].pop((nodeName, blockName), None)
+    if position is None:
+        return False
+    node = networkIndex["nodes"][nodeName]
+    del node["plants"][position]
+    for index in range(position, len(node["plants"])):
+        networkIndex["plants"][(nodeName, node["plants"][index]["blockName"])] = index
+    return True
+
+def upsertEdge(networkIndex, edgeJSON):
+    """
+    Adds new edge or updates parameters of the edge connecting the same nodes
+
+    ----ARGUMENTS----
+
+    networkIndex - indexes created by createNetworkIndex()
+
+    edgeJSON - edge in the same format as in /api/post-edges
+
+    ----RETURNS----
+    edge and True if edge was added. KeyError is raised if new edge misses some parameter and ValueError for unknown
+    node or parameter which is not a number, edges are not changed then
+    """
+    for name in (edgeJSON["nodeA"], edgeJSON["nodeB"]):
+        if name not in networkIndex["nodes"]:
+            raise ValueError("unknown node %s" % name)
+    key = edgeKey(edgeJSON["nodeA"], edgeJSON["nodeB"])
+    edge = networkIndex["edges"].get(key)
+    if edge is None:
+        edge = createEdge(edgeJSON["nodeA"], edgeJSON["nodeB"], edgeJSON["capacity"], edgeJSON["admitance"], edgeJSON["voltageA"], edgeJSON["voltageB"])
+        networkIndex["edges"][key] = edge
+        networkIndex["edgeList"].append(edge)
+        return edge, True
+    voltageA, voltageB = edge["voltageA"], edge["voltageB"]
+    if edge["nodeA"] != edgeJSON["nodeA"]:
+        # edge is stored in opposite direction
+        voltageA, voltageB = voltageB, voltageA
+    # new parameters are converted before the edge is changed
+    edge.update(createEdge(
+        edgeJSON["nodeA"], edgeJSON["nodeB"], edgeJSON.get("capacity", edge["capacity"]), edgeJSON.get("admitance", edge["admitance"]),
+        edgeJSON.get("voltageA", voltageA), edgeJSON.get("voltageB", voltageB)
+    ))
+    return edge, False
+
+def deleteEdge(networkIndex, nodeA, nodeB):
+    """
+    Removes all edges between two nodes. Returns True if any edge was found
+    """
+    if networkIndex["edges"].pop(edgeKey(nodeA, nodeB), None) is None:
+        return False
+    key = edgeKey(nodeA, nodeB)
+    networkIndex["edgeList"][:] = [edge for edge in networkIndex["edgeList"] if edgeKey(edge["nodeA"], edge["nodeB"]) != key]
+    return True
+
+def getDemandProfile(node):
+    """
+    Converts demand of the node to list of numbers, one per period. Demand may be list of numbers
+    ( JSON input), single number or string of numbers separated by spaces ( text input)
+
+    ----ARGUMENTS----
+
+    node - node which demand is read
+
+    ----RETURNS----
+    list of demand values for consecutive periods
+    """
+    demand = node["demand"]
+    if isinstance(demand, str):
+        return [double(value) for value in demand.split()]
+    if isinstance(demand, (list, tuple, np.ndarray)):
+        return demand
+    return [demand]
+
+def createDemandMatrix(nodes, _globalDemand, periods = None):
+    """
+    Creates demand matrix of shape ( periods, nodes) - demand of each node in each period, already multiplied
+    by system demand for that period. Matrix should be created once and then passed to constraint and export methods.
+
+    ----ARGUMENTS----
+
+    nodes - list of all nodes
+
+    _globalDemand - system demand scaling, either single value used for all periods or one value per period
+
+    periods - number of periods in matrix, by default length of the longest demand profile or _globalDemand.
+    Profiles with single value are repeated for every period
+
+    ----RETURNS----
+    numpy array, demandMatrix[time, node["index"]] is demand of the node in given period
+    """
+    profiles = [getDemandProfile(node) for node in nodes]
+    if periods is None:
+        periods = max([len(profile) for profile in profiles] + [np.size(_globalDemand), 1])
+    demandMatrix = np.zeros((periods, len(nodes)))
+    for node, profile in zip(nodes, profiles):
+        if len(profile) == 1:
+            demandMatrix[:, node["index"]] = profile[0]
+        elif len(profile) >= periods:
+            demandMatrix[:, node["index"]] = profile[:periods]
+        else:
+            raise ValueError("node %s has demand for %d periods, %d required" % (node["nodeName"], len(profile), periods))
+    return scaleDemandMatrix(demandMatrix, _globalDemand)
+
+def scaleDemandMatrix(demandMatrix, _globalDemand):
+    """
+    Multiplies demand matrix in place by system demand of each period
+
+    ----ARGUMENTS----
+
+    demandMatrix - array of shape ( periods, nodes)
+
+    _globalDemand - single value used for all periods or one value per period
+
+    ----RETURNS----
+    scaled demand matrix
+    """
+    periods = demandMatrix.shape[0]
+    scale = np.asarray(_globalDemand, dtype=np.float64).ravel()
+    if scale.size == 1:
+        demandMatrix *= scale.item()
+    elif scale.size >= periods:
+        demandMatrix *= scale[:periods, None]
+    else:
+        raise ValueError("global demand given for %d periods, %d required" % (scale.size, periods))
+    return demandMatrix
+
+def createNodeVariablesSimple(solver: pywraplp.Solver, nodes, _globalDemand, time, demandMatrix = None, network = None):
     """
     Given a solver and list of nodes, creates solver variables based on input data.
     This method is simple version which assumes plants are always working in range of their Pmin and
@@ -296,26 +507,38 @@ def createNodeVariablesSimple(solver: pywraplp.Solver, nodes, _globalDemand, tim
 
     time - cycle number for which variables are created
 
-    
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
     ----RETURNS----
 
     an array of solver variables for use in further methods
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, time + 1)
+    if network is None:
+        network = createNetwork(nodes, [])
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmax, cost = lists["plantStart"], lists["Pmax"], lists["cost"]
+    plantName, blockName = network.plants.plantName, network.plants.blockName
     plantsInNodes = []
     for node in nodes:
             solverNode = {
                 "nodeName" : node["nodeName"],
-                "demand" : node["demand"] * _globalDemand[0],
+                "demand" : periodDemand[node["index"]],
                 "plants" : [],
                 "plantCost": []
             }
-            if len(node["plants"]) != 0:
-                for plant in node["plants"]:
+            first, last = plantStart[node["index"]], plantStart[node["index"] + 1]
+            if last > first:
+                for plant in range(first, last):
                     # We set minimimum to 0 so that we can turn off the plants!! remember about it!!
                     solverNode["plants"].append(
-                        solver.NumVar(0, plant["Pmax"], plant["plantName"]+"_"+plant["blockName"])
+                        solver.NumVar(0, Pmax[plant], plantName[plant]+"_"+blockName[plant])
                     )
-                    solverNode["plantCost"].append(plant["cost"])
+                    solverNode["plantCost"].append(cost[plant])
             else :
                 solverNode["plants"].append(
                     solver.NumVar(0, 0, node["nodeName"])
@@ -325,7 +548,7 @@ def createNodeVariablesSimple(solver: pywraplp.Solver, nodes, _globalDemand, tim
             plantsInNodes.append(solverNode)
     return plantsInNodes
 
-def createNodeVariablesBinary(solver: pywraplp.Solver, nodes, _globalDemand, time):
+def createNodeVariablesBinary(solver: pywraplp.Solver, nodes, _globalDemand, time, demandMatrix = None, network = None):
     """
     Given a solver and list of nodes, creates solver variables based on input data.
     This method is binary version which includes binary variable from solver - allow for situations in which one power plant is 
@@ -343,29 +566,41 @@ def createNodeVariablesBinary(solver: pywraplp.Solver, nodes, _globalDemand, tim
 
     time - cycle number for which variables are created
 
-    
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
     ----RETURNS----
     
     an array of solver variables for use in further methods
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, time + 1)
+    if network is None:
+        network = createNetwork(nodes, [])
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmax, cost = lists["plantStart"], lists["Pmax"], lists["cost"]
+    plantName, blockName = network.plants.plantName, network.plants.blockName
     plantsInNodes = []
     for node in nodes:
             solverNode = {
                 "nodeName" : node["nodeName"],
-                "demand" : node["demand"] * _globalDemand[0],
+                "demand" : periodDemand[node["index"]],
                 "plants" : [],
                 "isPlantWorking" : [], # binary variable, same size as plants, defines if block is working
                 "plantCost": []
             }
-            if len(node["plants"]) != 0:
-                for plant in node["plants"]:
+            first, last = plantStart[node["index"]], plantStart[node["index"] + 1]
+            if last > first:
+                for plant in range(first, last):
                     solverNode["plants"].append(
-                        solver.NumVar(0, plant["Pmax"], plant["plantName"]+"_"+plant["blockName"])
+                        solver.NumVar(0, Pmax[plant], plantName[plant]+"_"+blockName[plant])
                     ) # Pmin is set to 0 because we want to allow powerplant to be shut down - if you change it it will break
                     solverNode["isPlantWorking"].append(
-                        solver.BoolVar(plant["blockName"] +  " Is working: ")
+                        solver.BoolVar(blockName[plant] +  " Is working: ")
                     )
-                    solverNode["plantCost"].append(plant["cost"])
+                    solverNode["plantCost"].append(cost[plant])
             else :
                 solverNode["plants"].append(
                     solver.NumVar(0, 0, node["nodeName"])
@@ -404,7 +639,7 @@ def createPhaseVariables(solver: pywraplp.Solver, nodes):
     phaseVariable[0] =  solver.NumVar(0, 0, node["nodeName"])
     return phaseVariable
 
-def createEdgeFlowVariables(solver: pywraplp.Solver, nodes, edges, edgeSolutionPeriods):
+def createEdgeFlowVariables(solver: pywraplp.Solver, nodes, edges, edgeSolutionPeriods, network = None):
     """
     Given solver, list of all nodes and list of all edges, create
     flow variables for this edges. Method creates double the amount of edges that are given to allow easier 
@@ -421,34 +656,39 @@ def createEdgeFlowVariables(solver: pywraplp.Solver, nodes, edges, edgeSolutionP
 
     edgeSolutionPeriods - array that will store edge variables betweeen cycles
 
+    network - Network from createNetwork(), created from nodes and edges if not given
     
     ----RETURNS----
 
-   an array of solver variables for use in further methods
+   an array of dictionaries of solver variables for use in further methods, edgeFlowVariables[a][b] is the flow from a to b
     """
-    edgeFlowVariables = []
-
-    for nodeA in nodes:
-            flowAB = []
-            for nodeB in nodes:
-                flag = isNeighbour(nodeA["nodeName"], nodeB["nodeName"], edges)
-                if flag != -1:
-                    edgeDataObject = {
-                        "srcNodeVolt" : getSourceVoltage(nodeA, nodeB, flag),
-                        "dstNodeVolt" : getSourceVoltage(nodeB, nodeA, flag),
-                        "var" : solver.NumVar(-flag["capacity"], flag["capacity"], nodeA["nodeName"]+nodeB["nodeName"]),
-                        "nodeA": nodeA["nodeName"],
-                        "nodeB": nodeB["nodeName"],
-                        "capacity": flag["capacity"],
-                    }
-                    flowAB.append(edgeDataObject)
-                if flag == -1: 
-                    flowAB.append(0)
-            edgeFlowVariables.append(flowAB)
+    if network is None:
+        network = createNetwork(nodes, edges)
+    lists = network.lists()
+    nodeNames = network.nodeNames
+    capacity, voltageA, voltageB = lists["capacity"], lists["voltageA"], lists["voltageB"]
+    # one dictionary per node keyed by the index of the neighbour, dense n x n list grows quadratically with grid size
+    edgeFlowVariables = [{} for node in nodes]
+
+    for a in range(len(nodeNames)):
+            for b, line in lists["neighbours"][a]:
+                # voltage of the line end which is located in node a
+                if lists["nodeA"][line] == a:
+                    srcNodeVolt, dstNodeVolt = voltageA[line], voltageB[line]
+                else:
+                    srcNodeVolt, dstNodeVolt = voltageB[line], voltageA[line]
+                edgeFlowVariables[a][b] = {
+                    "srcNodeVolt" : srcNodeVolt,
+                    "dstNodeVolt" : dstNodeVolt,
+                    "var" : solver.NumVar(-capacity[line], capacity[line], nodeNames[a]+nodeNames[b]),
+                    "nodeA": nodeNames[a],
+                    "nodeB": nodeNames[b],
+                    "capacity": capacity[line],
+                }
     edgeSolutionPeriods.append(edgeFlowVariables)
     return edgeFlowVariables
 
-def createComplexConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], strictMode = True):
+def createComplexConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], strictMode = True, demandMatrix = None, network = None):
     """
     Complex version of constraints, includes binary variables and ramp power generation - used with binary variables but 
     plants should have ramp specified
@@ -479,38 +719,51 @@ def createComplexConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVari
 
     time - time period for which calculations are run ( ie 1, 2, 3)
 
-    _globalDemand - array of cycles storing demand for each node per cycle
+    _globalDemand - system demand scaling, single value or one value per cycle
 
     shortage - array to store shortages in power generation
 
     stricMode - specifies whether calculations are strict or relaxed ( thus allowing to not satisfy demand in nodes)
+
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
     
     ----RETURNS----
 
     Nothing. Adds created variables and constraints to the periodOfTime array under current cycle
     
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, time + 1)
+    if network is None:
+        network = createNetwork(nodes, edges)
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmin, Pmax, ramp, admitance = lists["plantStart"], lists["Pmin"], lists["Pmax"], lists["ramp"], lists["admitance"]
     for nodeA in nodes:
             neighbouringEdges = []
-            for nodeB in nodes:
-                edgeToConstrain = isNeighbour(nodeA["nodeName"], nodeB["nodeName"], edges)
-                if edgeToConstrain != -1 :
-                    edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB["index"]]
-                    neighbouringEdges.append(edgeFlowDataObject["var"])
-                    solver.Add(
-                        edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*edgeToConstrain["admitance"]*(
-                            phaseVariable[nodeA["index"]]- phaseVariable[nodeB["index"]]
-                            )
-                    )
+            for nodeB, line in lists["neighbours"][nodeA["index"]]:
+                edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB]
+                neighbouringEdges.append(edgeFlowDataObject["var"])
+                edgeFlowDataObject["equation"] = solver.Add(
+                    edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*admitance[line]*(
+                        phaseVariable[nodeA["index"]]- phaseVariable[nodeB]
+                        )
+                )
             index = 0
+            plantsInNodes[nodeA["index"]]["plantLimits"] = []
+            plantsInNodes[nodeA["index"]]["rampLimits"] = []
             for plant in plantsInNodes[nodeA["index"]]["plants"]:
-                if len(nodes[nodeA["index"]]["plants"]) > 0:
-                    solver.Add(
-                        plant <= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]*nodes[nodeA["index"]]["plants"][index]["Pmax"]
-                    )
-                    solver.Add(
-                        plant >= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]*nodes[nodeA["index"]]["plants"][index]["Pmin"]
-                    )
+                if plantStart[nodeA["index"] + 1] > plantStart[nodeA["index"]]:
+                    plantsInNodes[nodeA["index"]]["plantLimits"].append((
+                        solver.Add(
+                            plant <= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]*Pmax[plantStart[nodeA["index"]] + index]
+                        ),
+                        solver.Add(
+                            plant >= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]*Pmin[plantStart[nodeA["index"]] + index]
+                        )
+                    ))
                     if time > 0:
                         # We need to create xnor logic for determinig proper constraints on changes in power generation
                         # That is because if we have continous operation of plant ( ie isWorking[t] = 1 and isWorking[t-1] = 1)
@@ -533,22 +786,25 @@ def createComplexConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVari
                         solver.Add(
                               2 - periodOfTime[time-1][nodeA["index"]]["isPlantWorking"][index] - plantsInNodes[nodeA["index"]]["isPlantWorking"][index] >= zVar
                         )
-                        solver.Add(
-                            periodOfTime[time - 1][nodeA["index"]]["plants"][index] - plant <= zVar * nodeA["plants"][index]["Pmin"] + (1-zVar)*nodeA["plants"][index]["ramp"]
-                        )
-                        solver.Add(
-                            periodOfTime[time - 1][nodeA["index"]]["plants"][index] - plant >= -( zVar * nodeA["plants"][index]["Pmin"] + 
-                           (1-zVar)*nodeA["plants"][index]["ramp"])
-                        )
+                        plantsInNodes[nodeA["index"]]["rampLimits"].append((
+                            solver.Add(
+                                periodOfTime[time - 1][nodeA["index"]]["plants"][index] - plant <= zVar * Pmin[plantStart[nodeA["index"]] + index] + (1-zVar)*ramp[plantStart[nodeA["index"]] + index]
+                            ),
+                            solver.Add(
+                                periodOfTime[time - 1][nodeA["index"]]["plants"][index] - plant >= -( zVar * Pmin[plantStart[nodeA["index"]] + index] + 
+                               (1-zVar)*ramp[plantStart[nodeA["index"]] + index])
+                            ),
+                            zVar
+                        ))
                     index = index + 1
             if(strictMode):
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges)==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges)==0
                 )
             else: 
                 short = solver.NumVar(0, 1000, "Shortage")
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges) + short ==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges) + short ==0
                 )
                 shortage.append(short)
     periodOfTime.append(plantsInNodes)
@@ -556,7 +812,7 @@ def createComplexConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVari
 
 
 
-def createBinaryConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], strictMode = True,):
+def createBinaryConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], strictMode = True, demandMatrix = None, network = None):
     """
     Binary version of constraints, includes binary variables. Used with binary variables
     Creates all constraints used in model - this is a complete method to do so but it can be implemented 
@@ -587,11 +843,15 @@ def createBinaryConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVaria
 
     time - time period for which calculations are run ( ie 1, 2, 3)
 
-    _globalDemand - array of cycles storing demand for each node per cycle
+    _globalDemand - system demand scaling, single value or one value per cycle
 
     shortage - array to store shortages in power generation
 
     stricMode - specifies whether calculations are strict or relaxed ( thus allowing to not satisfy demand in nodes)
+
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
     
     ----RETURNS----
 
@@ -599,46 +859,54 @@ def createBinaryConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVaria
     
     
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, time + 1)
+    if network is None:
+        network = createNetwork(nodes, edges)
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmin, Pmax, ramp, admitance = lists["plantStart"], lists["Pmin"], lists["Pmax"], lists["ramp"], lists["admitance"]
     for nodeA in nodes:
             neighbouringEdges = []
-            for nodeB in nodes:
-                edgeToConstrain = isNeighbour(nodeA["nodeName"], nodeB["nodeName"], edges)
-                if edgeToConstrain != -1 :
-                    edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB["index"]]
+            for nodeB, line in lists["neighbours"][nodeA["index"]]:
+                edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB]
 
-                    neighbouringEdges.append(edgeFlowDataObject["var"])
+                neighbouringEdges.append(edgeFlowDataObject["var"])
                 
-                    solver.Add(
-                        edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*edgeToConstrain["admitance"]*(
-                            phaseVariable[nodeA["index"]]- phaseVariable[nodeB["index"]]
-                            )
-                    )
+                edgeFlowDataObject["equation"] = solver.Add(
+                    edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*admitance[line]*(
+                        phaseVariable[nodeA["index"]]- phaseVariable[nodeB]
+                        )
+                )
             index = 0
+            plantsInNodes[nodeA["index"]]["plantLimits"] = []
             for plant in plantsInNodes[nodeA["index"]]["plants"]:
-                if len(nodes[nodeA["index"]]["plants"]) > 0:
-                    solver.Add(
-                        plant <= plantsInNodes[nodeA["index"]]["isPlantWorking"][index] * nodes[nodeA["index"]]["plants"][index]["Pmax"]
-                    )
-                    solver.Add(
-                        plant >= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]  * nodes[nodeA["index"]]["plants"][index]["Pmin"]
-                    )
+                if plantStart[nodeA["index"] + 1] > plantStart[nodeA["index"]]:
+                    plantsInNodes[nodeA["index"]]["plantLimits"].append((
+                        solver.Add(
+                            plant <= plantsInNodes[nodeA["index"]]["isPlantWorking"][index] * Pmax[plantStart[nodeA["index"]] + index]
+                        ),
+                        solver.Add(
+                            plant >= plantsInNodes[nodeA["index"]]["isPlantWorking"][index]  * Pmin[plantStart[nodeA["index"]] + index]
+                        )
+                    ))
                     index = index + 1
             if(strictMode):
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges)==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges)==0
                 )
             else: 
                 short = solver.NumVar(0, 1000, "Shortage")
             
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges) + short ==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges) + short ==0
                 )
                 shortage.append(short)
     periodOfTime.append(plantsInNodes)
 
 
 
-def createSimpleConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], overflow=[], strictMode=True):
+def createSimpleConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage = [], overflow=[], strictMode=True, demandMatrix = None, network = None):
     """
     Simple version of constraints used with simple variables method
     Creates all constraints used in model - this is a complete method to do so but it can be implemented 
@@ -669,11 +937,15 @@ def createSimpleConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVaria
 
     time - time period for which calculations are run ( ie 1, 2, 3)
 
-    _globalDemand - array of cycles storing demand for each node per cycle
+    _globalDemand - system demand scaling, single value or one value per cycle
 
     shortage - array to store shortages in power generation
 
     stricMode - specifies whether calculations are strict or relaxed ( thus allowing to not satisfy demand in nodes)
+
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
     
     ----RETURNS----
 
@@ -681,40 +953,180 @@ def createSimpleConstraints(solver: pywraplp.Solver, nodes, edges, edgeFlowVaria
     
     
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, _globalDemand, time + 1)
+    if network is None:
+        network = createNetwork(nodes, edges)
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmin, Pmax, ramp, admitance = lists["plantStart"], lists["Pmin"], lists["Pmax"], lists["ramp"], lists["admitance"]
     for nodeA in nodes:
             neighbouringEdges = []
-            for nodeB in nodes:
-                edgeToConstrain = isNeighbour(nodeA["nodeName"], nodeB["nodeName"], edges)
-                if edgeToConstrain != -1 :
-                    edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB["index"]]
-                    neighbouringEdges.append(edgeFlowDataObject["var"])
-                    solver.Add(
-                        edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*edgeToConstrain["admitance"]*(
-                            phaseVariable[nodeA["index"]]- phaseVariable[nodeB["index"]]
-                            )
-                    )
+            for nodeB, line in lists["neighbours"][nodeA["index"]]:
+                edgeFlowDataObject = edgeFlowVariables[nodeA["index"]][nodeB]
+                neighbouringEdges.append(edgeFlowDataObject["var"])
+                edgeFlowDataObject["equation"] = solver.Add(
+                    edgeFlowDataObject["var"] == edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"]*admitance[line]*(
+                        phaseVariable[nodeA["index"]]- phaseVariable[nodeB]
+                        )
+                )
             index = 0
+            plantsInNodes[nodeA["index"]]["plantLimits"] = []
             for plant in plantsInNodes[nodeA["index"]]["plants"]:
-                if len(nodes[nodeA["index"]]["plants"]) > 0:
-                    solver.Add(
-                        plant <= nodes[nodeA["index"]]["plants"][index]["Pmax"]
-                    )
-                    solver.Add(
-                        plant >= nodes[nodeA["index"]]["plants"][index]["Pmin"]
-                    )
+                if plantStart[nodeA["index"] + 1] > plantStart[nodeA["index"]]:
+                    plantsInNodes[nodeA["index"]]["plantLimits"].append((
+                        solver.Add(
+                            plant <= Pmax[plantStart[nodeA["index"]] + index]
+                        ),
+                        solver.Add(
+                            plant >= Pmin[plantStart[nodeA["index"]] + index]
+                        )
+                    ))
                     index = index + 1
             if(strictMode):
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges)==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges)==0
                 )
             else: 
                 short = solver.NumVar(0, 1000, "Shortage")
-                solver.Add(
-                    sum(plantsInNodes[nodeA["index"]]["plants"]) - nodeA["demand"][time]*_globalDemand[0] - sum(neighbouringEdges) + short==0
+                plantsInNodes[nodeA["index"]]["balance"] = solver.Add(
+                    sum(plantsInNodes[nodeA["index"]]["plants"]) - periodDemand[nodeA["index"]] - sum(neighbouringEdges) + short==0
                 )
                 shortage.append(short)
     periodOfTime.append(plantsInNodes)
 
+def createConstraintsCoefficients(solver: pywraplp.Solver, nodes, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, mode, shortage = [], strictMode = True, demandMatrix = None, network = None):
+    """
+    Creates the same constraints as createSimpleConstraints(), createBinaryConstraints() or createComplexConstraints()
+    ( depending on mode), in the same order, but sets coefficients and bounds of constraint rows directly
+    instead of building python expressions, which is much faster for large models
+
+    ----ARGUMENTS----
+
+    solver - solver to which constraints are added
+
+    nodes - list of all nodes
+
+    edgeFlowVariables - array of solver variables for edges
+
+    phaseVariable - array of solver variables for phase
+
+    plantsInNodes - array of solver variables for individual powerplants
+
+    periodOfTime - Array of cycles, that contains  all variables used for individual cycles
+
+    time - time period for which calculations are run ( ie 1, 2, 3)
+
+    mode - simple, binary or complex
+
+    shortage - array to store shortages in power generation
+
+    strictMode - specifies whether calculations are strict or relaxed ( thus allowing to not satisfy demand in nodes)
+
+    demandMatrix - demand matrix from createDemandMatrix()
+
+    network - Network from createNetwork()
+
+    ----RETURNS----
+
+    Nothing. Adds created variables and constraints to the periodOfTime array under current cycle
+    """
+    periodDemand = demandMatrix[time].tolist()
+    lists = network.lists()
+    plantStart, Pmin, Pmax, ramp, admitance = lists["plantStart"], lists["Pmin"], lists["Pmax"], lists["ramp"], lists["admitance"]
+    infinity = solver.infinity()
+    binary = mode != "simple"
+    for nodeA in nodes:
+            a = nodeA["index"]
+            solverNode = plantsInNodes[a]
+            neighbouringEdges = []
+            for nodeB, line in lists["neighbours"][a]:
+                edgeFlowDataObject = edgeFlowVariables[a][nodeB]
+                neighbouringEdges.append(edgeFlowDataObject["var"])
+                coefficient = edgeFlowDataObject["srcNodeVolt"] * edgeFlowDataObject["dstNodeVolt"] * admitance[line]
+                equation = solver.RowConstraint(0, 0, "")
+                equation.SetCoefficient(edgeFlowDataObject["var"], 1)
+                equation.SetCoefficient(phaseVariable[a], -coefficient)
+                equation.SetCoefficient(phaseVariable[nodeB], coefficient)
+                edgeFlowDataObject["equation"] = equation
+            solverNode["plantLimits"] = []
+            if mode == "complex":
+                solverNode["rampLimits"] = []
+            first = plantStart[a]
+            if plantStart[a + 1] > first:
+                for index, plant in enumerate(solverNode["plants"]):
+                    if binary:
+                        working = solverNode["isPlantWorking"][index]
+                        upper = solver.RowConstraint(-infinity, 0, "")
+                        upper.SetCoefficient(plant, 1)
+                        upper.SetCoefficient(working, -Pmax[first + index])
+                        lower = solver.RowConstraint(0, infinity, "")
+                        lower.SetCoefficient(plant, 1)
+                        lower.SetCoefficient(working, -Pmin[first + index])
+                    else:
+                        upper = solver.RowConstraint(-infinity, Pmax[first + index], "")
+                        upper.SetCoefficient(plant, 1)
+                        lower = solver.RowConstraint(Pmin[first + index], infinity, "")
+                        lower.SetCoefficient(plant, 1)
+                    solverNode["plantLimits"].append((upper, lower))
+                    if mode == "complex" and time > 0:
+                        # xnor of working state in this and previous cycle, see createComplexConstraints()
+                        previous = periodOfTime[time - 1][a]
+                        previousWorking = previous["isPlantWorking"][index]
+                        zVar = solver.BoolVar("Zvar"+nodeA["nodeName"])
+                        for lowerBound, upperBound, previousCoefficient, workingCoefficient in (
+                                (0, infinity, 1, 1), (-infinity, 0, 1, -1), (-infinity, 0, -1, 1), (-2, infinity, -1, -1)):
+                            row = solver.RowConstraint(lowerBound, upperBound, "")
+                            row.SetCoefficient(previousWorking, previousCoefficient)
+                            row.SetCoefficient(working, workingCoefficient)
+                            row.SetCoefficient(zVar, -1)
+                        rampUp = solver.RowConstraint(-infinity, ramp[first + index], "")
+                        rampDown = solver.RowConstraint(-ramp[first + index], infinity, "")
+                        for row, zCoefficient in ((rampUp, ramp[first + index] - Pmin[first + index]), (rampDown, Pmin[first + index] - ramp[first + index])):
+                            row.SetCoefficient(previous["plants"][index], 1)
+                            row.SetCoefficient(plant, -1)
+                            row.SetCoefficient(zVar, zCoefficient)
+                        solverNode["rampLimits"].append((rampUp, rampDown, zVar))
+            if not strictMode:
+                short = solver.NumVar(0, 1000, "Shortage")
+                shortage.append(short)
+            balance = solver.RowConstraint(periodDemand[a], periodDemand[a], "")
+            for plant in solverNode["plants"]:
+                balance.SetCoefficient(plant, 1)
+            for flow in neighbouringEdges:
+                balance.SetCoefficient(flow, -1)
+            if not strictMode:
+                balance.SetCoefficient(short, 1)
+            solverNode["balance"] = balance
+    periodOfTime.append(plantsInNodes)
+
+def createObjectiveCoefficients(solver: pywraplp.Solver, periodOfTime, shortage, strictMode = True):
+    """
+    Sets the same minimized function as createMinimizeFunction() or createMinimizeFunctionDemand() ( if strictMode
+    is False), by setting objective coefficients of generation and shortage variables directly. Unlike
+    createMinimizeFunctionBinary() no additional variables or constraints are created
+
+    ----ARGUMENTS----
+
+    solver - solver which will be used
+
+    periodOfTime - array containing all variables and constraints, grouped by cycle
+
+    shortage - array of solver variables representing shortage in each node
+
+    strictMode - whether model was built with strict constraints
+    """
+    objective = solver.Objective()
+    for hour in periodOfTime:
+        for node in hour :
+            for plant, cost in zip(node["plants"], node["plantCost"]):
+                objective.SetCoefficient(plant, float(cost))
+    if not strictMode:
+        shortageCost = float(getShortageCost(periodOfTime))
+        for short in shortage:
+            objective.SetCoefficient(short, shortageCost)
+    objective.SetMinimization()
+
 def createMinimizeFunction(solver: pywraplp.Solver, periodOfTime):
     """
     Creates array of plants generation variables to minimize in solver. Should be run after all periodOfTime constraints are created
@@ -753,21 +1165,32 @@ def createMinimizeFunctionDemand(solver: pywraplp.Solver, periodOfTime, shortage
     returns array of solver Variables to be optimized
     """
     sumOfGeneration = []
-    maxCost = 1
     for hour in periodOfTime:
         
         for node in hour :
             pindex = 0
             for plant in node["plants"]:
-                if(int(node["plantCost"][pindex] or 1) > maxCost):
-                    maxCost = node["plantCost"][pindex]
                 sumOfGeneration.append(node["plantCost"][pindex]*plant)
                 pindex = pindex + 1
 
+    shortageCost = getShortageCost(periodOfTime)
     for short in shortage:
-        sumOfGeneration.append((maxCost+1)*short)
+        sumOfGeneration.append(shortageCost*short)
     return sumOfGeneration
 
+def getShortageCost(periodOfTime):
+    """
+    Returns cost of one unit of shortage - higher than cost of any plant, so that solver
+    prefers generation over not satisfying demand
+    """
+    maxCost = 1
+    for hour in periodOfTime:
+        for node in hour :
+            for cost in node["plantCost"]:
+                if(int(cost or 1) > maxCost):
+                    maxCost = cost
+    return maxCost + 1
+
 def createMinimizeFunctionBinary(solver: pywraplp.Solver, periodOfTime):
     """
     Test method for debugging purposes
@@ -787,7 +1210,615 @@ def createMinimizeFunctionBinary(solver: pywraplp.Solver, periodOfTime):
     return sumOfGeneration
 
 
-def exportNodesJSON( nodes, time, demand):
+def estimateModelSize(nodes, edges, toolConfig, network = None):
+    """
+    Computes size of the model buildModel() would create, without creating any solver variables.
+    Counts follow createXXX methods - per cycle every block ( or placeholder of node without blocks) has one
+    generation variable, every node one phase variable ( plus fixed phase of the first node), every line two flow
+    variables with flow equations, every block two limit constraints and every node one balance constraint.
+    Binary and complex modes add one binary per generation variable, complex mode adds one binary and six
+    constraints per block in every cycle after the first one, relaxed mode adds one shortage variable per node
+
+    ----ARGUMENTS----
+
+    nodes - list of all nodes
+
+    edges - list of all edges
+
+    toolConfig - dictionary with mode ( simple, binary or complex), enforceStrict and timeMax
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
+    ----RETURNS----
+    dictionary with number of continuous variables, binaries, all variables and constraints
+    """
+    mode = toolConfig["mode"]
+    if mode not in ("simple", "binary", "complex"):
+        raise ValueError("unknown mode %s" % mode)
+    if network is None:
+        network = createNetwork(nodes, edges)
+    TimeMax = toolConfig["timeMax"]
+    nodeCount = len(network.nodeNames)
+    plantCount = len(network.plants)
+    lineCount = len(network.lines)
+    generationVariables = plantCount + int(np.count_nonzero(np.diff(network.plantStart) == 0))
+
+    continuous = TimeMax * (generationVariables + nodeCount + (1 if nodeCount else 0) + 2 * lineCount)
+    constraints = TimeMax * (2 * lineCount + 2 * plantCount + nodeCount)
+    binaries = 0
+    if not toolConfig["enforceStrict"]:
+        continuous += TimeMax * nodeCount
+    if mode != "simple":
+        binaries += TimeMax * generationVariables
+    if mode == "complex" and TimeMax > 1:
+        binaries += (TimeMax - 1) * plantCount
+        constraints += (TimeMax - 1) * 6 * plantCount
+    return {
+        "continuous": continuous,
+        "binaries": binaries,
+        "variables": continuous + binaries,
+        "constraints": constraints,
+    }
+
+
+def computePerUnitBase(network, demandMatrix):
+    """
+    Chooses base power and base voltage of per unit system for the network. Base power is power of 10 closest
+    to median of block capacities, line capacities and peak node demands, base voltage is the highest line voltage,
+    so that power values in the model are close to 1
+
+    ----RETURNS----
+    dictionary with power ( MW) and voltage ( kV)
+    """
+    values = np.concatenate([network.plants.Pmax, network.lines.capacity, np.max(np.abs(demandMatrix), axis=0) if demandMatrix.size else []])
+    values = values[np.isfinite(values) & (values > 0)]
+    power = 10.0 ** np.round(np.log10(np.median(values))) if values.size else 1.0
+    voltages = np.concatenate([network.lines.voltageA, network.lines.voltageB])
+    voltages = voltages[np.isfinite(voltages) & (voltages > 0)]
+    voltage = float(voltages.max()) if voltages.size else 1.0
+    return {"power": float(power), "voltage": voltage}
+
+def getPowerBase(model):
+    """
+    Returns base power of the model in MW - solution values of generation, flow and shortage variables
+    and objective multiplied by it give values in MW ( 1 if model is not scaled)
+    """
+    if model is None:
+        return 1.0
+    return model.get("scaling", {}).get("power", 1.0)
+
+def buildModel(solver: pywraplp.Solver, nodes, edges, toolConfig, _globalDemand, demandMatrix = None, network = None):
+    """
+    Creates complete model for all cycles - variables, constraints and minimized function - using
+    methods matching mode from toolConfig. Model can be later modified with updateXXXInModel methods
+    and solved again without being rebuilt
+
+    ----ARGUMENTS----
+
+    solver - solver to which model is added, should be empty
+
+    nodes - list of all nodes
+
+    edges - list of all edges
+
+    toolConfig - dictionary with mode ( simple, binary or complex), enforceStrict and timeMax. builder "coefficients" sets
+    constraint and objective coefficients directly instead of building python expressions ( default "expressions").
+    perUnit True builds the model in per unit system with bases from computePerUnitBase(), perUnit may also be
+    dictionary with power and voltage base. Solution values and objective are then multiplied by getPowerBase()
+
+    _globalDemand - system demand scaling, single value or one value per cycle
+
+    demandMatrix - demand matrix from createDemandMatrix(), created from _globalDemand if not given
+
+    network - Network from createNetwork(), created from nodes and edges if not given
+
+    ----RETURNS----
+    model dictionary holding solver, all variables grouped by cycle ( periodOfTime, edgeSolutionPeriods,
+    phasePeriods), shortage variables, data model was built from, build time of each group of builders ( timings)
+    and model size
+    """
+    mode = toolConfig["mode"]
+    if mode not in ("simple", "binary", "complex"):
+        raise ValueError("unknown mode %s" % mode)
+    enforceStrict = toolConfig["enforceStrict"]
+    TimeMax = toolConfig["timeMax"]
+    builder = toolConfig.get("builder", "expressions")
+    if builder not in ("expressions", "coefficients"):
+        raise ValueError("unknown builder %s" % builder)
+    timer = PhaseTimer()
+    with timer.phase("demand"):
+        if demandMatrix is None:
+            demandMatrix = createDemandMatrix(nodes, _globalDemand, TimeMax)
+    with timer.phase("network"):
+        if network is None:
+            network = createNetwork(nodes, edges)
+    scaling = {"power": 1.0, "voltage": 1.0}
+    modelNetwork, modelDemand = network, demandMatrix
+    if toolConfig.get("perUnit"):
+        with timer.phase("scaling"):
+            scaling = dict(toolConfig["perUnit"]) if isinstance(toolConfig["perUnit"], dict) else computePerUnitBase(network, demandMatrix)
+            modelNetwork = scaleNetwork(network, scaling["power"], scaling["voltage"])
+            modelDemand = demandMatrix / scaling["power"]
+    periodOfTime = []
+    edgeSolutionPeriods = []
+    phasePeriods = []
+    shortage = []
+    overflow = []
+    time = 0
+    while time < TimeMax :
+        with timer.phase("plantVariables"):
+            if mode == "simple":
+                plantsInNodes = createNodeVariablesSimple(solver, nodes, _globalDemand, time, modelDemand, modelNetwork)
+            else:
+                plantsInNodes = createNodeVariablesBinary(solver, nodes, _globalDemand, time, modelDemand, modelNetwork)
+        with timer.phase("flowVariables"):
+            phaseVariable = createPhaseVariables(solver, nodes)
+            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges, edgeSolutionPeriods, modelNetwork)
+        with timer.phase("constraints"):
+            if builder == "coefficients":
+                createConstraintsCoefficients(solver, nodes, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, mode, shortage, enforceStrict, modelDemand, modelNetwork)
+            elif mode == "simple":
+                createSimpleConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict, modelDemand, modelNetwork)
+            elif mode == "binary":
+                createBinaryConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, enforceStrict, modelDemand, modelNetwork)
+            else:
+                createComplexConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, enforceStrict, modelDemand, modelNetwork)
+        phasePeriods.append(phaseVariable)
+        time +=1
+
+    with timer.phase("objective"):
+        if builder == "coefficients":
+            createObjectiveCoefficients(solver, periodOfTime, shortage, enforceStrict)
+        elif enforceStrict:
+            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
+        else:
+            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage)
+        if builder != "coefficients":
+            solver.Minimize(solver.Sum(sumOfGeneration))
+    for short in shortage:
+        # shortage is limited to 1000 MW
+        short.SetUb(1000 / scaling["power"])
+    timer.timings["total"] = timer.total()
+
+    return {
+        "solver": solver,
+        "mode": mode,
+        "enforceStrict": enforceStrict,
+        "config": dict(toolConfig),
+        "periodOfTime": periodOfTime,
+        "edgeSolutionPeriods": edgeSolutionPeriods,
+        "phasePeriods": phasePeriods,
+        "shortage": shortage,
+        "demandMatrix": demandMatrix,
+        "network": modelNetwork,
+        "scaling": scaling,
+        "timings": timer.timings,
+        "size": modelSize(solver),
+    }
+
+def runSolve(model, timeLimit = None, gap = None, solver = None, solverType = "SCIP"):
+    """
+    Solves model["solver"], or solver of auxiliary model ( ie. LP relaxation or commitment model). Every solve of
+    solveModel() goes through this function. If model has solveRunner ( set by the server, see SolverProcess.py),
+    the solve is done by solveRunner( solver, timeLimit, gap, solverType), otherwise by solver.Solve()
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel()
+
+    timeLimit - time limit in seconds ( 0 for no limit), limit set on the solver is kept if None
+
+    gap - relative MIP gap, default of solver.Solve() if None
+
+    solver - solver to solve, model["solver"] if None
+
+    solverType - name of the solver for pywraplp.Solver.CreateSolver()
+
+    ----RETURNS----
+    solver status
+    """
+    if solver is None:
+        solver = model["solver"]
+    runner = model.get("solveRunner")
+    if runner is not None:
+        return runner(solver, timeLimit, gap, solverType)
+    if timeLimit is not None:
+        solver.SetTimeLimit(int(timeLimit * 1000))
+    parameters = pywraplp.MPSolverParameters()
+    # every solve starts from scratch as in the worker process - SCIP would otherwise continue solve stopped
+    # by time limit, with the time limit counted from the start of the stopped solve
+    parameters.SetIntegerParam(parameters.INCREMENTALITY, parameters.INCREMENTALITY_OFF)
+    if gap is not None:
+        parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, gap)
+    return solver.Solve(parameters)
+
+def createCommitmentModel(model):
+    """
+    Creates model of the first stage of solveTwoStage() - the same mode as the model, but with all blocks
+    in one node without network. Parameters of blocks and demand are read from the model itself,
+    so that changes applied by updatePlantInModel() and updateDemandInModel() are included
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel() in binary or complex mode
+
+    ----RETURNS----
+    model dictionary of the commitment model, its blocks are in order of blocks of the model ( by node index)
+    """
+    objective = model["solver"].Objective()
+    plants = []
+    for solverNode in model["periodOfTime"][0]:
+        for position, (upper, lower) in enumerate(solverNode["plantLimits"]):
+            working = solverNode["isPlantWorking"][position]
+            plant = solverNode["plants"][position]
+            plants.append({
+                "plantName": plant.name(),
+                "blockName": str(len(plants)),
+                "Pmin": -lower.GetCoefficient(working),
+                "Pmax": -upper.GetCoefficient(working),
+                "cost": objective.GetCoefficient(plant),
+            })
+    if model["mode"] == "complex" and len(model["periodOfTime"]) > 1:
+        # ramp is upper bound of ramp up constraint, see createComplexConstraints()
+        ramps = [rampUp.ub() for solverNode in model["periodOfTime"][1] for rampUp, rampDown, zVar in solverNode.get("rampLimits", [])]
+        for plant, ramp in zip(plants, ramps):
+            plant["ramp"] = ramp
+    demand = [[sum(solverNode["demand"] for solverNode in plantsInNodes)] for plantsInNodes in model["periodOfTime"]]
+    system = {"nodeName": "system", "index": 0, "demand": [row[0] for row in demand], "plants": plants}
+    config = {"mode": model["mode"], "enforceStrict": model["enforceStrict"], "timeMax": len(demand), "builder": "coefficients"}
+    commitment = buildModel(pywraplp.Solver.CreateSolver('SCIP'), [system], [], config, [1], np.array(demand))
+    for short in commitment["shortage"]:
+        # shortage of every node of the model is limited to 1000 MW
+        short.SetUb(len(model["periodOfTime"][0]) * 1000 / getPowerBase(model))
+    return commitment
+
+def solveTwoStage(model):
+    """
+    Solves binary or complex model in two stages. First stage decides which blocks work in every cycle
+    on model without network ( see createCommitmentModel()), second stage fixes isPlantWorking and ramp binaries
+    of the model to this commitment, so that the solver only solves economic dispatch LP with full network.
+    If the commitment cannot be dispatched in the network, binaries are released and the full model is solved
+    with the commitment as hint. Binaries stay fixed after the solve, next call fixes them again
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel() in binary or complex mode
+
+    ----RETURNS----
+    solver status. Time of both stages, commitment cost and whether full model was solved are stored
+    in model["twoStageStats"]
+    """
+    timer = PhaseTimer()
+    with timer.phase("commitment"):
+        commitment = createCommitmentModel(model)
+        commitmentStatus = runSolve(model, solver=commitment["solver"])
+    stats = model["twoStageStats"] = {
+        "commitmentStatus": STATUS_NAMES.get(commitmentStatus, str(commitmentStatus)),
+        "commitmentObjective": None,
+        "fallback": False,
+        "timings": timer.timings,
+    }
+    variables = commitmentVariables(model)
+    if commitmentStatus in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        stats["commitmentObjective"] = commitment["solver"].Objective().Value() * getPowerBase(model)
+        # blocks of the commitment model are in the same order, so are its binaries
+        values = [round(variable.solution_value()) for variable in commitmentVariables(commitment)]
+        with timer.phase("dispatch"):
+            status = solveFixedCommitment(model, variables, values)
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            return status
+    else:
+        values = None
+    with timer.phase("fallback"):
+        stats["fallback"] = True
+        status = solveWithCommitmentHint(model, variables, values)
+    return status
+
+def commitmentVariables(model):
+    """
+    Returns binaries deciding commitment of blocks - isPlantWorking of every block and in complex mode also
+    ramp binary of every block, ordered by cycle, node index and block
+    """
+    variables = []
+    for plantsInNodes in model["periodOfTime"]:
+        for solverNode in plantsInNodes:
+            for position in range(len(solverNode["plantLimits"])):
+                variables.append(solverNode["isPlantWorking"][position])
+                if solverNode.get("rampLimits"):
+                    variables.append(solverNode["rampLimits"][position][2])
+    return variables
+
+def solveFixedCommitment(model, variables, values):
+    """
+    Fixes commitment binaries to given values and solves the model, which is then economic dispatch LP.
+    Binaries stay fixed after the solve
+
+    ----RETURNS----
+    solver status
+    """
+    for variable, value in zip(variables, values):
+        variable.SetBounds(float(value), float(value))
+    return runSolve(model)
+
+def solveWithCommitmentHint(model, variables, values = None):
+    """
+    Releases commitment binaries and solves the full model, with given commitment as hint if it is not None
+
+    ----RETURNS----
+    solver status
+    """
+    for variable in variables:
+        variable.SetBounds(0, 1)
+    if values is not None:
+        model["solver"].SetHint(variables, [float(value) for value in values])
+    return runSolve(model)
+
+def solveWithCommitmentCache(model):
+    """
+    Solves binary or complex model using commitment pattern cache ( see CommitmentCache.py). Pattern stored
+    for the same demand signature was solved for practically the same demand, it is fixed and the dispatch
+    is accepted if it is feasible ( hit). Pattern of similar demand is used as hint of the full solve,
+    which ends at relative gap config commitmentGap ( MAX_GAP by default) or at gap of the solve the pattern
+    comes from, whichever is larger ( warm). Infeasible pattern of the same signature is used the same way
+    ( fallback). Without stored pattern the model is solved as usual ( in two stages if configured). Commitment
+    of every feasible full solve is stored with its objective and best bound for next requests
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel() in binary or complex mode
+
+    ----RETURNS----
+    solver status. Cache result ( hit, warm, fallback or miss), demand distance and gap of the solve the pattern
+    comes from are stored in model["commitmentCacheStats"]
+    """
+    feasible = (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    solver = model["solver"]
+    variables = commitmentVariables(model)
+    key = commitmentKey(model["network"], model["mode"], model["enforceStrict"], len(model["periodOfTime"]))
+    match = findPattern(key, model["demandMatrix"])
+    stats = model["commitmentCacheStats"] = {"result": "miss", "distance": None, "gap": None}
+    if match is not None and len(match["pattern"]) == len(variables):
+        stats["distance"] = match["distance"]
+        stats["gap"] = (match["objective"] - match["bound"]) / max(abs(match["objective"]), 1e-9)
+        if match["distance"] == 0.0:
+            status = solveFixedCommitment(model, variables, match["pattern"])
+            if status in feasible:
+                stats["result"] = "hit"
+                commitmentCacheStatistics["hits"] += 1
+                return status
+            stats["result"] = "fallback"
+            commitmentCacheStatistics["fallbacks"] += 1
+        else:
+            stats["result"] = "warm"
+            commitmentCacheStatistics["warmStarts"] += 1
+        for variable in variables:
+            variable.SetBounds(0, 1)
+        solver.SetHint(variables, [float(value) for value in match["pattern"]])
+        status = runSolve(model, gap=max(model["config"].get("commitmentGap", MAX_GAP), stats["gap"]))
+    else:
+        commitmentCacheStatistics["misses"] += 1
+        for variable in variables:
+            # binaries may be still fixed by previous solve of the model
+            variable.SetBounds(0, 1)
+        status = solveTwoStage(model) if model["config"].get("twoStage") else solveWithCommitmentHint(model, [])
+    if status in feasible:
+        storePattern(key, model["demandMatrix"], [round(variable.solution_value()) for variable in variables],
+                     solver.Objective().Value(), solver.Objective().BestBound())
+    return status
+
+# stages of anytime solve - time limit in seconds ( None for no limit) and relative gap the stage ends at ( None
+# for default gap of solver.Solve()). Stages end at the default gap, so model solved within the first stage is solved
+# only once and ends as solveModel() without anytime, stages of harder models end by time limit with incumbent
+ANYTIME_STAGES = ((5, None), (20, None), (None, None))
+
+def solveAnytime(model, onIncumbent = None, shouldStop = None):
+    """
+    Solves binary or complex model in stages with growing time limit ( ANYTIME_STAGES or config anytimeStages).
+    Every stage starts from scratch with binaries of the best solution found so far as hint, so good solution is
+    known after the first few seconds and is only improved by later stages. Stage is skipped if gap of the best
+    solution is already within its gap. Solve ends after the stage which proves gap of the last stage, after the
+    last stage or when shouldStop() returns True. If the last stage ends without solution ( ie. stopped,
+    see runSolve()), solution of the best incumbent is loaded back to the solver
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel() in binary or complex mode
+
+    onIncumbent - called with every improving incumbent ( stage, objective, bestBound, gap and seconds since start)
+    while its solution is still in the solver, so that the caller can export its dispatch, and again whenever
+    a later stage proves lower gap of the incumbent
+
+    shouldStop - called before every stage, solve ends with the best incumbent if it returns True. Solve runner
+    of the model may stop running stage too
+
+    ----RETURNS----
+    solver status. Stages solved, incumbents and whether solve was stopped are stored in model["anytimeStats"]
+    """
+    feasible = (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    solver = model["solver"]
+    powerBase = getPowerBase(model)
+    integers = [variable for variable in solver.variables() if variable.integer()]
+    stages = model["config"].get("anytimeStages", ANYTIME_STAGES)
+    stageGaps = [pywraplp.MPSolverParameters.kDefaultRelativeMipGap if stageGap is None else stageGap
+                 for _, stageGap in stages]
+    stats = model["anytimeStats"] = {"stages": 0, "stopped": False, "incumbents": []}
+    start = time.perf_counter()
+    status = pywraplp.Solver.NOT_SOLVED
+    best, lowerBound, values, solution, gap = None, None, None, None, None
+    for stage, (timeLimit, stageGap) in enumerate(stages):
+        if shouldStop is not None and shouldStop():
+            stats["stopped"] = True
+            break
+        if gap is not None and gap <= stageGaps[stage] + 1e-9:
+            continue
+        if values is not None:
+            solver.SetHint(integers, values)
+        status = runSolve(model, timeLimit or 0, stageGap)
+        stats["stages"] = stage + 1
+        if status not in feasible:
+            if status in (pywraplp.Solver.INFEASIBLE, pywraplp.Solver.UNBOUNDED, pywraplp.Solver.MODEL_INVALID):
+                break
+            # stage ran out of time or was stopped before finding a solution
+            continue
+        objective, bound = solver.Objective().Value(), solver.Objective().BestBound()
+        # bound of every stage holds, the best of them is used for gap
+        lowerBound = bound if lowerBound is None else max(lowerBound, bound)
+        improved = best is None or objective < best - 1e-9 * max(abs(best), 1)
+        if improved:
+            best, values = objective, [variable.solution_value() for variable in integers]
+            solution = linear_solver_pb2.MPSolutionResponse()
+            solver.FillSolutionResponseProto(solution)
+        bestGap = abs(best - lowerBound) / max(abs(best), 1e-9)
+        if improved or bestGap < gap - 1e-9:
+            gap = bestGap
+            if not improved:
+                # the stage only proved lower gap, dispatch of the incumbent is exported
+                solver.LoadSolutionFromProto(solution)
+            incumbent = {
+                "stage": stage,
+                "objective": best * powerBase,
+                "bestBound": lowerBound * powerBase,
+                "gap": gap,
+                "elapsed": time.perf_counter() - start,
+            }
+            stats["incumbents"].append(incumbent)
+            if onIncumbent is not None:
+                onIncumbent(dict(incumbent))
+        if gap <= stageGaps[-1] + 1e-9:
+            break
+    solver.SetTimeLimit(0)
+    solver.SetHint([], [])
+    if solution is not None and (status not in feasible or solver.Objective().Value() > best + 1e-9 * max(abs(best), 1)):
+        # the best incumbent is loaded back, so that variables have its values
+        solver.LoadSolutionFromProto(solution)
+        status = solution.status
+    return status
+
+def solveModel(model, onIncumbent = None, shouldStop = None):
+    """
+    Solves model created by buildModel(). In binary and complex mode commitment is taken from commitment pattern cache if model was built
+    with commitmentCache, model is solved in two stages if it was built with twoStage and in anytime
+    stages if it was built with anytime ( see solveAnytime())
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel()
+
+    onIncumbent, shouldStop - passed to solveAnytime()
+
+    ----RETURNS----
+    solver status
+    """
+    if model["config"].get("anytime") and model["mode"] != "simple":
+        return solveAnytime(model, onIncumbent, shouldStop)
+    if model["config"].get("commitmentCache") and model["mode"] != "simple":
+        return solveWithCommitmentCache(model)
+    if model["config"].get("twoStage") and model["mode"] != "simple":
+        return solveTwoStage(model)
+    return runSolve(model)
+
+def updatePlantInModel(model, node, position, plant):
+    """
+    Applies changed parameters of existing block ( Pmin, Pmax, cost, ramp) to already built model,
+    by changing bounds and coefficients of its variables and constraints in every cycle. model["network"] is
+    replaced by copy with the changed block, so that keys computed from it ( commitment cache) follow the edit
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel()
+
+    node - node containing the block
+
+    position - position of block in node["plants"]
+
+    plant - block with new parameters
+    """
+    powerBase = getPowerBase(model)
+    Pmin, Pmax, cost, ramp = double(plant["Pmin"]) / powerBase, double(plant["Pmax"]) / powerBase, double(plant["cost"]), double(plant["ramp"]) / powerBase
+    objective = model["solver"].Objective()
+    for time, plantsInNodes in enumerate(model["periodOfTime"]):
+        solverNode = plantsInNodes[node["index"]]
+        variable = solverNode["plants"][position]
+        variable.SetUb(Pmax)
+        upper, lower = solverNode["plantLimits"][position]
+        if model["mode"] == "simple":
+            upper.SetUb(Pmax)
+            lower.SetLb(Pmin)
+        else:
+            upper.SetCoefficient(solverNode["isPlantWorking"][position], -Pmax)
+            lower.SetCoefficient(solverNode["isPlantWorking"][position], -Pmin)
+        if model["mode"] == "complex" and time > 0:
+            up, down, zVar = solverNode["rampLimits"][position]
+            up.SetCoefficient(zVar, ramp - Pmin)
+            up.SetUb(ramp)
+            down.SetCoefficient(zVar, Pmin - ramp)
+            down.SetLb(-ramp)
+        solverNode["plantCost"][position] = plant["cost"]
+        objective.SetCoefficient(variable, cost)
+    if model.get("network") is not None:
+        index = model["network"].plantStart[node["index"]].item() + position
+        model["network"] = replacePlant(model["network"], index, Pmin, Pmax, ramp, cost)
+    if not model["enforceStrict"]:
+        shortageCost = getShortageCost(model["periodOfTime"])
+        for short in model["shortage"]:
+            objective.SetCoefficient(short, shortageCost)
+
+def updateEdgeInModel(model, nodeIndexA, nodeIndexB, edge):
+    """
+    Applies changed parameters of existing edge ( capacity, admitance, voltages) to already built model
+    in every cycle. model["network"] is replaced by copy with the changed line
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel()
+
+    nodeIndexA, nodeIndexB - indexes of nodes connected by the edge
+
+    edge - edge with new parameters, edge["nodeA"] is node with index nodeIndexA
+    """
+    powerBase = getPowerBase(model)
+    voltageBase = model.get("scaling", {}).get("voltage", 1.0)
+    capacity = edge["capacity"] / powerBase
+    voltageA, voltageB = edge["voltageA"] / voltageBase, edge["voltageB"] / voltageBase
+    admitance = edge["admitance"] * voltageBase ** 2 / powerBase
+    for time, edgeFlowVariables in enumerate(model["edgeSolutionPeriods"]):
+        phaseVariable = model["phasePeriods"][time]
+        for src, dst, srcNodeVolt, dstNodeVolt in ((nodeIndexA, nodeIndexB, voltageA, voltageB), (nodeIndexB, nodeIndexA, voltageB, voltageA)):
+            edgeFlowDataObject = edgeFlowVariables[src][dst]
+            edgeFlowDataObject["var"].SetBounds(-capacity, capacity)
+            edgeFlowDataObject["capacity"] = capacity
+            edgeFlowDataObject["srcNodeVolt"] = srcNodeVolt
+            edgeFlowDataObject["dstNodeVolt"] = dstNodeVolt
+            coefficient = srcNodeVolt * dstNodeVolt * admitance
+            edgeFlowDataObject["equation"].SetCoefficient(phaseVariable[src], -coefficient)
+            edgeFlowDataObject["equation"].SetCoefficient(phaseVariable[dst], coefficient)
+    if model.get("network") is not None:
+        model["network"] = replaceLine(model["network"], nodeIndexA, nodeIndexB, capacity, admitance, voltageA, voltageB)
+
+def updateDemandInModel(model, node, _globalDemand):
+    """
+    Applies changed demand of the node to already built model, by changing right hand side
+    of node balance constraints in every cycle
+
+    ----ARGUMENTS----
+
+    model - model created by buildModel()
+
+    node - node with new demand
+
+    _globalDemand - system demand scaling, single value or one value per cycle
+    """
+    periods = model["demandMatrix"].shape[0]
+    column = createDemandMatrix([{"nodeName": node["nodeName"], "demand": node["demand"], "index": 0}], _globalDemand, periods)[:, 0]
+    model["demandMatrix"][:, node["index"]] = column
+    powerBase = getPowerBase(model)
+    for time, plantsInNodes in enumerate(model["periodOfTime"]):
+        demand = column[time].item() / powerBase
+        plantsInNodes[node["index"]]["demand"] = demand
+        plantsInNodes[node["index"]]["balance"].SetBounds(demand, demand)
+
+
+def exportNodesJSON( nodes, time, demand, demandMatrix = None):
     """
     Exports  node and their data as JSON structure
 
@@ -797,12 +1828,17 @@ def exportNodesJSON( nodes, time, demand):
 
     time - cyclew for which data is exported
 
-    demand - array of demand by cycle
+    demand - system demand scaling, used only if demandMatrix is not given
+
+    demandMatrix - demand matrix from createDemandMatrix()
 
     ----RETURNS----
 
     JSON structure of nodes
     """
+    if demandMatrix is None:
+        demandMatrix = createDemandMatrix(nodes, demand, time + 1)
+    periodDemand = demandMatrix[time].tolist()
     JSONNode = []
     index = 0
     for node in nodes:
@@ -811,13 +1847,13 @@ def exportNodesJSON( nodes, time, demand):
             "data": {
                 "id": node["nodeName"],
                 "type": "node",
-                "demand": round(node["demand"][time] * demand[0],2)
+                "demand": round(periodDemand[node["index"]],2)
             }
         }
         JSONNode.append(nodeObject)
     return JSONNode
 
-def exportPlantsJSON(plantsInNodes, nodes, mode):
+def exportPlantsJSON(plantsInNodes, nodes, mode, powerBase = 1):
     """
     Exports  powerplants and their data as JSON structure
 
@@ -828,6 +1864,8 @@ def exportPlantsJSON(plantsInNodes, nodes, mode):
 
     mode - either binary, simple or complex
 
+    powerBase - base power of per unit model from getPowerBase(), generation is exported in MW
+
     ----RETURNS----
 
     JSON structure of powerplants
@@ -842,7 +1880,7 @@ def exportPlantsJSON(plantsInNodes, nodes, mode):
                 "id": plant["blockName"],
                 "parent": node["nodeName"],
                 "type": "node",
-                "value":  round(plantsInNodes[node["index"]]["plants"][pIndex].solution_value(),2),
+                "value":  round(plantsInNodes[node["index"]]["plants"][pIndex].solution_value() * powerBase,2),
                 "isWorking": 1,
                 }
             }
@@ -855,7 +1893,7 @@ def exportPlantsJSON(plantsInNodes, nodes, mode):
 
 
 
-def exportEdgeJSON(edgeInNodes):
+def exportEdgeJSON(edgeInNodes, powerBase = 1):
     """
     Exports edges and their data as JSON structure
 
@@ -863,18 +1901,23 @@ def exportEdgeJSON(edgeInNodes):
 
     edgeInNodes - solver variables for edges, 
 
+    powerBase - base power of per unit model from getPowerBase(), flows are exported in MW
+
     ----RETURNS----
 
     JSON structure of edges
     """
     validEdges = []
+    validNames = set()
     JSONEdge = []
     index = 0
     for flow in edgeInNodes:
-        for edge in flow:
-            if edge != 0 :
-                if isPresent(edgeInNodes, edge, validEdges) == False:
-                    validEdges.append(edge)
+        for b in sorted(flow):
+            edge = flow[b]
+            # the same line in opposite direction was already exported
+            if edge["nodeB"] + edge["nodeA"] not in validNames:
+                validEdges.append(edge)
+                validNames.add(edge["nodeA"] + edge["nodeB"])
     for edge in validEdges:
         edgeObject = {
             "group": "edges",
@@ -882,7 +1925,7 @@ def exportEdgeJSON(edgeInNodes):
                 "id": edge["nodeA"] + edge["nodeB"],
                 "source": edge["nodeA"],
                 "target": edge["nodeB"],
-                "value": round(edge["var"].solution_value(),2),
+                "value": round(edge["var"].solution_value() * powerBase,2),
                 "percentage": round(abs(edge["var"].solution_value()/edge["capacity"])*100, 2)
                 }
             }
@@ -897,12 +1940,11 @@ def isPresent(edges, edgeToCheck, edgesToSearch):
     if len(edgesToSearch) == 0:
         return False
     for flow in edges:
-        for edge in flow:
-            if edge != 0:
-                for ee in edgesToSearch:
-                    name = ee["nodeA"] + ee["nodeB"]
-                    targetName = edgeToCheck["nodeB"] + edgeToCheck["nodeA"]
-                    if targetName == name:
-                        return True          
+        for edge in flow.values():
+            for ee in edgesToSearch:
+                name = ee["nodeA"] + ee["nodeB"]
+                targetName = edgeToCheck["nodeB"] + edgeToCheck["nodeA"]
+                if targetName == name:
+                    return True
     return False
 
@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver import pywraplp
+from ortools.linear_solver.python import pywrap_model_builder_helper
+import ortools
+
+from GridRecords import scaleNetwork
+from ScenarioCache import CACHE_DIRECTORY
+from SolverStats import modelSize
+
+
+MODEL_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "models")
+MODEL_CACHE_VERSION = 1
+EXPORT_FORMATS = {
+    ".mps": "mps",
+    ".lp": "lp",
+    ".pb": "proto",
+    ".proto": "proto",
+}
+
+# entries of toolConfig read by buildModel() with its defaults, other entries ( time limit, solve strategies) do not
+# change the built model and are not part of the cache key
+MODEL_CONFIG_DEFAULTS = {
+    "mode": None,
+    "enforceStrict": None,
+    "timeMax": None,
+    "builder": "expressions",
+    "perUnit": False,
+}
+
+modelCacheStatistics = {
+    "hits": 0,
+    "misses": 0,
+}
+
+
+def exportModel(solver: pywraplp.Solver, path, format = None):
+    """
+    Writes model of the solver to file, for tuning solver parameters offline or solving it with other tools
+
+    ----ARGUMENTS----
+
+    solver - solver with built model
+
+    path - output file
+
+    format - mps, lp or proto ( serialized MPModelProto), by default taken from extension of the path
+    """
+    if format is None:
+        format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    content = exportModelContent(solver, format)
+    with open(path, 'wb' if format == "proto" else 'w') as file:
+        file.write(content)
+
+
+def exportModelContent(solver: pywraplp.Solver, format):
+    """
+    Returns model of the solver as MPS or LP text, or serialized MPModelProto bytes for proto format
+    """
+    if format == "mps":
+        return solver.ExportModelAsMpsFormat(False, False)
+    if format == "lp":
+        return solver.ExportModelAsLpFormat(False)
+    if format == "proto":
+        proto = linear_solver_pb2.MPModelProto()
+        solver.ExportModelToProto(proto)
+        return proto.SerializeToString()
+    raise ValueError("unknown model format %s, use mps, lp or proto" % format)
+
+
+def importModel(path, format = None, solverName = 'SCIP'):
+    """
+    Reads model file into new solver - file written by exportModel() in mps or proto format, or by saveModel().
+    LP files written by exportModel() cannot be read back by OR-Tools
+
+    ----ARGUMENTS----
+
+    path - model file
+
+    format - mps, proto or saved ( file of saveModel()), by default taken from extension of the path
+
+    solverName - solver the model is loaded into
+
+    ----RETURNS----
+    solver with the model
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if format is None:
+        format = "saved" if extension == ".npz" else EXPORT_FORMATS.get(extension)
+    if format == "saved":
+        return loadModel(path, None, solverName)["solver"]
+    if format == "proto":
+        with open(path, 'rb') as file:
+            proto = linear_solver_pb2.MPModelProto.FromString(file.read())
+    elif format == "mps":
+        helper = pywrap_model_builder_helper.ModelBuilderHelper()
+        if not helper.import_from_mps_file(path):
+            raise ValueError("cannot read MPS file %s" % path)
+        proto = linear_solver_pb2.MPModelProto(maximize=helper.maximize(), objective_offset=helper.objective_offset())
+        for index in range(helper.num_variables()):
+            proto.variable.add(
+                name=helper.var_name(index), lower_bound=helper.var_lower_bound(index), upper_bound=helper.var_upper_bound(index),
+                objective_coefficient=helper.var_objective_coefficient(index), is_integer=helper.var_is_integral(index))
+        for index in range(helper.num_constraints()):
+            proto.constraint.add(
+                name=helper.constraint_name(index), lower_bound=helper.constraint_lower_bound(index), upper_bound=helper.constraint_upper_bound(index),
+                var_index=helper.constraint_var_indices(index), coefficient=helper.constraint_coefficients(index))
+    else:
+        raise ValueError("cannot read model format %s, use mps, proto or saved model ( .npz)" % format)
+    solver = pywraplp.Solver.CreateSolver(solverName)
+    error = solver.LoadModelFromProto(proto)
+    if error:
+        raise ValueError("cannot load model from %s: %s" % (path, error))
+    return solver
+
+
+def modelKey(nodes, edges, toolConfig, demandMatrix):
+    """
+    Computes key identifying model built from given network, configuration and demand. Only entries of toolConfig
+    read by buildModel() ( MODEL_CONFIG_DEFAULTS) are part of the key
+    """
+    buildConfig = {key: toolConfig.get(key, default) for key, default in MODEL_CONFIG_DEFAULTS.items()}
+    digest = hashlib.sha256()
+    digest.update(("%d|%s" % (MODEL_CACHE_VERSION, ortools.__version__)).encode())
+    digest.update(json.dumps([nodes, edges, buildConfig], sort_keys=True, default=float).encode())
+    digest.update(np.ascontiguousarray(demandMatrix, dtype=np.float64).tobytes())
+    digest.update(str(demandMatrix.shape).encode())
+    return digest.hexdigest()[:32]
+
+
+def modelLayout(model):
+    """
+    Describes model dictionary created by buildModel() with indexes of solver variables and constraints
+    instead of the objects, so that it can be stored next to the model proto and bound again after loading
+    """
+    def plantLayout(solverNode):
+        node = {
+            "nodeName": solverNode["nodeName"],
+            "demand": solverNode["demand"],
+            "plantCost": solverNode["plantCost"],
+            "plants": [plant.index() for plant in solverNode["plants"]],
+            "plantLimits": [[upper.index(), lower.index()] for upper, lower in solverNode["plantLimits"]],
+            "balance": solverNode["balance"].index(),
+        }
+        if "isPlantWorking" in solverNode:
+            node["isPlantWorking"] = [working.index() for working in solverNode["isPlantWorking"]]
+        if "rampLimits" in solverNode:
+            node["rampLimits"] = [[up.index(), down.index(), zVar.index()] for up, down, zVar in solverNode["rampLimits"]]
+        return node
+
+    def edgeLayout(edgeFlowVariables):
+        edges = []
+        for a, row in enumerate(edgeFlowVariables):
+            for b, edge in sorted(row.items()):
+                edges.append({
+                    "a": a,
+                    "b": b,
+                    "srcNodeVolt": edge["srcNodeVolt"],
+                    "dstNodeVolt": edge["dstNodeVolt"],
+                    "var": edge["var"].index(),
+                    "equation": edge["equation"].index(),
+                    "nodeA": edge["nodeA"],
+                    "nodeB": edge["nodeB"],
+                    "capacity": edge["capacity"],
+                })
+        return edges
+
+    return {
+        "mode": model["mode"],
+        "enforceStrict": model["enforceStrict"],
+        "config": model["config"],
+        "nodeCount": len(model["phasePeriods"][0]) if model["phasePeriods"] else 0,
+        "periodOfTime": [[plantLayout(solverNode) for solverNode in plantsInNodes] for plantsInNodes in model["periodOfTime"]],
+        "edgeSolutionPeriods": [edgeLayout(edgeFlowVariables) for edgeFlowVariables in model["edgeSolutionPeriods"]],
+        "phasePeriods": [[phase.index() for phase in phaseVariable] for phaseVariable in model["phasePeriods"]],
+        "shortage": [short.index() for short in model["shortage"]],
+        "scaling": model.get("scaling", {"power": 1.0, "voltage": 1.0}),
+        "timings": model.get("timings", {}),
+    }
+
+
+def bindLayout(solver: pywraplp.Solver, layout, demandMatrix, network = None):
+    """
+    Recreates model dictionary in the format of buildModel() from layout created by modelLayout(),
+    using variables and constraints of the solver the stored model was loaded into. Network ( in MW) is scaled
+    to per unit system of the stored model, as buildModel() stores it
+    """
+    scaling = layout["scaling"]
+    if network is not None and (scaling["power"] != 1.0 or scaling["voltage"] != 1.0):
+        network = scaleNetwork(network, scaling["power"], scaling["voltage"])
+    variables = solver.variables()
+    constraints = solver.constraints()
+
+    def bindNode(node):
+        solverNode = {
+            "nodeName": node["nodeName"],
+            "demand": node["demand"],
+            "plantCost": node["plantCost"],
+            "plants": [variables[index] for index in node["plants"]],
+            "plantLimits": [(constraints[upper], constraints[lower]) for upper, lower in node["plantLimits"]],
+            "balance": constraints[node["balance"]],
+        }
+        if "isPlantWorking" in node:
+            solverNode["isPlantWorking"] = [variables[index] for index in node["isPlantWorking"]]
+        if "rampLimits" in node:
+            solverNode["rampLimits"] = [(constraints[up], constraints[down], variables[zVar]) for up, down, zVar in node["rampLimits"]]
+        return solverNode
+
+    def bindEdges(edges):
+        edgeFlowVariables = [{} for node in range(layout["nodeCount"])]
+        for edge in edges:
+            edgeFlowVariables[edge["a"]][edge["b"]] = {
+                "srcNodeVolt": edge["srcNodeVolt"],
+                "dstNodeVolt": edge["dstNodeVolt"],
+                "var": variables[edge["var"]],
+                "nodeA": edge["nodeA"],
+                "nodeB": edge["nodeB"],
+                "capacity": edge["capacity"],
+                "equation": constraints[edge["equation"]],
+            }
+        return edgeFlowVariables
+
+    return {
+        "solver": solver,
+        "mode": layout["mode"],
+        "enforceStrict": layout["enforceStrict"],
+        "config": layout["config"],
+        "periodOfTime": [[bindNode(node) for node in plantsInNodes] for plantsInNodes in layout["periodOfTime"]],
+        "edgeSolutionPeriods": [bindEdges(edges) for edges in layout["edgeSolutionPeriods"]],
+        "phasePeriods": [[variables[index] for index in phaseVariable] for phaseVariable in layout["phasePeriods"]],
+        "shortage": [variables[index] for index in layout["shortage"]],
+        "demandMatrix": demandMatrix,
+        "network": network,
+        "scaling": layout["scaling"],
+        "timings": layout["timings"],
+        "size": modelSize(solver),
+    }
+
+
+def saveModel(path, model):
+    """
+    Writes model created by buildModel() to single .npz file - serialized model proto, layout of variables
+    and constraints and demand matrix. File is written to temporary file first, so that readers never see partial file
+    """
+    proto = exportModelContent(model["solver"], "proto")
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, 'wb') as file:
+        np.savez(
+            file,
+            proto=np.frombuffer(proto, dtype=np.uint8),
+            layout=np.array(json.dumps(modelLayout(model)), dtype=np.str_),
+            demandMatrix=model["demandMatrix"],
+        )
+    os.replace(temporaryPath, path)
+
+
+def loadModel(path, network = None, solverName = 'SCIP'):
+    """
+    Reads model written by saveModel() into new solver, without building it in python
+
+    ----ARGUMENTS----
+
+    path - file written by saveModel()
+
+    network - Network the model was built from ( in MW), stored in returned model for later updates
+
+    solverName - solver the model is loaded into
+
+    ----RETURNS----
+
+    model dictionary in the format of buildModel()
+    """
+    with np.load(path, allow_pickle=False) as data:
+        proto = linear_solver_pb2.MPModelProto()
+        proto.ParseFromString(data["proto"].tobytes())
+        layout = json.loads(str(data["layout"]))
+        demandMatrix = np.array(data["demandMatrix"])
+    solver = pywraplp.Solver.CreateSolver(solverName)
+    error = solver.LoadModelFromProto(proto)
+    if error:
+        raise ValueError("cannot load model from %s: %s" % (path, error))
+    return bindLayout(solver, layout, demandMatrix, network)
+
+
+def loadModelCached(nodes, edges, toolConfig, demandMatrix, buildFunction, network = None, cacheDirectory = MODEL_CACHE_DIRECTORY):
+    """
+    Returns model for given network, configuration and demand from on-disk model cache, or builds it with
+    buildFunction() and stores it in the cache. Cache file which cannot be read is treated as missing
+
+    ----ARGUMENTS----
+
+    nodes, edges, toolConfig, demandMatrix - data model is built from, used as cache key
+
+    buildFunction - function without arguments building the model, ie. lambda calling buildModel()
+
+    network - Network the model is built from, stored in loaded model
+
+    cacheDirectory - directory for cache files
+
+    ----RETURNS----
+
+    model dictionary in the format of buildModel()
+    """
+    path = os.path.join(cacheDirectory, "model-%s.npz" % modelKey(nodes, edges, toolConfig, demandMatrix))
+    if os.path.exists(path):
+        try:
+            model = loadModel(path, network)
+            # stored model may come from request with other solve options
+            model["config"] = dict(toolConfig)
+            modelCacheStatistics["hits"] += 1
+            return model
+        except (OSError, ValueError, KeyError, IndexError):
+            pass
+    modelCacheStatistics["misses"] += 1
+    model = buildFunction()
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        saveModel(path, model)
+    except OSError:
+        pass
+    return model
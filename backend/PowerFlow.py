@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def findIslands(network):
+    """
+    Returns island number of every node of the network ( nodes connected by lines have the same number)
+    """
+    start = network.adjacency["start"].tolist()
+    neighbour = network.adjacency["node"].tolist()
+    island = [-1] * len(network.nodeNames)
+    count = 0
+    for first in range(len(island)):
+        if island[first] != -1:
+            continue
+        island[first] = count
+        stack = [first]
+        while stack:
+            node = stack.pop()
+            for other in neighbour[start[node]:start[node + 1]]:
+                if island[other] == -1:
+                    island[other] = count
+                    stack.append(other)
+        count += 1
+    return np.array(island, dtype=np.int32)
+
+
+def createSusceptanceMatrix(network):
+    """
+    Creates DC power flow matrices of the network. Flow of line l from nodeA to nodeB is
+    susceptance[l] * ( phase[nodeA] - phase[nodeB]), with susceptance voltageA * voltageB * admitance -
+    the same as in flow equations of the model. Phase of the first node of every island ( its slack) is fixed
+
+    ----ARGUMENTS----
+
+    network - Network from createNetwork()
+
+    ----RETURNS----
+
+    dictionary with susceptance of lines, nodal susceptance matrix, slack node of every node
+    and mask of nodes with free phase
+    """
+    nodeCount = len(network.nodeNames)
+    lines = network.lines
+    susceptance = lines.voltageA * lines.voltageB * lines.admitance
+    lineCount = len(susceptance)
+
+    incidence = np.zeros((lineCount, nodeCount))
+    incidence[np.arange(lineCount), lines.nodeA] = 1.0
+    incidence[np.arange(lineCount), lines.nodeB] = -1.0
+    nodal = incidence.T @ (susceptance[:, None] * incidence)
+
+    island = findIslands(network)
+    firstNodes = np.unique(island, return_index=True)[1]
+    free = np.ones(nodeCount, dtype=bool)
+    free[firstNodes] = False
+    return {
+        "susceptance": susceptance,
+        "nodal": nodal,
+        "slack": firstNodes[island],
+        "free": free,
+    }
+
+
+def dcPowerFlow(network, injections, matrices = None):
+    """
+    Computes line flows of DC power flow for given nodal injections. Imbalance of every island is taken
+    by its slack node
+
+    ----ARGUMENTS----
+
+    network - Network from createNetwork()
+
+    injections - generation minus demand of every node, array of shape ( nodes) or ( periods, nodes)
+
+    matrices - result of createSusceptanceMatrix(), computed if not given
+
+    ----RETURNS----
+
+    flows of lines from nodeA to nodeB, array of shape ( lines) or ( periods, lines)
+    """
+    if matrices is None:
+        matrices = createSusceptanceMatrix(network)
+    free = matrices["free"]
+    injections = np.asarray(injections, dtype=np.float64)
+    phase = np.zeros(injections.shape)
+    if free.any():
+        phase[..., free] = np.linalg.solve(matrices["nodal"][np.ix_(free, free)], injections[..., free].T).T
+    lines = network.lines
+    return matrices["susceptance"] * (phase[..., lines.nodeA] - phase[..., lines.nodeB])
@@ -0,0 +1,92 @@
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver import pywraplp
+
+from SolverStats import STATUS_NAMES
+
+
+def createPricingSolver(model):
+    """
+    Copies solved model into GLOP as linear program. Integer variables ( commitment and ramp binaries) are fixed
+    to their solution values, so duals of the copy are prices of the dispatch with the commitment found by the solver
+
+    ----ARGUMENTS----
+
+    model - solved model created by buildModel()
+
+    ----RETURNS----
+
+    GLOP solver with the copy, variables and constraints have the same indexes as in the model
+    """
+    solver = model["solver"]
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    variables = solver.variables()
+    for index, variable in enumerate(proto.variable):
+        if variable.is_integer:
+            value = float(round(variables[index].solution_value()))
+            variable.lower_bound = value
+            variable.upper_bound = value
+            variable.is_integer = False
+    pricing = pywraplp.Solver.CreateSolver('GLOP')
+    error = pricing.LoadModelFromProto(proto)
+    if error:
+        raise ValueError("cannot copy model to LP solver: %s" % error)
+    return pricing
+
+
+def computePrices(model):
+    """
+    Computes locational marginal prices ( duals of node balance constraints) and reduced costs of line limits
+    in every cycle of solved model from one LP solve. In binary and complex mode binaries are fixed first.
+    Prices are cost of one more MW of demand and reduced costs change of the objective for one more MW
+    of line capacity ( negative for congested lines), both are the same in per unit and MW models
+
+    ----ARGUMENTS----
+
+    model - solved model created by buildModel()
+
+    ----RETURNS----
+
+    dictionary with status of the LP solve and list of periods, each with node prices and line reduced costs
+    """
+    pricing = createPricingSolver(model)
+    status = pricing.Solve()
+    if status != pywraplp.Solver.OPTIMAL:
+        raise ValueError("prices are not available, LP with fixed commitment is %s" % STATUS_NAMES.get(status, str(status)))
+    constraints = pricing.constraints()
+    variables = pricing.variables()
+    nodeNames = None
+    periods = []
+    for time, plantsInNodes in enumerate(model["periodOfTime"]):
+        edgeFlowVariables = model["edgeSolutionPeriods"][time]
+        nodePrices = [
+            {
+                "nodeName": solverNode["nodeName"],
+                "price": constraints[solverNode["balance"].index()].dual_value(),
+            }
+            for solverNode in plantsInNodes
+        ]
+        if nodeNames is None:
+            nodeNames = [solverNode["nodeName"] for solverNode in plantsInNodes]
+        lineCosts = []
+        for a, row in enumerate(edgeFlowVariables):
+            for b, edge in sorted(row.items()):
+                if b < a:
+                    continue
+                # capacity bounds flow a->b from above and flow b->a from below, both move with capacity
+                reducedCost = 0.0
+                for flow in (edge["var"], edgeFlowVariables[b][a]["var"]):
+                    copy = variables[flow.index()]
+                    if copy.solution_value() >= copy.ub() - 1e-9:
+                        reducedCost += copy.reduced_cost()
+                    elif copy.solution_value() <= copy.lb() + 1e-9:
+                        reducedCost -= copy.reduced_cost()
+                lineCosts.append({
+                    "line": nodeNames[a] + nodeNames[b],
+                    "reducedCost": reducedCost,
+                })
+        periods.append({"period": time, "nodes": nodePrices, "lines": lineCosts})
+    return {
+        "status": STATUS_NAMES.get(status, str(status)),
+        "periods": periods,
+    }
@@ -1,6 +1,10 @@
 import json
+import sys
 from ortools.linear_solver import pywraplp
-from ModelFunctions import createBinaryConstraints, createComplexConstraints, createEdgeFlowVariables, createMinimizeFunction, createMinimizeFunctionBinary, createMinimizeFunctionDemand, createNodeVariablesBinary, createNodeVariablesSimple, createPhaseVariables, createSimpleConstraints, exportEdgeJSON, exportNodesJSON, exportPlantsJSON, loadEdges, loadNode, loadPlants
+from ModelFunctions import buildModel, createDemandMatrix, exportEdgeJSON, exportNodesJSON, exportPlantsJSON, loadEdges, loadNode, loadPlants
+from ScenarioCache import loadScenarioCached
+from ModelStore import exportModel
+from GridRecords import networkFromScenario
 
 _globalDemand = [
     16000
@@ -8,65 +12,26 @@ _globalDemand = [
 
 
 def main():
-    nodes = loadNode("Scenario#3/Demand.txt")
-    edges = loadEdges("Scenario#3/Lines.txt")
-    loadPlants(nodes, "Scenario#3/PowerPlants.txt")
+    scenario = loadScenarioCached("Scenario#3")
+    network = networkFromScenario(scenario)
+    nodes = network.nodeDicts(scenario["demand"])
+    edges = network.edgeDicts()
     
 
     
-    periodOfTime = []
-    time = 0
     mode = "binary"
-    shortage = []
-    overflow = []
     enforceStrict = True
-    solver = pywraplp.Solver.CreateSolver('SCIP')
     TimeMax = 1
-    zvar = []
-
-    if mode == "simple":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesSimple(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges)
-            createSimpleConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict)
-            time +=1
-
-
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage, overflow,)    
-    
-    if mode == "binary":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesBinary(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges)
-            createBinaryConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict)
-            time +=1
-
-
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunctionBinary(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage, overflow,)           
-    
-    if mode == "complex":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesBinary(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges)
-            createComplexConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict, zvar)
-            time +=1
-
-
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage, overflow,)   
-
-    solver.Minimize(sum(sumOfGeneration))
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    demandMatrix = createDemandMatrix(nodes, _globalDemand, TimeMax)
+    # coefficient builder sets the same objective createMinimizeFunctionBinary() did, without extra cost variable per block
+    toolConfig = {"mode": mode, "enforceStrict": enforceStrict, "timeMax": TimeMax, "builder": "coefficients"}
+    model = buildModel(solver, nodes, edges, toolConfig, _globalDemand, demandMatrix, network)
+    periodOfTime = model["periodOfTime"]
+
+    # optional path of .mps, .lp or .pb file the built model is exported to
+    if len(sys.argv) > 1:
+        exportModel(solver, sys.argv[1])
 
     status = solver.Solve()
 
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import numpy as np
+
+from DemandStore import DEMAND_NODES_FILE, DEMAND_STORE_FILE
+from ScenarioLoader import DEMAND_FILE, LINES_FILE, PLANTS_FILE, loadScenario
+from ScenarioPaths import CACHE_DIRECTORY
+
+
+SCENARIO_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "scenarios")
+CACHE_VERSION = 1
+
+_PLANT_NUMBERS = ["node", "Pmin", "Pmax", "cost", "ramp"]
+_PLANT_NAMES = ["plantName", "blockName"]
+_LINE_NUMBERS = ["nodeA", "nodeB", "capacity", "admitance", "voltageA", "voltageB"]
+_ADJACENCY = ["start", "node", "line"]
+
+cacheStatistics = {
+    "hits": 0,
+    "misses": 0,
+}
+
+
+def scenarioKey(directory, start = 0, periods = None):
+    """
+    Computes key identifying parsed content of scenario directory. Text files are hashed by content,
+    demand store ( which may be very large) by its size and modification time.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory
+
+    start, periods - window of demand periods, as in loadScenario()
+
+    ----RETURNS----
+
+    hex string key
+    """
+    digest = hashlib.sha256()
+    digest.update(("%d|%d|%s|%s" % (CACHE_VERSION, start, periods, np.__version__)).encode())
+    for fileName in [DEMAND_FILE, LINES_FILE, PLANTS_FILE, DEMAND_NODES_FILE]:
+        path = os.path.join(directory, fileName)
+        digest.update(fileName.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    storePath = os.path.join(directory, DEMAND_STORE_FILE)
+    if os.path.exists(storePath):
+        status = os.stat(storePath)
+        digest.update(("%s|%d|%d" % (DEMAND_STORE_FILE, status.st_size, status.st_mtime_ns)).encode())
+    return digest.hexdigest()[:32]
+
+
+def saveScenario(path, scenario):
+    """
+    Writes parsed scenario to single uncompressed .npz file. All columns are stored as typed arrays,
+    names as unicode arrays, so the file can be read back without pickle.
+    """
+    arrays = {
+        "nodeNames": np.array(scenario["nodeNames"], dtype=np.str_),
+        "demand": scenario["demand"],
+    }
+    for key in _PLANT_NUMBERS:
+        arrays["plants_" + key] = scenario["plants"][key]
+    for key in _PLANT_NAMES:
+        arrays["plants_" + key] = np.array(scenario["plants"][key], dtype=np.str_)
+    for key in _LINE_NUMBERS:
+        arrays["lines_" + key] = scenario["lines"][key]
+    for key in _ADJACENCY:
+        arrays["adjacency_" + key] = scenario["adjacency"][key]
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(temporaryPath, path)
+
+
+def readScenario(path):
+    """
+    Reads scenario written by saveScenario()
+
+    ----RETURNS----
+
+    scenario dictionary in the same format as loadScenario()
+    """
+    with np.load(path, allow_pickle=False) as data:
+        nodeNames = data["nodeNames"].tolist()
+        scenario = {
+            "nodeNames": nodeNames,
+            "nodeIndex": {name: index for index, name in enumerate(nodeNames)},
+            "demand": data["demand"],
+            "plants": {key: data["plants_" + key] for key in _PLANT_NUMBERS},
+            "lines": {key: data["lines_" + key] for key in _LINE_NUMBERS},
+            "adjacency": {key: data["adjacency_" + key] for key in _ADJACENCY},
+        }
+        for key in _PLANT_NAMES:
+            scenario["plants"][key] = data["plants_" + key].tolist()
+    return scenario
+
+
+def loadScenarioCached(directory, start = 0, periods = None, cacheDirectory = SCENARIO_CACHE_DIRECTORY):
+    """
+    Same as loadScenario(), but parsed scenario is stored on disk and reused as long as scenario
+    files are not changed. Cache files are kept in cache directory of the application, nothing is written
+    to the scenario directory. Cache file which cannot be read is treated as missing.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory, ie. "Scenario#3"
+
+    start, periods - window of demand periods, as in loadScenario()
+
+    cacheDirectory - directory for cache files
+
+    ----RETURNS----
+
+    scenario dictionary in the same format as loadScenario()
+    """
+    path = os.path.join(cacheDirectory, "scenario-%s.npz" % scenarioKey(directory, start, periods))
+    if os.path.exists(path):
+        try:
+            scenario = readScenario(path)
+            cacheStatistics["hits"] += 1
+            return scenario
+        except (OSError, ValueError, KeyError):
+            pass
+    cacheStatistics["misses"] += 1
+    scenario = loadScenario(directory, start, periods)
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        saveScenario(path, scenario)
+    except OSError:
+        # read only cache directory - scenario is still returned, just not cached
+        pass
+    return scenario
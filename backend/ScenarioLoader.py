@@ -0,0 +1,255 @@
+import os
+import numpy as np
+
+from ModelFunctions import createEdge, createNode, createPlants
+from DemandStore import hasDemandStore, loadDemandWindow
+from GridRecords import createAdjacencyIndex
+
+
+DEMAND_FILE = "Demand.txt"
+LINES_FILE = "Lines.txt"
+PLANTS_FILE = "PowerPlants.txt"
+
+DEFAULT_COST = 1
+DEFAULT_RAMP = 20
+
+
+class ScenarioFormatError(ValueError):
+    """
+    Raised when scenario file cannot be parsed. Carries file path and line number ( counted from 1)
+    of the offending line so that broken input can be fixed without guessing.
+    """
+    def __init__(self, path, lineNumber, message):
+        self.path = path
+        self.lineNumber = lineNumber
+        self.message = message
+        super().__init__("%s:%d: %s" % (path, lineNumber, message))
+
+
+def _readRows(path, minFields, maxFields):
+    """
+    Reads whole file at once and splits it into rows of comma separated fields.
+    Empty lines are skipped, but line numbers of remaining rows are kept for error reporting.
+
+    ----ARGUMENTS----
+
+    path - file to read
+
+    minFields, maxFields - allowed number of fields in each row
+
+    ----RETURNS----
+
+    list of rows ( each row is list of fields) and list of their line numbers
+    """
+    with open(path, 'r') as file:
+        lines = file.read().splitlines()
+    rows = []
+    lineNumbers = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        fields = line.split(",")
+        if len(fields) < minFields or len(fields) > maxFields:
+            if minFields == maxFields:
+                expected = "%d" % minFields
+            else:
+                expected = "%d-%d" % (minFields, maxFields)
+            raise ScenarioFormatError(path, number, "expected %s fields, got %d" % (expected, len(fields)))
+        rows.append(fields)
+        lineNumbers.append(number)
+    return rows, lineNumbers
+
+
+def _toArray(path, values, lineNumbers, columnName):
+    """
+    Converts whole column of strings to float array in one call. Only if conversion fails
+    the column is scanned again to find line that caused the error.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        for value, number in zip(values, lineNumbers):
+            try:
+                float(value)
+            except ValueError:
+                raise ScenarioFormatError(path, number, "%s is not a number: %r" % (columnName, value))
+        raise
+
+
+def _lookupNodes(path, names, nodeIndex, lineNumbers):
+    """
+    Translates node names to node indexes using name -> index dictionary.
+    """
+    indexes = np.empty(len(names), dtype=np.int32)
+    for position, name in enumerate(names):
+        index = nodeIndex.get(name)
+        if index is None:
+            index = nodeIndex.get(name.strip())
+        if index is None:
+            raise ScenarioFormatError(path, lineNumbers[position], "unknown node %r" % name)
+        indexes[position] = index
+    return indexes
+
+
+def loadDemandFile(path):
+    """
+    Loads Demand.txt file. Each line has format: nodeName,d0 d1 d2 ... where dX is demand
+    in period X separated by spaces. Every node needs to have the same number of periods.
+
+    ----ARGUMENTS----
+
+    path - path to Demand.txt file
+
+    ----RETURNS----
+
+    list of node names, dictionary name -> index and demand array of shape ( periods, nodes)
+    """
+    rows, lineNumbers = _readRows(path, 2, 2)
+    nodeNames = [row[0].strip() for row in rows]
+    nodeIndex = {}
+    for index, name in enumerate(nodeNames):
+        if name in nodeIndex:
+            raise ScenarioFormatError(path, lineNumbers[index], "duplicated node %r" % name)
+        nodeIndex[name] = index
+
+    profiles = [row[1].split() for row in rows]
+    periods = len(profiles[0]) if profiles else 0
+    for profile, number in zip(profiles, lineNumbers):
+        if len(profile) != periods:
+            raise ScenarioFormatError(path, number, "expected %d demand periods, got %d" % (periods, len(profile)))
+    try:
+        demand = np.array(" ".join(row[1] for row in rows).split(), dtype=np.float64)
+    except ValueError:
+        for profile, number in zip(profiles, lineNumbers):
+            _toArray(path, profile, [number] * len(profile), "demand")
+        raise
+    demand = demand.reshape(len(rows), periods)
+    return nodeNames, nodeIndex, np.ascontiguousarray(demand.T)
+
+
+def loadLinesFile(path, nodeIndex):
+    """
+    Loads Lines.txt file. Each line has format: nodeA,nodeB,capacity,admitance,voltageA,voltageB
+
+    ----ARGUMENTS----
+
+    path - path to Lines.txt file
+
+    nodeIndex - dictionary node name -> node index
+
+    ----RETURNS----
+
+    dictionary of typed columns: nodeA, nodeB ( node indexes), capacity, admitance, voltageA, voltageB
+    """
+    rows, lineNumbers = _readRows(path, 6, 6)
+    columns = list(zip(*rows)) if rows else [()] * 6
+    return {
+        "nodeA": _lookupNodes(path, columns[0], nodeIndex, lineNumbers),
+        "nodeB": _lookupNodes(path, columns[1], nodeIndex, lineNumbers),
+        "capacity": _toArray(path, columns[2], lineNumbers, "capacity"),
+        "admitance": _toArray(path, columns[3], lineNumbers, "admitance"),
+        "voltageA": _toArray(path, columns[4], lineNumbers, "voltageA"),
+        "voltageB": _toArray(path, columns[5], lineNumbers, "voltageB"),
+    }
+
+
+def loadPlantsFile(path, nodeIndex):
+    """
+    Loads PowerPlants.txt file. Each line has format: node,plantName,blockName,Pmin,Pmax[,cost[,ramp]]
+    Missing cost and ramp are set to the same defaults as in createPlants()
+
+    ----ARGUMENTS----
+
+    path - path to PowerPlants.txt file
+
+    nodeIndex - dictionary node name -> node index
+
+    ----RETURNS----
+
+    dictionary of typed columns: node ( node index), plantName, blockName, Pmin, Pmax, cost, ramp
+    """
+    rows, lineNumbers = _readRows(path, 5, 7)
+    cost = [row[5] if len(row) > 5 else DEFAULT_COST for row in rows]
+    ramp = [row[6] if len(row) > 6 else DEFAULT_RAMP for row in rows]
+    columns = list(zip(*[row[:5] for row in rows])) if rows else [()] * 5
+    return {
+        "node": _lookupNodes(path, columns[0], nodeIndex, lineNumbers),
+        "plantName": [name.strip() for name in columns[1]],
+        "blockName": [name.strip() for name in columns[2]],
+        "Pmin": _toArray(path, columns[3], lineNumbers, "Pmin"),
+        "Pmax": _toArray(path, columns[4], lineNumbers, "Pmax"),
+        "cost": _toArray(path, cost, lineNumbers, "cost"),
+        "ramp": _toArray(path, ramp, lineNumbers, "ramp"),
+    }
+
+
+def loadScenario(directory, start = 0, periods = None):
+    """
+    Loads whole scenario ( Demand.txt, Lines.txt and PowerPlants.txt) from given directory.
+    Files are parsed column by column into numpy arrays, nodes are referenced by index.
+    If directory contains up to date demand store ( see DemandStore.py) demand is read from it instead
+    of Demand.txt and only requested window of periods is read from disk.
+
+    ----ARGUMENTS----
+
+    directory - scenario directory, ie. "Scenario#3"
+
+    start - first period of demand to load
+
+    periods - number of periods to load, by default all remaining periods
+
+    ----RETURNS----
+
+    scenario dictionary with keys: nodeNames, nodeIndex, demand ( periods x nodes array), lines, plants
+    """
+    if hasDemandStore(directory):
+        nodeNames, demand = loadDemandWindow(directory, start, periods)
+        nodeIndex = {name: index for index, name in enumerate(nodeNames)}
+    else:
+        nodeNames, nodeIndex, demand = loadDemandFile(os.path.join(directory, DEMAND_FILE))
+        end = demand.shape[0] if periods is None else start + periods
+        if start != 0 or end != demand.shape[0]:
+            if start < 0 or end > demand.shape[0]:
+                raise ValueError("periods %d-%d outside of demand with %d periods" % (start, end, demand.shape[0]))
+            demand = np.ascontiguousarray(demand[start:end])
+    lines = loadLinesFile(os.path.join(directory, LINES_FILE), nodeIndex)
+    return {
+        "nodeNames": nodeNames,
+        "nodeIndex": nodeIndex,
+        "demand": demand,
+        "lines": lines,
+        "plants": loadPlantsFile(os.path.join(directory, PLANTS_FILE), nodeIndex),
+        "adjacency": createAdjacencyIndex(len(nodeNames), lines["nodeA"], lines["nodeB"]),
+    }
+
+
+def scenarioToNodes(scenario):
+    """
+    Converts loaded scenario to list of nodes in the same format as loadNode() + loadPlants(),
+    except demand which is list of numbers per period, ready for use with constraint methods.
+    """
+    demand = scenario["demand"].T.tolist()
+    nodes = [createNode(name, demand[index], index) for index, name in enumerate(scenario["nodeNames"])]
+    plants = scenario["plants"]
+    for position, nodeIndex in enumerate(plants["node"].tolist()):
+        createPlants(
+            nodes[nodeIndex], plants["plantName"][position], plants["blockName"][position],
+            plants["Pmin"][position], plants["Pmax"][position],
+            plants["cost"][position].item(), plants["ramp"][position].item()
+        )
+    return nodes
+
+
+def scenarioToEdges(scenario):
+    """
+    Converts loaded scenario lines to list of edges in the same format as loadEdges()
+    """
+    names = scenario["nodeNames"]
+    lines = scenario["lines"]
+    return [
+        createEdge(names[a], names[b], capacity, admitance, voltageA, voltageB)
+        for a, b, capacity, admitance, voltageA, voltageB in zip(
+            lines["nodeA"].tolist(), lines["nodeB"].tolist(), lines["capacity"].tolist(),
+            lines["admitance"].tolist(), lines["voltageA"].tolist(), lines["voltageB"].tolist()
+        )
+    ]
@@ -0,0 +1,30 @@
+import os
+
+
+# scenario directories ( Scenario#1, ..., demand stores) requests may name, relative to this directory
+SCENARIO_ROOT = os.path.dirname(os.path.abspath(__file__))
+# caches of scenarios, models and commitment patterns, the same for server, tests and scripts started from any directory
+CACHE_DIRECTORY = os.path.join(SCENARIO_ROOT, ".cache")
+
+
+def resolveScenario(name, root = SCENARIO_ROOT):
+    """
+    Resolves scenario or demand store name given by a client to directory inside root. Symbolic links are
+    resolved first, so that no name reaches files outside root
+
+    ----ARGUMENTS----
+
+    name - directory relative to root, ie. "Scenario#3"
+
+    root - directory all scenarios are in
+
+    ----RETURNS----
+    absolute path of the directory, raises ValueError if it is not inside root
+    """
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("scenario name has to be a non empty string")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError("scenario %s is not inside scenario directory" % name)
+    return path
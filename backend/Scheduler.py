@@ -0,0 +1,208 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from Metrics import queueDepth
+from SolverProcess import SolverProcess
+
+
+# runs solving at the same time, every run has its own worker process
+WORKERS = 2
+# runs of one mode solving at the same time
+MODE_LIMITS = {"simple": 2, "binary": 1, "complex": 1}
+# short runs may use this many workers above WORKERS, so they do not wait for long runs to finish
+SHORT_RESERVE = 1
+# runs estimated to this many seconds are short
+SHORT_RUN = 2.0
+# waiting run is ordered as if it was this many seconds shorter for every second it waits, long runs are not starved
+AGING = 1.0
+# seconds between checks whether waiting run was cancelled
+WAIT_INTERVAL = 0.1
+# estimated seconds per variable and constraint of model in mode without recorded runs, see estimateCost()
+SECONDS_PER_ELEMENT = {"simple": 1e-5, "binary": 1e-4, "complex": 1e-3}
+
+
+def estimateCost(mode, size, estimate = None, timeLimit = None):
+    """
+    Estimates seconds run will occupy a worker - solve time estimated from recent runs, or from model size
+    if there is no run of the mode yet, capped by time limit of the run
+
+    ----ARGUMENTS----
+
+    mode - simple, binary or complex
+
+    size - model size from estimateModelSize()
+
+    estimate - result of estimateSolveTime(), None if there is none
+
+    timeLimit - requested time limit of the run in seconds, None or 0 for no limit
+
+    ----RETURNS----
+    estimated seconds
+    """
+    seconds = estimate["seconds"] if estimate is not None else None
+    if seconds is None:
+        seconds = (size["variables"] + size["constraints"]) * SECONDS_PER_ELEMENT.get(mode, SECONDS_PER_ELEMENT["complex"])
+    if timeLimit:
+        seconds = min(seconds, timeLimit)
+    return float(seconds)
+
+
+class Scheduler:
+    """
+    Orders runs waiting for solver workers. Run may start if there is free worker and its mode is below its limit,
+    of such runs the one with the highest priority starts first, then run of user with fewest running runs and
+    then the shortest run ( estimated seconds minus AGING times seconds it waits). Short runs may use SHORT_RESERVE
+    workers above the limit, so short run is not blocked by long runs occupying all workers
+
+        with scheduler.slot(job["id"], "binary", 12.5, "alice") as worker:
+            status = worker.solve(solver)
+    """
+    def __init__(self, workers = WORKERS, modeLimits = None, shortReserve = SHORT_RESERVE):
+        self.workers = workers
+        self.modeLimits = dict(MODE_LIMITS if modeLimits is None else modeLimits)
+        self.shortReserve = shortReserve
+        self.waiting = []
+        self.running = []
+        self.idle = []
+        self.condition = threading.Condition()
+        self.order = itertools.count()
+
+    def configure(self, workers = None, modeLimits = None, shortReserve = None):
+        """
+        Changes limits, values which are None are kept. Raises ValueError for limit which is not a whole number,
+        worker and mode limits have to be at least 1
+        """
+        for name, value, minimum in [("workers", workers, 1), ("shortReserve", shortReserve, 0)] + [
+                ("limit of mode %s" % mode, limit, 1) for mode, limit in (modeLimits or {}).items()]:
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < minimum):
+                raise ValueError("%s has to be a whole number of at least %d, got %s" % (name, minimum, value))
+        with self.condition:
+            if workers is not None:
+                self.workers = workers
+            if modeLimits is not None:
+                self.modeLimits.update(modeLimits)
+            if shortReserve is not None:
+                self.shortReserve = shortReserve
+            # idle workers above the new limit are stopped
+            while len(self.idle) > self.workers + self.shortReserve:
+                self.idle.pop().stop()
+            self.condition.notify_all()
+
+    def _fits(self, entry):
+        running = len(self.running)
+        sameMode = sum(1 for other in self.running if other["mode"] == entry["mode"])
+        if sameMode >= self.modeLimits.get(entry["mode"], 1):
+            return False
+        if running < self.workers:
+            return True
+        return entry["short"] and running < self.workers + self.shortReserve
+
+    def _key(self, entry, now):
+        userRunning = sum(1 for other in self.running if other["user"] == entry["user"])
+        return (-entry["priority"], userRunning, entry["cost"] - AGING * (now - entry["submitted"]), entry["order"])
+
+    def _next(self):
+        """
+        Returns waiting run which starts next, None if no waiting run fits
+        """
+        now = time.time()
+        for entry in sorted(self.waiting, key=lambda entry: self._key(entry, now)):
+            if self._fits(entry):
+                return entry
+        return None
+
+    @contextmanager
+    def slot(self, id, mode, cost, user = None, priority = 0, cancelled = None):
+        """
+        Waits until the run may start and gives it a worker for the duration of the block
+
+        ----ARGUMENTS----
+
+        id - id of the run, shown in status()
+
+        mode - simple, binary or complex, limited by modeLimits
+
+        cost - estimated seconds of the run from estimateCost()
+
+        user - user who submitted the run, runs of users with fewer running runs start first
+
+        priority - runs with higher priority start first
+
+        cancelled - called every WAIT_INTERVAL seconds while the run waits, waiting ends if it returns True
+
+        ----RETURNS----
+        SolverProcess of the run, None if the run was cancelled before it started
+        """
+        entry = {
+            "id": id,
+            "mode": mode,
+            "cost": cost,
+            "short": cost <= SHORT_RUN,
+            "user": user,
+            "priority": priority,
+            "submitted": time.time(),
+            "started": None,
+            "order": next(self.order),
+        }
+        with self.condition:
+            self.waiting.append(entry)
+            queueDepth.set(len(self.waiting))
+            try:
+                while self._next() is not entry:
+                    if cancelled is not None and cancelled():
+                        break
+                    self.condition.wait(WAIT_INTERVAL)
+            finally:
+                self.waiting.remove(entry)
+                queueDepth.set(len(self.waiting))
+            if self._fits(entry) and not (cancelled is not None and cancelled()):
+                entry["started"] = time.time()
+                entry["worker"] = self.idle.pop() if self.idle else SolverProcess()
+                self.running.append(entry)
+            else:
+                # other waiting runs may fit now
+                self.condition.notify_all()
+        worker = entry.get("worker")
+        if worker is not None:
+            worker.resetCounters()
+        failed = False
+        try:
+            yield worker
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if worker is not None:
+                with self.condition:
+                    self.running.remove(entry)
+                    # worker of run which failed ( ie. worker process did not start) is not used again
+                    if not failed and len(self.idle) < self.workers + self.shortReserve:
+                        self.idle.append(worker)
+                    else:
+                        worker.stop()
+                    self.condition.notify_all()
+
+    def status(self):
+        """
+        Returns limits, running runs and waiting runs in the order they would start
+        """
+        with self.condition:
+            now = time.time()
+            describe = lambda entry: {
+                "id": entry["id"],
+                "mode": entry["mode"],
+                "user": entry["user"],
+                "priority": entry["priority"],
+                "estimate": entry["cost"],
+                "short": entry["short"],
+                "waiting": (entry["started"] or now) - entry["submitted"],
+            }
+            return {
+                "workers": self.workers,
+                "modeLimits": dict(self.modeLimits),
+                "shortReserve": self.shortReserve,
+                "running": [describe(entry) for entry in self.running],
+                "waiting": [describe(entry) for entry in sorted(self.waiting, key=lambda entry: self._key(entry, now))],
+            }
@@ -0,0 +1,212 @@
+import multiprocessing
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver import pywraplp
+
+
+# seconds between checks whether solve running in worker process was cancelled
+POLL_INTERVAL = 0.1
+
+# worker is started as new interpreter, forked process would inherit locks of server threads
+_context = multiprocessing.get_context("spawn")
+
+
+def _response(solver, proto, status):
+    """
+    Returns message with status, solution response, simplex iterations and branch and bound nodes of finished solve
+    """
+    response = linear_solver_pb2.MPSolutionResponse()
+    solver.FillSolutionResponseProto(response)
+    # linear solvers ( ie. GLOP of demand sweep) have no branch and bound nodes
+    nodes = solver.nodes() if any(variable.is_integer for variable in proto.variable) else 0
+    return (status, response.SerializeToString(), solver.iterations(), nodes)
+
+
+def _serve(connection):
+    """
+    Main loop of worker process. Request "solve" carries model proto, solver type, time limit and gap, the model
+    is solved with the same defaults as solver.Solve() in the server. Request "series" carries model proto, solver
+    type, solver specific parameters, indexes of constraints and right hand sides for them, the model is loaded once
+    and solved for every right hand side in turn on the same solver, so every solve starts from the previous one.
+    Every solve is answered by status, solution response, simplex iterations and branch and bound nodes
+    """
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        kind, modelBytes, solverType = message[:3]
+        proto = linear_solver_pb2.MPModelProto.FromString(modelBytes)
+        solver = pywraplp.Solver.CreateSolver(solverType)
+        error = solver.LoadModelFromProto(proto)
+        if kind == "solve":
+            if error:
+                connection.send((pywraplp.Solver.MODEL_INVALID, b"", 0, 0))
+                continue
+            timeLimit, gap = message[3:]
+            if timeLimit:
+                solver.SetTimeLimit(int(timeLimit * 1000))
+            parameters = pywraplp.MPSolverParameters()
+            if gap is not None:
+                parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, gap)
+            connection.send(_response(solver, proto, solver.Solve(parameters)))
+        else:
+            parameters, rows, rightHandSides = message[3:]
+            if error:
+                for values in rightHandSides:
+                    connection.send((pywraplp.Solver.MODEL_INVALID, b"", 0, 0))
+                continue
+            solver.SetSolverSpecificParametersAsString(parameters)
+            constraints = [solver.constraint(row) for row in rows]
+            for values in rightHandSides:
+                for constraint, value in zip(constraints, values):
+                    constraint.SetBounds(value, value)
+                connection.send(_response(solver, proto, solver.Solve()))
+
+
+class SolverProcess:
+    """
+    Solves models in separate worker process. solver.Solve() holds the interpreter lock until the solve ends,
+    so no thread of the server can stop it, solve in worker process is stopped by killing the worker. Model is sent
+    to the worker as proto ( with hint), solution is loaded back to the solver of the server, so variables
+    of the model have their solution values as after solver.Solve(). Worker is started with the first solve
+    and started again after it is stopped
+
+        worker = SolverProcess()
+        status = worker.solve(solver, cancelled = lambda: job["stopRequested"])
+    """
+    def __init__(self):
+        self.process = None
+        self.connection = None
+        # iterations and nodes of solves since resetCounters()
+        self.counters = {"iterations": 0, "nodes": 0}
+
+    def start(self):
+        """
+        Starts the worker if it is not running. The worker is kept only if it started, error of the start is raised
+        """
+        if self.process is not None and self.process.is_alive():
+            return
+        self.stop()
+        connection, child = _context.Pipe()
+        process = _context.Process(target=_serve, args=(child,), daemon=True)
+        try:
+            process.start()
+        except BaseException:
+            connection.close()
+            raise
+        finally:
+            child.close()
+        self.process = process
+        self.connection = connection
+
+    def stop(self):
+        """
+        Kills the worker with solve it is running, memory of its model is released with it
+        """
+        # process which failed to start has no pid and cannot be killed
+        if self.process is not None and self.process.pid is not None:
+            self.process.kill()
+            self.process.join()
+        if self.connection is not None:
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def resetCounters(self):
+        self.counters = {"iterations": 0, "nodes": 0}
+
+    def solve(self, solver: pywraplp.Solver, timeLimit = None, gap = None, solverType = "SCIP", cancelled = None):
+        """
+        Solves model of the solver in the worker
+
+        ----ARGUMENTS----
+
+        solver - solver with built model
+
+        timeLimit - time limit in seconds, no limit if None or 0
+
+        gap - relative MIP gap, default of solver.Solve() if None
+
+        solverType - name of the solver for pywraplp.Solver.CreateSolver(), the same as of solver
+
+        cancelled - called every POLL_INTERVAL seconds while the worker solves, the worker is killed if it returns True
+
+        ----RETURNS----
+        solver status, NOT_SOLVED if solve was cancelled and ABNORMAL if the worker died
+        """
+        self.start()
+        proto = linear_solver_pb2.MPModelProto()
+        solver.ExportModelToProto(proto)
+        self.connection.send(("solve", proto.SerializeToString(), solverType, timeLimit, gap))
+        return self._receive(solver, cancelled)
+
+    def solveSeries(self, solver: pywraplp.Solver, constraints, rightHandSides, solverType = "GLOP", parameters = "", cancelled = None):
+        """
+        Solves model of the solver for a series of right hand sides of given equality constraints. Model is sent
+        to the worker once and solved there on one solver, so ie. simplex basis of one solve is reused by the next one
+
+        ----ARGUMENTS----
+
+        solver - solver with built model
+
+        constraints - constraints of the solver whose bounds change between solves
+
+        rightHandSides - list of right hand sides, every one has value for every constraint
+
+        solverType - name of the solver for pywraplp.Solver.CreateSolver(), the same as of solver
+
+        parameters - solver specific parameters of the solves ( see SetSolverSpecificParametersAsString())
+
+        cancelled - called every POLL_INTERVAL seconds while the worker solves, the worker is killed if it returns True
+
+        ----RETURNS----
+        generator of solver status of every right hand side. Constraints of the solver are set to the right hand side
+        and solution of the solve is loaded to the solver before its status is returned. Generator ends after status NOT_SOLVED if the series was cancelled and ABNORMAL
+        if the worker died. The worker is killed if the generator is closed before the series ends
+        """
+        self.start()
+        proto = linear_solver_pb2.MPModelProto()
+        solver.ExportModelToProto(proto)
+        rows = [constraint.index() for constraint in constraints]
+        self.connection.send(("series", proto.SerializeToString(), solverType, parameters, rows, rightHandSides))
+        received = 0
+        try:
+            while received < len(rightHandSides):
+                if cancelled is not None and cancelled():
+                    self.stop()
+                    yield pywraplp.Solver.NOT_SOLVED
+                    return
+                for constraint, value in zip(constraints, rightHandSides[received]):
+                    constraint.SetBounds(value, value)
+                status = self._receive(solver, cancelled)
+                received += 1
+                yield status
+                if self.process is None:
+                    return
+        finally:
+            # replies of the rest of the series would be read by the next solve
+            if received < len(rightHandSides):
+                self.stop()
+
+    def _receive(self, solver, cancelled):
+        """
+        Waits for the reply of one solve and loads its solution to the solver. The worker is stopped if the solve
+        is cancelled or the worker died
+        """
+        while not self.connection.poll(POLL_INTERVAL):
+            if cancelled is not None and cancelled():
+                self.stop()
+                return pywraplp.Solver.NOT_SOLVED
+            if not self.process.is_alive():
+                self.stop()
+                return pywraplp.Solver.ABNORMAL
+        try:
+            status, responseBytes, iterations, nodes = self.connection.recv()
+        except EOFError:
+            self.stop()
+            return pywraplp.Solver.ABNORMAL
+        self.counters["iterations"] += iterations
+        self.counters["nodes"] += nodes
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            solver.LoadSolutionFromProto(linear_solver_pb2.MPSolutionResponse.FromString(responseBytes))
+        return status
@@ -0,0 +1,182 @@
+import time
+from collections import deque
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+
+HISTORY_LENGTH = 100
+
+STATUS_NAMES = {
+    pywraplp.Solver.OPTIMAL: "OPTIMAL",
+    pywraplp.Solver.FEASIBLE: "FEASIBLE",
+    pywraplp.Solver.INFEASIBLE: "INFEASIBLE",
+    pywraplp.Solver.UNBOUNDED: "UNBOUNDED",
+    pywraplp.Solver.ABNORMAL: "ABNORMAL",
+    pywraplp.Solver.MODEL_INVALID: "MODEL_INVALID",
+    pywraplp.Solver.NOT_SOLVED: "NOT_SOLVED",
+}
+
+# stats of recent runs, oldest are dropped
+runHistory = deque(maxlen=HISTORY_LENGTH)
+
+
+class PhaseTimer:
+    """
+    Measures wall time of named phases. Time of phase with the same name is summed,
+    so it can be used inside loops ( ie. once per cycle)
+
+        timer = PhaseTimer()
+        with timer.phase("build"):
+            ...
+        timer.timings -> {"build": 0.12}
+    """
+    __slots__ = ("timings", "_started")
+
+    def __init__(self, timings = None):
+        self.timings = timings if timings is not None else {}
+        self._started = time.perf_counter()
+
+    def phase(self, name):
+        return _Phase(self.timings, name)
+
+    def total(self):
+        """
+        Returns time since the timer was created
+        """
+        return time.perf_counter() - self._started
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.started
+        return False
+
+
+def modelSize(solver: pywraplp.Solver):
+    """
+    Returns number of variables, constraints and binary ( integer) variables of the model
+    """
+    return {
+        "variables": solver.NumVariables(),
+        "constraints": solver.NumConstraints(),
+        "binaries": sum(1 for variable in solver.variables() if variable.integer()),
+    }
+
+
+def solverStatistics(solver: pywraplp.Solver, status, wallTime, binaries = None, objectiveScale = 1, counters = None):
+    """
+    Collects statistics of finished solve
+
+    ----ARGUMENTS----
+
+    solver - solved solver
+
+    status - result of solver.Solve()
+
+    wallTime - measured time of solver.Solve() in seconds
+
+    binaries - number of binary variables from modelSize(), counted again if not given
+
+    objectiveScale - objective and bound are multiplied by it, ie. base power of per unit model
+
+    counters - iterations and nodes of solves done in worker process ( see SolverProcess.py), read from the solver if None
+
+    ----RETURNS----
+
+    dictionary with status name, objective, best bound and relative gap ( for MIP models), simplex iterations,
+    branch and bound nodes and wall time
+    """
+    feasible = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    statistics = {
+        "status": STATUS_NAMES.get(status, str(status)),
+        "objective": None,
+        "bestBound": None,
+        "gap": None,
+        "iterations": solver.iterations() if counters is None else counters["iterations"],
+        "nodes": solver.nodes() if counters is None else counters["nodes"],
+        "wallTime": wallTime,
+    }
+    if feasible:
+        objective = solver.Objective().Value() * objectiveScale
+        statistics["objective"] = objective
+        if binaries is None:
+            binaries = modelSize(solver)["binaries"]
+        if binaries == 0:
+            statistics["gap"] = 0.0
+        else:
+            bound = solver.Objective().BestBound() * objectiveScale
+            statistics["bestBound"] = bound
+            statistics["gap"] = abs(objective - bound) / max(abs(objective), 1e-9)
+    return statistics
+
+
+def recordRun(stats):
+    """
+    Adds stats of single run to history, with time it finished
+    """
+    stats["finished"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    runHistory.append(stats)
+    return stats
+
+
+def getHistory(limit = None):
+    """
+    Returns stats of recent runs, newest last
+    """
+    history = list(runHistory)
+    if limit is not None:
+        history = history[-limit:] if limit > 0 else []
+    return history
+
+
+def estimateSolveTime(mode, size, history = None):
+    """
+    Estimates solve time of model with given size from recorded runs of the same mode. Solve time is assumed
+    to grow as a power of model size ( variables + constraints), fitted on logarithms of past runs. With only
+    one past run the time is scaled linearly, exponent is kept between 1 and 3
+
+    ----ARGUMENTS----
+
+    mode - simple, binary or complex
+
+    size - model size from estimateModelSize() or modelSize()
+
+    history - runs to calibrate on, by default recent runs from runHistory
+
+    ----RETURNS----
+
+    dictionary with estimated seconds ( None without any past run of the mode), number of runs used and fitted exponent
+    """
+    if history is None:
+        history = getHistory()
+    samples = [
+        (run["model"]["variables"] + run["model"]["constraints"], run["solver"]["wallTime"])
+        for run in history
+        if run["mode"] == mode and run["solver"]["status"] != "NOT_SOLVED" and run["solver"]["wallTime"] > 0
+    ]
+    samples = [(modelSize, seconds) for modelSize, seconds in samples if modelSize > 0]
+    if not samples:
+        return {"seconds": None, "samples": 0, "exponent": None}
+    sizes = np.log([modelSize for modelSize, seconds in samples])
+    times = np.log([seconds for modelSize, seconds in samples])
+    exponent = 1.0
+    if len(samples) > 1 and np.ptp(sizes) > 0:
+        exponent = float(np.clip(np.polyfit(sizes, times, 1)[0], 1.0, 3.0))
+    # intercept for the clamped exponent
+    intercept = float(np.mean(times - exponent * sizes))
+    target = max(size["variables"] + size["constraints"], 1)
+    return {
+        "seconds": float(np.exp(intercept + exponent * np.log(target))),
+        "samples": len(samples),
+        "exponent": exponent,
+    }
@@ -1,10 +1,28 @@
+import copy
 import flask
 from flask import request, jsonify
 import json 
+import threading
+import time
 from ortools.linear_solver import pywraplp
 from flask_cors import CORS, cross_origin
-
-from ModelFunctions import createBinaryConstraints, createComplexConstraints, createEdgeFlowVariables, createMinimizeFunction, createMinimizeFunctionBinary, createMinimizeFunctionDemand, createNodeVariablesBinary, createNodeVariablesSimple, createPhaseVariables, createSimpleConstraints, exportEdgeJSON, exportNodesJSON, exportPlantsJSON, loadEdges, loadNode, loadPlants, loadPlantsJSON,getNode
+from DemandStore import createDemandMatrixFromStore
+from ScenarioCache import loadScenarioCached
+from ScenarioLoader import ScenarioFormatError
+from ScenarioPaths import resolveScenario
+from GridRecords import createNetwork, networkFromScenario
+from Contingency import createContingencyFactors, reoptimizeOutages, screenModel
+from DemandSweep import demandSweep, sweepLevels
+from Feasibility import checkFeasibility, hasErrors
+from Jobs import HEARTBEAT_TIMEOUT, addIncumbent, cancelJob, clientDisconnected, createJob, getJob, heartbeat, isCancelled, jobStatus, requestStop, runningJobs, waitJob
+from MeritOrder import exportMeritJSON, meritPreview
+from Prices import computePrices
+from ModelStore import EXPORT_FORMATS, exportModelContent, loadModelCached
+from Metrics import observeRun, renderMetrics, trackSolve
+from Scheduler import Scheduler, estimateCost
+from SolverStats import PhaseTimer, estimateSolveTime, getHistory, recordRun, solverStatistics
+
+from ModelFunctions import buildModel, createDemandMatrix, estimateModelSize, getPowerBase, solveModel, createNetworkIndex, deleteEdge, deletePlant, exportEdgeJSON, exportNodesJSON, exportPlantsJSON, loadEdges, loadNode, loadPlants, loadPlantsJSON, getNode, updateDemandInModel, updateEdgeInModel, updatePlantInModel, upsertEdge, upsertPlant
 
 
 
@@ -13,6 +31,22 @@ _globalDemand = [
 ]
 periodOfTime = []
 edgeSolutionPeriods = []
+demandMatrix = None
+model = None
+modelSolved = False
+networkIndex = None
+contingencyFactors = None
+preview = None
+# runs of get-results and background jobs take the cached model and publish their solution under the lock,
+# stateVersion changes with every change of nodes and edges, see checkoutModel() and publishModel()
+stateLock = threading.RLock()
+stateVersion = 0
+scheduler = Scheduler()
+# seconds between checks whether client of /api/get-results is still connected
+DISCONNECT_INTERVAL = 0.5
+# request jobs are cancelled after this many seconds ( toolConfig requestTimeout) if the server does not expose
+# connection of the request, see respondWhenDone()
+REQUEST_TIMEOUT = 600
 index = 0
 solver = pywraplp.Solver.CreateSolver('SCIP')
 shortage = []
@@ -63,6 +97,7 @@ def api_postNodes():
     
     global nodes
     nodes = request.get_json()
+    invalidateModel(True)
     return response
 
 @app.route('/api/post-edges', methods=['POST'])
@@ -72,6 +107,7 @@ def api_postEdges():
 
     global edges 
     edges = request.get_json()
+    invalidateModel(True)
     return response
 
 @app.route('/api/post-config', methods=['POST'])
@@ -87,95 +123,824 @@ def api_postConfig():
 def api_postPlants():
     response = jsonify("ok")
     global nodes
-    loadPlantsJSON(nodes, request.get_json())
+    try:
+        loadPlantsJSON(nodes, request.get_json())
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    invalidateModel(True)
     return response
 
 
 
-@app.route('/api/get-results', methods=['GET'])
+@app.route('/api/load-scenario', methods=['POST'])
 @cross_origin(origin='*')
-def api_getResults():
+def api_loadScenario():
+    """
+    Loads nodes, plants and edges from scenario directory on the server ( ie. "Scenario#3"),
+    instead of posting them. Only directories inside SCENARIO_ROOT can be loaded.
+    Parsed scenario is cached on disk, see ScenarioCache.py
+    """
     global nodes
     global edges
-    global _globalDemand
-    global solver
-    global toolConfig
-    global periodOfTime
-    global edgeSolutionPeriods
-    shortage = []
-    mode = toolConfig["mode"]
-    sumOfGeneration = []
-    edgeFlowVariables = []
-    overflow
-
-    periodOfTime = []
-    edgeSolutionPeriods = []
-    
-    enforceStrict = toolConfig["enforceStrict"]
+    body = request.get_json()
+    try:
+        scenario = loadScenarioCached(resolveScenario(body["scenario"]), body.get("startPeriod", 0), body.get("periods"))
+    except ScenarioFormatError as error:
+        return jsonify({"error": str(error)}), 400
+    except (OSError, ValueError, KeyError) as error:
+        return jsonify({"error": str(error)}), 400
+    network = networkFromScenario(scenario)
+    nodes = network.nodeDicts(scenario["demand"])
+    edges = network.edgeDicts()
+    invalidateModel(True)
+    return jsonify("ok")
 
-    TimeMax = toolConfig["timeMax"]
-    
-    time = 0
 
-    if mode == "simple":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesSimple(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges, edgeSolutionPeriods)
-            createSimpleConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict)
-            time +=1
 
+@app.route('/api/get-results', methods=['GET'])
+@cross_origin(origin='*')
+def api_getResults():
+    """
+    Solves posted model and returns its first cycle. Solve runs as job of kind request, it is cancelled
+    when the client disconnects or by /api/cancel. Query parameters user ( or header X-User, address of
+    the client by default) and priority are used by the scheduler, see Scheduler
+    """
+    return respondWhenDone(createRequestJob(runOptimization, submitRun()))
+
+
+def createRequestJob(work, run):
+    """
+    Creates job of kind request for the run, whose response is returned by respondWhenDone(). Heartbeat timeout
+    of the job is toolConfig requestTimeout ( REQUEST_TIMEOUT by default)
+    """
+    return createJob(work, "request", run["config"].get("requestTimeout", REQUEST_TIMEOUT), run)
+
+
+def respondWhenDone(job):
+    """
+    Waits for job of kind request and returns its response, the job is cancelled when the client disconnects.
+    Disconnect is detected on the socket of the request, which only Werkzeug server ( app.run()) exposes as
+    werkzeug.socket. Waiting is heartbeat of the job only while the socket is watched, under other servers the job
+    is therefore cancelled after its heartbeat timeout ( see createRequestJob()), long solves should use /api/jobs there
+    """
+    connection = request.environ.get("werkzeug.socket")
+    while not waitJob(job, DISCONNECT_INTERVAL):
+        if clientDisconnected(connection):
+            cancelJob(job, "disconnect")
+        elif connection is not None:
+            heartbeat(job)
+    return jsonify(job["response"]), job["code"]
+
+
+def requestUser():
+    """
+    Returns user of the request - query parameter user, header X-User or address of the client
+    """
+    return request.headers.get("X-User") or request.args.get("user") or request.remote_addr
+
+
+def submitRun():
+    """
+    Takes copy of posted nodes, edges and toolConfig for run of the request, so that run waiting for a worker
+    solves what was posted when it was submitted. Edits of single plants, edges and demand change nodes and edges
+    in place, so they are copied
+    """
+    with stateLock:
+        return {
+            "nodes": copy.deepcopy(nodes),
+            "edges": copy.deepcopy(edges),
+            "config": dict(toolConfig),
+            "globalDemand": list(_globalDemand),
+            "version": stateVersion,
+            "user": requestUser(),
+            "priority": request.args.get("priority", 0, type=int),
+        }
+
+
+def runOptimization(job):
+    """
+    Work of solve jobs - waits for a worker from the scheduler and solves the run of the job.
+    Merit preview does not use the solver and runs at once
+    """
+    run = job["run"]
+    config = run["config"]
+    if config["mode"] == "merit":
+        return optimize(job, None)
+    try:
+        size = estimateModelSize(run["nodes"], run["edges"], config)
+        cost = estimateCost(config["mode"], size, estimateSolveTime(config["mode"], size), config.get("timeLimit"))
+    except (KeyError, ValueError):
+        # optimize() reports the error
+        cost = 0.0
+    submitted = time.time()
+    with scheduler.slot(job["id"], config["mode"], cost, run["user"], run["priority"], lambda: isCancelled(job)) as worker:
+        run["scheduler"] = {"user": run["user"], "priority": run["priority"], "estimate": cost, "waited": time.time() - submitted}
+        return optimize(job, worker)
+
+
+def workerRunner(worker, shouldStop, deadline = None):
+    """
+    Returns solve runner of models ( see runSolve()) which solves in worker process from the scheduler.
+    The worker is killed when shouldStop() returns True, solves after that do not start
+
+    ----ARGUMENTS----
+
+    worker - SolverProcess from the scheduler
+
+    shouldStop - called while the worker solves
+
+    deadline - time ( time.time()) when solves have to end, None for no limit
+    """
+    def solveRunner(solver, timeLimit, gap, solverType):
+        if shouldStop():
+            return pywraplp.Solver.NOT_SOLVED
+        if deadline is not None:
+            remaining = max(deadline - time.time(), 0.001)
+            timeLimit = min(timeLimit, remaining) if timeLimit else remaining
+        return worker.solve(solver, timeLimit, gap, solverType, shouldStop)
+    return solveRunner
+
+
+def seriesRunner(worker, shouldStop):
+    """
+    Returns series runner of demandSweep() which solves all points in worker process from the scheduler, on one
+    solver. The worker is killed when shouldStop() returns True
+    """
+    def runSeries(solver, constraints, rightHandSides, solverType, parameters):
+        if shouldStop():
+            return iter([])
+        return worker.solveSeries(solver, constraints, rightHandSides, solverType, parameters, shouldStop)
+    return runSeries
+
+
+def exportSolution(t, runModel = None, runNodes = None, globalDemand = None):
+    """
+    Exports nodes, edges and plants of cycle t of solved model, by default of the last solved model
+    """
+    if runModel is None:
+        runModel, runNodes, globalDemand = model, nodes, _globalDemand
+    return {
+        "nodes": exportNodesJSON(runNodes, t, globalDemand, runModel["demandMatrix"]),
+        "edges": exportEdgeJSON(runModel["edgeSolutionPeriods"][t], getPowerBase(runModel)),
+        "plants": exportPlantsJSON(runModel["periodOfTime"][t], runNodes, runModel["mode"], getPowerBase(runModel)),
+    }
 
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage)    
-    
-    if mode == "binary":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesBinary(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges, edgeSolutionPeriods)
-            createBinaryConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict)
-            time +=1
 
+def checkoutModel(run):
+    """
+    Takes cached model for the run if it was built for the same config and nothing was posted since the run
+    was submitted. Taken model is not cached until the run publishes it, so that other runs do not solve it
+    at the same time, and its previous solution is not available
+    """
+    global model
+    global solver
+    global periodOfTime
+    global edgeSolutionPeriods
+    global modelSolved
+    with stateLock:
+        if model is None or model["config"] != run["config"] or run["version"] != stateVersion:
+            return None
+        taken = model
+        model = None
+        solver = None
+        periodOfTime = []
+        edgeSolutionPeriods = []
+        modelSolved = False
+        return taken
+
+
+def publishModel(run, runModel, solved):
+    """
+    Makes model of finished run the cached model and its solution the one /api/next and /api/prev return.
+    Model of run submitted before nodes or edges changed is dropped
+    """
+    global solver
+    global periodOfTime
+    global edgeSolutionPeriods
+    global demandMatrix
+    global model
+    global modelSolved
+    global preview
+    with stateLock:
+        if run["version"] != stateVersion:
+            return
+        model = runModel
+        solver = runModel["solver"]
+        periodOfTime = runModel["periodOfTime"]
+        edgeSolutionPeriods = runModel["edgeSolutionPeriods"]
+        demandMatrix = runModel["demandMatrix"]
+        modelSolved = solved
+        preview = None
+
+
+def optimize(job, worker):
+    """
+    Builds ( or reuses) model of the run of the job, solves it in the worker and exports the first cycle.
+    Called by jobs of /api/get-results and /api/jobs, the latter get every improving incumbent of anytime solve
+    with its dispatch. With toolConfig timeLimit the solver stops after that many seconds with the best solution
+    found. Model of cancelled job is dropped
+
+    ----ARGUMENTS----
+
+    job - job from createJob() with run from submitRun()
+
+    worker - SolverProcess from the scheduler, None if the job was cancelled while waiting
+
+    ----RETURNS----
+
+    ( response, status code)
+    """
+    run = job["run"]
+    config = run["config"]
+    runNodes, runEdges, globalDemand = run["nodes"], run["edges"], run["globalDemand"]
+    if isCancelled(job):
+        # cancelled while waiting for the solver
+        return {}, 409
+    if config["mode"] == "merit":
+        return getPreview(config, runNodes, runEdges, globalDemand, run["version"]), 200
+    timer = PhaseTimer()
+    runModel = checkoutModel(run)
+    rebuilt = runModel is None
+    if rebuilt:
+        TimeMax = config["timeMax"]
+        with timer.phase("demand"):
+            if config.get("demandStore"):
+                # demand profiles are read from memory mapped store, only hours needed for this run.
+                # Store is named by client, only stores inside SCENARIO_ROOT are opened
+                try:
+                    runDemand = createDemandMatrixFromStore(resolveScenario(config["demandStore"]), runNodes, globalDemand, config.get("startPeriod", 0), TimeMax)
+                except (OSError, ValueError) as error:
+                    return {"error": str(error)}, 400
+            else:
+                runDemand = createDemandMatrix(runNodes, globalDemand, TimeMax)
+        with timer.phase("checks"):
+            network = createNetwork(runNodes, runEdges)
+            # requests which cannot have any solution are refused before the model is built
+            problems = checkFeasibility(network, runDemand, config)
+        if hasErrors(problems):
+            return {"error": "request is infeasible", "problems": problems, "timings": timer.timings}, 422
+        with timer.phase("build"):
+            # each model gets its own solver, otherwise variables of previous runs stay in the model
+            runSolver = pywraplp.Solver.CreateSolver('SCIP')
+            build = lambda: buildModel(runSolver, runNodes, runEdges, config, globalDemand, runDemand, network)
+            try:
+                if config.get("modelCache"):
+                    # recurring models are loaded from proto stored on disk instead of being built in python
+                    runModel = loadModelCached(runNodes, runEdges, config, runDemand, build, network)
+                else:
+                    runModel = build()
+            except ValueError as error:
+                return {"error": str(error)}, 400
+
+    runSolver = runModel["solver"]
+    onIncumbent = None
+    if job["kind"] == "job":
+        onIncumbent = lambda incumbent: addIncumbent(job, dict(incumbent, **exportSolution(0, runModel, runNodes, globalDemand)))
+    shouldStop = lambda: job["stopRequested"]
+    deadline = time.time() + config["timeLimit"] if config.get("timeLimit") else None
+    runModel["solveRunner"] = workerRunner(worker, shouldStop, deadline)
+    try:
+        if not isCancelled(job):
+            with timer.phase("solve"), trackSolve():
+                status = solveModel(runModel, onIncumbent, shouldStop)
+    finally:
+        del runModel["solveRunner"]
+    if isCancelled(job):
+        return {}, 409
+    solved = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    if solved:
+        print(runSolver.Objective().Value() * getPowerBase(runModel))
 
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage)           
-    
-    if mode == "complex":
-        while time <TimeMax :
-            plantsInNodes = createNodeVariablesBinary(solver, nodes, _globalDemand, time)
-            phaseVariable = createPhaseVariables(solver, nodes)
-            edgeFlowVariables = createEdgeFlowVariables(solver,nodes,edges, edgeSolutionPeriods)
-            createComplexConstraints(solver,nodes, edges, edgeFlowVariables, phaseVariable, plantsInNodes, periodOfTime, time, _globalDemand, shortage, overflow, enforceStrict)
-            time +=1
+    t = 0
+    if solved:
+        # values of variables are not defined without solution, nothing is exported
+        with timer.phase("export"):
+            response = exportSolution(t, runModel, runNodes, globalDemand)
+    timer.timings["total"] = timer.total()
+    publishModel(run, runModel, solved)
+
+    stats = recordRun({
+        "mode": runModel["mode"],
+        "periods": len(runModel["periodOfTime"]),
+        "rebuilt": rebuilt,
+        "timings": timer.timings,
+        "buildTimings": runModel["timings"] if rebuilt else {},
+        "model": runModel["size"],
+        "solver": solverStatistics(runSolver, status, timer.timings["solve"], runModel["size"]["binaries"], getPowerBase(runModel), worker.counters),
+    })
+    if rebuilt and problems:
+        # warnings of checkFeasibility(), ie. blocks which can never be started
+        stats["problems"] = problems
+    if "scheduler" in run:
+        stats["scheduler"] = dict(run["scheduler"])
+    if "twoStageStats" in runModel:
+        stats["twoStage"] = dict(runModel["twoStageStats"])
+    if "commitmentCacheStats" in runModel:
+        stats["commitmentCache"] = dict(runModel["commitmentCacheStats"])
+    if "anytimeStats" in runModel:
+        stats["anytime"] = dict(runModel["anytimeStats"])
+    observeRun(stats)
+    if not solved:
+        return {"error": "solver found no solution ( %s)" % stats["solver"]["status"], "stats": stats}, 422
+    response["stats"] = stats
+    if config.get("prices"):
+        try:
+            response["prices"] = computePrices(runModel)
+        except ValueError as error:
+            response["prices"] = {"error": str(error)}
+    return response, 200
+
+
+def getPreview(config, runNodes, runEdges, globalDemand, version):
+    """
+    Computes merit order preview of given nodes and edges and returns its first cycle in the format of
+    /api/get-results, with stats of the preview. The preview is kept for /api/next and /api/prev like model
+    of solved run, only if nothing was posted since version of the state
+    """
+    global preview
+    timer = PhaseTimer()
+    with timer.phase("preview"):
+        runPreview = meritPreview(runNodes, runEdges, config, globalDemand)
+    with timer.phase("export"):
+        response = exportMeritJSON(runPreview, runNodes, 0, globalDemand)
+    timer.timings["total"] = timer.total()
+    response["stats"] = {
+        "mode": "merit",
+        "periods": len(runPreview["demandMatrix"]),
+        "timings": timer.timings,
+        "overloads": int(runPreview["overloaded"].sum()),
+        "shortage": runPreview["dispatch"]["shortage"].tolist(),
+    }
+    with stateLock:
+        if version == stateVersion:
+            preview = runPreview
+    return response
 
 
-        if enforceStrict:
-            sumOfGeneration = createMinimizeFunction(solver,periodOfTime)
-        else:
-            sumOfGeneration = createMinimizeFunctionDemand(solver, periodOfTime, shortage)   
+@app.route('/api/preview', methods=['GET'])
+@cross_origin(origin='*')
+def api_preview():
+    """
+    Merit order dispatch with DC power flow of posted nodes and edges, without solver. Returns in the format of
+    /api/get-results regardless of configured mode, so it can be shown while the full optimization runs
+    """
+    try:
+        # nodes and edges are read under the lock, edits change them in place
+        with stateLock:
+            return jsonify(getPreview(toolConfig, nodes, edges, _globalDemand, stateVersion))
+    except (KeyError, ValueError) as error:
+        return jsonify({"error": str(error)}), 400
+
+
+@app.route('/api/jobs', methods=['POST'])
+@cross_origin(origin='*')
+def api_createJob():
+    """
+    Starts /api/get-results for posted nodes, edges and toolConfig in background and returns status of the job.
+    With toolConfig anytime ( binary and complex mode) every improving incumbent - objective, gap and dispatch
+    of the first cycle - is published in job status as soon as it is found. Reading job status is its heartbeat,
+    job whose status is not read for toolConfig heartbeatTimeout seconds ( HEARTBEAT_TIMEOUT by default) is cancelled.
+    Jobs wait for a worker in the scheduler like /api/get-results
+    """
+    job = createJob(runOptimization, "job", toolConfig.get("heartbeatTimeout", HEARTBEAT_TIMEOUT), submitRun())
+    return jsonify(jobStatus(job)), 202
+
+
+@app.route('/api/jobs/<id>', methods=['GET'])
+@cross_origin(origin='*')
+def api_jobStatus(id):
+    """
+    Returns status of the job. Query parameter since returns only incumbents numbered from since on,
+    so that polling client gets every incumbent once. Finished job has response of /api/get-results
+    """
+    job = getJob(id)
+    if job is None:
+        return jsonify({"error": "no job %s" % id}), 404
+    try:
+        since = int(request.args.get("since", 0))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    return jsonify(jobStatus(job, since))
+
+
+@app.route('/api/jobs/<id>/accept', methods=['POST'])
+@cross_origin(origin='*')
+def api_acceptIncumbent(id):
+    """
+    Accepts the best incumbent of running job - running solve is stopped and the job finishes with
+    dispatch of the best incumbent found so far
+    """
+    job = getJob(id)
+    if job is None:
+        return jsonify({"error": "no job %s" % id}), 404
+    if not requestStop(job):
+        return jsonify({"error": "job %s is not running" % id}), 409
+    return jsonify(jobStatus(job)), 202
+
+
+@app.route('/api/jobs/<id>/cancel', methods=['POST'])
+@cross_origin(origin='*')
+def api_cancelJob(id):
+    """
+    Cancels the job - running solve is stopped, its model is dropped and the next waiting job starts
+    """
+    job = getJob(id)
+    if job is None:
+        return jsonify({"error": "no job %s" % id}), 404
+    if not cancelJob(job):
+        return jsonify({"error": "job %s is not running" % id}), 409
+    return jsonify(jobStatus(job)), 202
+
+
+@app.route('/api/cancel', methods=['POST'])
+@cross_origin(origin='*')
+def api_cancel():
+    """
+    Cancels running requests ( /api/get-results, /api/demand-sweep, /api/contingencies) of the calling user, identified
+    as in submitRun(), returns ids of cancelled jobs. Requests of other users are not cancelled
+    """
+    user = requestUser()
+    cancelled = [job["id"] for job in runningJobs("request") if job["run"]["user"] == user and cancelJob(job)]
+    return jsonify({"cancelled": cancelled})
 
-    
-    solver.Minimize(sum(sumOfGeneration))
-    status = solver.Solve()
-    print(solver.Objective().Value())
 
+@app.route('/api/scheduler', methods=['GET', 'POST'])
+@cross_origin(origin='*')
+def api_scheduler():
+    """
+    Returns limits of the scheduler with running runs and waiting runs in the order they start.
+    POST body may change limits - {"workers": ..., "modeLimits": {"complex": ...}, "shortReserve": ...}
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        try:
+            scheduler.configure(body.get("workers"), body.get("modeLimits"), body.get("shortReserve"))
+        except (AttributeError, ValueError) as error:
+            return jsonify({"error": str(error)}), 400
+    return jsonify(scheduler.status())
+
+
+@app.route('/api/export-model', methods=['GET'])
+@cross_origin(origin='*')
+def api_exportModel():
+    """
+    Returns model built by last /api/get-results as file, query parameter format is mps ( default), lp or proto
+    """
+    format = request.args.get("format", "mps")
+    if model is None:
+        return jsonify({"error": "no model built, call /api/get-results first"}), 404
+    try:
+        content = exportModelContent(model["solver"], format)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    extension = [extension for extension, name in EXPORT_FORMATS.items() if name == format][0]
+    response = flask.Response(content, mimetype="application/octet-stream" if format == "proto" else "text/plain")
+    response.headers["Content-Disposition"] = "attachment; filename=model%s" % extension
+    return response
 
-    t = 0
-    edgeResponse = exportEdgeJSON(edgeSolutionPeriods[t])
-    nodeResponse = exportNodesJSON(nodes, t, _globalDemand)
-    plantResponse = exportPlantsJSON(periodOfTime[t], nodes, toolConfig["mode"])
-    
-    response = {
-        "nodes": nodeResponse,
-        "edges": edgeResponse,
-        "plants": plantResponse
-    }
-    return jsonify(response)
+
+@app.route('/api/dry-run', methods=['GET', 'POST'])
+@cross_origin(origin='*')
+def api_dryRun():
+    """
+    Returns size of the model /api/get-results would build for posted nodes and edges ( continuous variables,
+    binaries, constraints), solve time estimated from recent runs and problems found by checkFeasibility(), without
+    building the model.
+    POST body may contain toolConfig to size instead of the posted one
+    """
+    config = toolConfig
+    if request.method == 'POST' and request.get_json(silent=True):
+        config = request.get_json()
+    try:
+        size = estimateModelSize(nodes, edges, config)
+        if config.get("demandStore"):
+            checkedDemand = createDemandMatrixFromStore(resolveScenario(config["demandStore"]), nodes, _globalDemand, config.get("startPeriod", 0), config["timeMax"])
+        else:
+            checkedDemand = createDemandMatrix(nodes, _globalDemand, config["timeMax"])
+        problems = checkFeasibility(createNetwork(nodes, edges), checkedDemand, config)
+    except (KeyError, OSError, ValueError) as error:
+        return jsonify({"error": str(error)}), 400
+    return jsonify({
+        "mode": config["mode"],
+        "periods": config["timeMax"],
+        "model": size,
+        "estimate": estimateSolveTime(config["mode"], size),
+        "problems": problems,
+    })
+
+
+@app.route('/api/prices', methods=['GET'])
+@cross_origin(origin='*')
+def api_prices():
+    """
+    Returns locational marginal prices of nodes and reduced costs of line limits in every cycle of the dispatch
+    returned by last /api/get-results, computed from duals instead of re-solving with changed demand
+    """
+    solved = solvedModel()
+    if solved is None:
+        return jsonify({"error": "no solution, call /api/get-results first"}), 409
+    try:
+        return jsonify(computePrices(solved["model"]))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 409
+
+
+@app.route('/api/demand-sweep', methods=['POST'])
+@cross_origin(origin='*')
+def api_demandSweep():
+    """
+    Solves simple mode model of posted nodes and edges for a range of system demand levels
+    and returns the cost curve with breakpoints where marginal blocks change.
+    Body: {"from": 0.5, "to": 1.5, "points": 100} or {"levels": [...]}, optional toolConfig ( posted one by default).
+    Levels are solved in a worker from the scheduler like /api/get-results and are cancelled when the client disconnects
+    """
+    body = request.get_json()
+    try:
+        levels = body["levels"] if "levels" in body else sweepLevels(body["from"], body["to"], body.get("points", 50))
+    except (KeyError, ValueError) as error:
+        return jsonify({"error": str(error)}), 400
+    run = submitRun()
+    run["config"] = dict(body.get("toolConfig", run["config"]), mode="simple")
+    run["levels"] = levels
+    return respondWhenDone(createRequestJob(runDemandSweep, run))
+
+
+def runDemandSweep(job):
+    """
+    Work of /api/demand-sweep jobs - waits for a worker from the scheduler like runOptimization() and solves
+    all demand levels of the run in it on one solver
+    """
+    run = job["run"]
+    config = run["config"]
+    try:
+        size = estimateModelSize(run["nodes"], run["edges"], config)
+        cost = estimateCost("simple", size, estimateSolveTime("simple", size)) * len(run["levels"])
+    except (KeyError, ValueError):
+        # demandSweep() reports the error
+        cost = 0.0
+    with scheduler.slot(job["id"], "simple", cost, run["user"], run["priority"], lambda: isCancelled(job)) as worker:
+        if isCancelled(job):
+            return {}, 409
+        try:
+            with trackSolve():
+                result = demandSweep(run["nodes"], run["edges"], config, run["levels"],
+                                     seriesRunner=seriesRunner(worker, lambda: job["stopRequested"]))
+        except (KeyError, ValueError) as error:
+            return {"error": str(error)}, 400
+    if isCancelled(job):
+        return {}, 409
+    return result, 200
+
+
+@app.route('/api/contingencies', methods=['GET'])
+@cross_origin(origin='*')
+def api_contingencies():
+    """
+    N-1 analysis of dispatch returned by last /api/get-results. Every single line outage is screened in every cycle
+    with line outage distribution factors, outages which overload some line are optimized again without the line.
+    Query parameter reoptimize=false returns only the screening. Outages are optimized again in a worker from the
+    scheduler like /api/get-results and are cancelled when the client disconnects
+    """
+    global contingencyFactors
+    reoptimize = request.args.get("reoptimize", "true").lower() not in ("false", "0", "no")
+    with stateLock:
+        solved = solvedModel()
+        if solved is None:
+            return jsonify({"error": "no solution, call /api/get-results first"}), 409
+        # copy of nodes and edges the model was built from, for models optimized again later in the worker
+        run = submitRun() if reoptimize else None
+    network = createNetwork(solved["nodes"], solved["edges"])
+    factors = solved["contingencyFactors"]
+    if factors is None:
+        # factors depend only on the network, they are reused until lines change
+        factors = createContingencyFactors(network)
+        with stateLock:
+            if solved["version"] == stateVersion:
+                contingencyFactors = factors
+    runModel = solved["model"]
+    # solution is read at once, the model may be solved again by other run while outages wait for a worker
+    analysis, outages = screenModel(runModel, network, factors)
+    if not reoptimize or not outages:
+        return jsonify(analysis)
+    run.update({
+        "config": dict(runModel["config"]),
+        "globalDemand": list(solved["globalDemand"]),
+        "demandMatrix": runModel["demandMatrix"].copy(),
+        "baseObjective": runModel["solver"].Objective().Value() * getPowerBase(runModel),
+        "size": runModel["size"],
+        "network": network,
+        "analysis": analysis,
+        "outages": outages,
+    })
+    return respondWhenDone(createRequestJob(runContingencies, run))
+
+
+def runContingencies(job):
+    """
+    Work of /api/contingencies jobs - waits for a worker from the scheduler like runOptimization() and optimizes
+    outages which overload some line again in it
+    """
+    run = job["run"]
+    mode = run["config"]["mode"]
+    cost = estimateCost(mode, run["size"], estimateSolveTime(mode, run["size"])) * len(run["outages"])
+    with scheduler.slot(job["id"], mode, cost, run["user"], run["priority"], lambda: isCancelled(job)) as worker:
+        if isCancelled(job):
+            return {}, 409
+        with trackSolve():
+            reoptimized = reoptimizeOutages(run["outages"], run["network"], run["nodes"], run["edges"], run["config"],
+                                            run["globalDemand"], run["demandMatrix"], run["baseObjective"],
+                                            workerRunner(worker, lambda: job["stopRequested"]))
+    if isCancelled(job):
+        return {}, 409
+    return dict(run["analysis"], reoptimized=reoptimized), 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """
+    Metrics for Prometheus - solve counts, phase latencies, model sizes, cache hits, solves in flight and memory
+    """
+    return flask.Response(renderMetrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/api/stats', methods=['GET'])
+@cross_origin(origin='*')
+def api_stats():
+    """
+    Returns stats ( timings, model size, solver statistics) of recent /api/get-results runs, newest last.
+    Optional query parameter limit returns only given number of newest runs
+    """
+    limit = request.args.get("limit", type=int)
+    return jsonify({"history": getHistory(limit)})
+
+
+def solvedModel():
+    """
+    Returns solved model of the last run with nodes, edges and contingency factors it belongs to, read at once,
+    so that run taking the model meanwhile does not change them. None if the last run found no solution
+    """
+    with stateLock:
+        if model is None or not modelSolved:
+            return None
+        return {
+            "model": model,
+            "nodes": nodes,
+            "edges": edges,
+            "globalDemand": _globalDemand,
+            "contingencyFactors": contingencyFactors,
+            "version": stateVersion,
+        }
+
+
+def getNetworkIndex():
+    """
+    Returns keyed indexes of current nodes and edges, creating them after nodes or edges were posted
+    """
+    global networkIndex
+    if networkIndex is None:
+        networkIndex = createNetworkIndex(nodes, edges)
+    return networkIndex
+
+def invalidateModel(network = False):
+    """
+    Drops cached model, next /api/get-results builds it again. Used when network structure changes.
+    If network is True, nodes or edges were replaced and keyed indexes are dropped too
+    """
+    global model
+    global networkIndex
+    global contingencyFactors
+    with stateLock:
+        changeState()
+        model = None
+        contingencyFactors = None
+        if network:
+            networkIndex = None
+
+
+def changeState():
+    """
+    Marks nodes or edges as changed, models of runs submitted before are not cached
+    """
+    global stateVersion
+    with stateLock:
+        stateVersion += 1
+
+
+def missingFields(body, fields):
+    """
+    Returns error response if request body is not JSON object or misses some of the fields, None otherwise
+    """
+    if not isinstance(body, dict):
+        return jsonify({"error": "JSON object expected"}), 400
+    missing = [field for field in fields if field not in body]
+    if missing:
+        return jsonify({"error": "missing %s" % ", ".join(missing)}), 400
+    return None
+
+
+@app.route('/api/plants', methods=['PUT', 'DELETE'])
+@cross_origin(origin='*')
+def api_editPlant():
+    """
+    PUT adds or updates single block ( same format as element of /api/post-plants),
+    DELETE removes block given by sourceNode and blockName.
+    Changed parameters of existing block are applied directly to cached model
+    """
+    body = request.get_json(silent=True)
+    error = missingFields(body, ["sourceNode", "blockName"])
+    if error is not None:
+        return error
+    # nodes are changed under the lock, so that submitRun() copies them before or after the change
+    with stateLock:
+        index = getNetworkIndex()
+        if body["sourceNode"] not in index["nodes"]:
+            return jsonify({"error": "unknown node %s" % body["sourceNode"]}), 404
+        if request.method == 'DELETE':
+            if not deletePlant(index, body["sourceNode"], body["blockName"]):
+                return jsonify({"error": "unknown block %s in node %s" % (body["blockName"], body["sourceNode"])}), 404
+            invalidateModel()
+            return jsonify({"status": "ok", "model": "rebuild"})
+        try:
+            node, position, created = upsertPlant(index, body)
+        except KeyError as error:
+            return jsonify({"error": "missing %s" % error.args[0]}), 400
+        except (TypeError, ValueError) as error:
+            return jsonify({"error": str(error)}), 400
+        if created or model is None:
+            invalidateModel()
+            return jsonify({"status": "ok", "model": "rebuild"})
+        changeState()
+        updatePlantInModel(model, node, position, node["plants"][position])
+    return jsonify({"status": "ok", "model": "updated"})
+
+@app.route('/api/edges', methods=['PUT', 'DELETE'])
+@cross_origin(origin='*')
+def api_editEdge():
+    """
+    PUT adds or updates single edge ( same format as element of /api/post-edges),
+    DELETE removes edge between nodeA and nodeB.
+    Changed parameters of existing edge are applied directly to cached model
+    """
+    global contingencyFactors
+    body = request.get_json(silent=True)
+    error = missingFields(body, ["nodeA", "nodeB"])
+    if error is not None:
+        return error
+    # edges are changed under the lock, so that submitRun() copies them before or after the change
+    with stateLock:
+        index = getNetworkIndex()
+        for name in (body["nodeA"], body["nodeB"]):
+            if name not in index["nodes"]:
+                return jsonify({"error": "unknown node %s" % name}), 404
+        if request.method == 'DELETE':
+            if not deleteEdge(index, body["nodeA"], body["nodeB"]):
+                return jsonify({"error": "no edge between %s and %s" % (body["nodeA"], body["nodeB"])}), 404
+            invalidateModel()
+            return jsonify({"status": "ok", "model": "rebuild"})
+        try:
+            edge, created = upsertEdge(index, body)
+        except KeyError as error:
+            return jsonify({"error": "missing %s" % error.args[0]}), 400
+        except (TypeError, ValueError) as error:
+            return jsonify({"error": str(error)}), 400
+        if created or model is None:
+            invalidateModel()
+            return jsonify({"status": "ok", "model": "rebuild"})
+        changeState()
+        updateEdgeInModel(model, index["nodes"][edge["nodeA"]]["index"], index["nodes"][edge["nodeB"]]["index"], edge)
+        contingencyFactors = None
+    return jsonify({"status": "ok", "model": "updated"})
+
+@app.route('/api/node-demand', methods=['PUT'])
+@cross_origin(origin='*')
+def api_editDemand():
+    """
+    Changes demand of single node, body: {"nodeName": ..., "demand": [...]}
+    Demand is applied directly to cached model
+    """
+    body = request.get_json(silent=True)
+    error = missingFields(body, ["nodeName", "demand"])
+    if error is not None:
+        return error
+    with stateLock:
+        node = getNetworkIndex()["nodes"].get(body["nodeName"])
+        if node is None:
+            return jsonify({"error": "unknown node %s" % body["nodeName"]}), 404
+        # demand is checked before the node is changed, against periods of cached model if there is one
+        changed = {"nodeName": node["nodeName"], "demand": body["demand"], "index": 0}
+        try:
+            if model is not None:
+                createDemandMatrix([changed], _globalDemand, model["demandMatrix"].shape[0])
+            else:
+                createDemandMatrix([changed], [1])
+        except (TypeError, ValueError) as error:
+            return jsonify({"error": str(error)}), 400
+        node["demand"] = body["demand"]
+        changeState()
+        if model is None:
+            return jsonify({"status": "ok", "model": "rebuild"})
+        updateDemandInModel(model, node, _globalDemand)
+    return jsonify({"status": "ok", "model": "updated"})
 
 
 @app.route('/api/next', methods=['GET'])
@@ -188,19 +953,25 @@ def api_next():
     global toolConfig
     global periodOfTime
     global edgeSolutionPeriods
+    global demandMatrix
     global index
     mode = toolConfig["mode"]  
+    periods = len(preview["demandMatrix"]) if mode == "merit" and preview is not None else len(periodOfTime)
 
-    if len(periodOfTime) - 1 > index :
+    if periods - 1 > index :
          index = index + 1
     else: 
-        index = len(periodOfTime) - 1 
+        index = periods - 1 
     
     t = index
+    if mode == "merit" and preview is not None:
+        return exportMeritJSON(preview, nodes, t, _globalDemand)
+    if model is None or not modelSolved:
+        return jsonify({"error": "no solution, call /api/get-results first"}), 409
         
-    edgeResponse = exportEdgeJSON(edgeSolutionPeriods[t])
-    nodeResponse = exportNodesJSON(nodes, t, _globalDemand)
-    plantResponse = exportPlantsJSON(periodOfTime[t], nodes, toolConfig["mode"])
+    edgeResponse = exportEdgeJSON(edgeSolutionPeriods[t], getPowerBase(model))
+    nodeResponse = exportNodesJSON(nodes, t, _globalDemand, demandMatrix)
+    plantResponse = exportPlantsJSON(periodOfTime[t], nodes, toolConfig["mode"], getPowerBase(model))
     response = {
         "nodes": nodeResponse,
         "edges": edgeResponse,
@@ -218,6 +989,7 @@ def api_prev():
     global toolConfig
     global periodOfTime
     global edgeSolutionPeriods
+    global demandMatrix
     global index
     mode = toolConfig["mode"]  
 
@@ -227,10 +999,14 @@ def api_prev():
         index = 0
     
     t = index
+    if mode == "merit" and preview is not None:
+        return exportMeritJSON(preview, nodes, t, _globalDemand)
+    if model is None or not modelSolved:
+        return jsonify({"error": "no solution, call /api/get-results first"}), 409
         
-    edgeResponse = exportEdgeJSON(edgeSolutionPeriods[t])
-    nodeResponse = exportNodesJSON(nodes, t, _globalDemand)
-    plantResponse = exportPlantsJSON(periodOfTime[t], nodes, toolConfig["mode"])
+    edgeResponse = exportEdgeJSON(edgeSolutionPeriods[t], getPowerBase(model))
+    nodeResponse = exportNodesJSON(nodes, t, _globalDemand, demandMatrix)
+    plantResponse = exportPlantsJSON(periodOfTime[t], nodes, toolConfig["mode"], getPowerBase(model))
     response = {
         "nodes": nodeResponse,
         "edges": edgeResponse,
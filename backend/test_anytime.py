@@ -0,0 +1,69 @@
+"""
+Anytime solve is compared with solve without anytime on synthetic grids in complex mode. It has to end with the same
+objective ( both end at default gap of the solver), must not take longer than the plain solve and incumbents
+published by its stages have to improve.
+
+Run with:               pytest test_anytime.py
+Slower machine:         PERF_TIME_FACTOR=3 pytest test_anytime.py
+"""
+import os
+import time
+import pytest
+from ortools.linear_solver import pywraplp
+
+from Benchmark import generateGrid
+from GridRecords import networkFromScenario
+from ModelFunctions import ANYTIME_STAGES, buildModel, getPowerBase, solveModel
+
+
+DEFAULT_GAP = pywraplp.MPSolverParameters.kDefaultRelativeMipGap
+TIME_FACTOR = float(os.environ.get("PERF_TIME_FACTOR", 1.5))
+# times below a second are mostly noise, they are allowed to grow by this many seconds
+TIME_SLACK = 0.1
+
+
+def solve(grid, anytime = None, onIncumbent = None):
+    """
+    Builds and solves model of the grid, anytime is config anytimeStages ( None for solve without anytime)
+
+    ----RETURNS----
+    model, objective and solve time
+    """
+    network = networkFromScenario(grid)
+    nodes = network.nodeDicts(grid["demand"])
+    edges = network.edgeDicts()
+    toolConfig = {"mode": "complex", "enforceStrict": True, "timeMax": grid["demand"].shape[0]}
+    if anytime is not None:
+        toolConfig.update({"anytime": True, "anytimeStages": anytime})
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    model = buildModel(solver, nodes, edges, toolConfig, [1])
+    started = time.perf_counter()
+    assert solveModel(model, onIncumbent) == pywraplp.Solver.OPTIMAL
+    return model, solver.Objective().Value() * getPowerBase(model), time.perf_counter() - started
+
+
+def test_anytimeNotSlowerThanPlain():
+    grid = generateGrid(60, periods=6)
+    plain = [solve(grid) for _ in range(3)]
+    anytime = [solve(grid, ANYTIME_STAGES) for _ in range(3)]
+    assert min(result[2] for result in anytime) <= min(result[2] for result in plain) * TIME_FACTOR + TIME_SLACK
+    # model solved within the first stage is solved only once
+    assert anytime[0][0]["anytimeStats"]["stages"] == 1
+    assert anytime[0][1] == pytest.approx(plain[0][1], rel=DEFAULT_GAP)
+
+
+def test_incumbentsImprove():
+    grid = generateGrid(100, periods=4)
+    incumbents = []
+    model, objective, _ = solve(grid, ((0.5, None), (1, None), (None, None)), incumbents.append)
+    plainObjective = solve(grid)[1]
+
+    assert incumbents == model["anytimeStats"]["incumbents"]
+    assert len(incumbents) >= 2
+    for previous, incumbent in zip(incumbents, incumbents[1:]):
+        assert incumbent["stage"] > previous["stage"]
+        assert incumbent["objective"] <= previous["objective"]
+        assert incumbent["gap"] < previous["gap"]
+    assert incumbents[-1]["objective"] == pytest.approx(objective)
+    assert incumbents[-1]["gap"] <= DEFAULT_GAP
+    assert objective == pytest.approx(plainObjective, rel=DEFAULT_GAP)
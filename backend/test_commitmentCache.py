@@ -0,0 +1,79 @@
+"""
+Commitment pattern stored for the model must not be reused after parameters of the model were edited in place
+( updatePlantInModel(), updateEdgeInModel()) - edited model is solved again and has to end with the objective
+of model built from scratch.
+
+Run with:               pytest test_commitmentCache.py
+"""
+import functools
+import os
+import pytest
+from ortools.linear_solver import pywraplp
+
+import CommitmentCache
+import ModelFunctions
+from GridRecords import networkFromScenario
+from ModelFunctions import buildModel, createNetworkIndex, getPowerBase, solveModel, updateEdgeInModel, updatePlantInModel, upsertEdge, upsertPlant
+from ScenarioLoader import loadScenario
+
+
+SCENARIO_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scenario#2")
+CONFIG = {"mode": "binary", "enforceStrict": True, "timeMax": 5, "commitmentCache": True}
+
+
+@pytest.fixture(autouse=True)
+def cacheDirectory(tmp_path, monkeypatch):
+    monkeypatch.setattr(CommitmentCache, "_patterns", {})
+    monkeypatch.setattr(ModelFunctions, "findPattern", functools.partial(CommitmentCache.findPattern, cacheDirectory=str(tmp_path)))
+    monkeypatch.setattr(ModelFunctions, "storePattern", functools.partial(CommitmentCache.storePattern, cacheDirectory=str(tmp_path)))
+
+
+def scenarioGrid():
+    scenario = loadScenario(SCENARIO_DIRECTORY)
+    network = networkFromScenario(scenario)
+    return network.nodeDicts(scenario["demand"]), network.edgeDicts()
+
+
+def solve(nodes, edges, model = None):
+    """
+    Solves given model or model built from scratch, returns the model and its objective
+    """
+    if model is None:
+        model = buildModel(pywraplp.Solver.CreateSolver('SCIP'), nodes, edges, dict(CONFIG), [1])
+    assert solveModel(model) == pywraplp.Solver.OPTIMAL
+    return model, model["solver"].Objective().Value() * getPowerBase(model)
+
+
+def test_editedPlantIsNotHit():
+    nodes, edges = scenarioGrid()
+    model, objective = solve(nodes, edges)
+    assert solve(nodes, edges)[0]["commitmentCacheStats"]["result"] == "hit"
+
+    expensive = max((plant for node in nodes for plant in node["plants"]), key=lambda plant: plant["cost"])
+    sourceNode = next(node["nodeName"] for node in nodes if expensive in node["plants"])
+    node, position, added = upsertPlant(createNetworkIndex(nodes, edges), {"sourceNode": sourceNode, "blockName": expensive["blockName"], "cost": 0.01})
+    assert not added
+    updatePlantInModel(model, node, position, node["plants"][position])
+
+    model, editedObjective = solve(nodes, edges, model)
+    assert model["commitmentCacheStats"]["result"] != "hit"
+    assert editedObjective < objective
+    fresh, freshObjective = solve(nodes, edges)
+    assert fresh["commitmentCacheStats"]["result"] == "hit"
+    assert editedObjective == pytest.approx(freshObjective)
+
+
+def test_editedEdgeIsNotHit():
+    nodes, edges = scenarioGrid()
+    model, objective = solve(nodes, edges)
+
+    # halved capacity of n12-n13 changes the commitment
+    edge, _ = upsertEdge(createNetworkIndex(nodes, edges), {"nodeA": "n12", "nodeB": "n13", "capacity": 30})
+    updateEdgeInModel(model, model["network"].nodeIndex[edge["nodeA"]], model["network"].nodeIndex[edge["nodeB"]], edge)
+
+    model, editedObjective = solve(nodes, edges, model)
+    assert model["commitmentCacheStats"]["result"] != "hit"
+    assert editedObjective > objective
+    fresh, freshObjective = solve(nodes, edges)
+    assert fresh["commitmentCacheStats"]["result"] == "hit"
+    assert editedObjective == pytest.approx(freshObjective)
@@ -0,0 +1,71 @@
+"""
+Contingency factors are checked against DC power flow of the network with the outaged line actually removed.
+Every line of Scenario#2 ( with radial lines) and of meshed synthetic grid with added radial line is switched off.
+
+Run with:               pytest test_contingency.py
+"""
+import os
+import numpy as np
+import pytest
+
+from Benchmark import generateGrid
+from Contingency import createContingencyFactors, postOutageFlows
+from GridRecords import createNetwork, networkFromScenario
+from ModelFunctions import createEdge, createNode
+from PowerFlow import dcPowerFlow, findIslands
+from ScenarioLoader import loadScenario
+
+
+SCENARIO_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scenario#2")
+TOLERANCE = 1e-8
+
+
+def scenarioGrid():
+    scenario = loadScenario(SCENARIO_DIRECTORY)
+    network = networkFromScenario(scenario)
+    return network.nodeDicts(scenario["demand"]), network.edgeDicts()
+
+
+def meshedGrid():
+    network = networkFromScenario(generateGrid(40, meshing=2.5, seed=3))
+    nodes = network.nodeDicts()
+    edges = network.edgeDicts()
+    # radial line to node without any other line, its outage splits the grid
+    nodes.append(createNode("LEAF", [0], len(nodes)))
+    edges.append(createEdge("LEAF", nodes[0]["nodeName"], 100, 0.05, 220, 220))
+    return nodes, edges
+
+
+@pytest.mark.parametrize("grid", [scenarioGrid, meshedGrid], ids=["Scenario#2", "meshed"])
+def test_postOutageFlowsMatchRemovedLine(grid):
+    nodes, edges = grid()
+    network = createNetwork(nodes, edges)
+    factors = createContingencyFactors(network)
+    lineCount = len(network.lines)
+    islandCount = findIslands(network).max() + 1
+    generator = np.random.default_rng(0)
+    radial = 0
+
+    for outage in range(lineCount):
+        reducedEdges = edges[:outage] + edges[outage + 1:]
+        reduced = createNetwork(nodes, reducedEdges)
+        reducedIslands = findIslands(reduced)
+        splits = reducedIslands.max() + 1 > islandCount
+        assert bool(factors["islanding"][outage]) == splits
+
+        injections = generator.normal(0, 10, len(nodes))
+        if splits:
+            # every part balanced on its own, flow of the radial line is zero before and after the outage
+            radial += 1
+            injections -= (np.bincount(reducedIslands, injections) / np.bincount(reducedIslands))[reducedIslands]
+        flows = dcPowerFlow(network, injections)
+        post = postOutageFlows(factors, flows)[:, outage]
+        expected = dcPowerFlow(reduced, injections)
+
+        remaining = np.arange(lineCount) != outage
+        np.testing.assert_allclose(post[remaining], expected, atol=TOLERANCE * max(1, np.abs(expected).max()))
+        if splits:
+            assert abs(flows[outage]) < TOLERANCE * max(1, np.abs(flows).max())
+        assert post[outage] == pytest.approx(0, abs=TOLERANCE)
+    # both grids have radial lines
+    assert radial > 0
@@ -0,0 +1,153 @@
+"""
+Performance regression tests. Scenario#1-3 are solved in every mode and compared with performanceBaseline.json:
+model size and solver status must match exactly, objective within OBJECTIVE_TOLERANCE and build / solve time
+must not be longer than reference time * machine speed * PERF_TIME_FACTOR + TIME_SLACK. Machine speed is the
+ratio of the calibration case measured now and when the baseline was written, so the reference times do not
+depend on the machine the baseline comes from. Scaling test checks that build time grows linearly with the size
+of the grid, so O(N^2) loops fail regardless of machine speed.
+
+Run with:               pytest test_performance.py
+Slower machine:         PERF_TIME_FACTOR=6 pytest test_performance.py
+Noisy machine:          PERF_SCALING_LIMIT=8 pytest test_performance.py
+Update the baseline:    python test_performance.py --update
+"""
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import pytest
+from ortools.linear_solver import pywraplp
+
+from Benchmark import BUNDLED_SCENARIOS, generateGrid, runCase
+from GridRecords import networkFromScenario
+from ModelFunctions import buildModel
+from ScenarioLoader import loadScenario
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "performanceBaseline.json")
+MODES = ["simple", "binary", "complex"]
+OBJECTIVE_TOLERANCE = 1e-4
+TIME_FACTOR = float(os.environ.get("PERF_TIME_FACTOR", 3))
+# times of small models are mostly noise, they are allowed to grow by this many seconds
+TIME_SLACK = 0.05
+# median ratio of build times of 4 times larger and smaller grid ( linear growth gives 4-5, quadratic 16)
+SCALING_LIMIT = float(os.environ.get("PERF_SCALING_LIMIT", 6))
+SCALING_GRIDS = [400, 1600]
+SCALING_REPEATS = 7
+# generated grid timed both when the baseline is written and by the tests to measure speed of the machine
+CALIBRATION_GRID = {"nodeCount": 200, "periods": 4}
+
+
+def runScenario(scenario, mode):
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), scenario["directory"])
+    return runCase(scenario["name"], lambda: loadScenario(directory), mode, None, scenario["globalDemand"], 60)
+
+
+def bestOf(scenario, mode, repeats = 3):
+    """
+    Runs case several times and keeps the shortest build and solve time
+    """
+    results = [runScenario(scenario, mode) for _ in range(repeats)]
+    best = dict(results[0])
+    best["buildTime"] = min(result["buildTime"] for result in results)
+    best["solveTime"] = min(result["solveTime"] for result in results)
+    return best
+
+
+def measureCalibration(repeats = 5):
+    """
+    Returns the shortest build and solve time of the calibration grid
+    """
+    grid = generateGrid(CALIBRATION_GRID["nodeCount"], periods=CALIBRATION_GRID["periods"])
+    results = [runCase("calibration", lambda: grid, "simple", None, 1.0, 60) for _ in range(repeats)]
+    return {key: min(result[key] for result in results) for key in ["buildTime", "solveTime"]}
+
+
+def measureBuild(grid, mode):
+    """
+    Returns time of building the model of the grid, without solving it. Garbage collector is disabled while
+    building, its full collections walk all objects alive and would add noise growing with size of the model
+    """
+    network = networkFromScenario(grid)
+    nodes = network.nodeDicts(grid["demand"])
+    edges = network.edgeDicts()
+    toolConfig = {"mode": mode, "enforceStrict": True, "timeMax": grid["demand"].shape[0]}
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        buildModel(solver, nodes, edges, toolConfig, [1])
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def loadBaseline():
+    with open(BASELINE_FILE, 'r') as file:
+        return json.load(file)
+
+
+def updateBaseline():
+    baseline = {"calibration": measureCalibration()}
+    for scenario in BUNDLED_SCENARIOS:
+        for mode in MODES:
+            result = bestOf(scenario, mode)
+            baseline["%s/%s" % (scenario["name"], mode)] = {key: result[key] for key in [
+                "periods", "variables", "constraints", "binaries", "status", "objective", "buildTime", "solveTime"]}
+    with open(BASELINE_FILE, 'w') as file:
+        json.dump(baseline, file, indent=1, sort_keys=True)
+
+
+CASES = [(scenario, mode) for scenario in BUNDLED_SCENARIOS for mode in MODES]
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return loadBaseline()
+
+
+@pytest.fixture(scope="module")
+def machineSpeed(baseline):
+    """
+    Ratio of calibration times measured now and in the baseline for buildTime and solveTime, above 1 on slower machine
+    """
+    calibration = measureCalibration()
+    return {key: calibration[key] / baseline["calibration"][key] for key in ["buildTime", "solveTime"]}
+
+
+@pytest.mark.parametrize("scenario,mode", CASES, ids=["%s-%s" % (scenario["name"], mode) for scenario, mode in CASES])
+def test_scenario(baseline, machineSpeed, scenario, mode):
+    reference = baseline["%s/%s" % (scenario["name"], mode)]
+    result = bestOf(scenario, mode)
+
+    for key in ["periods", "variables", "constraints", "binaries", "status"]:
+        assert result[key] == reference[key], key
+    if reference["objective"] is not None:
+        assert result["objective"] == pytest.approx(reference["objective"], rel=OBJECTIVE_TOLERANCE)
+
+    for key in ["buildTime", "solveTime"]:
+        limit = reference[key] * machineSpeed[key] * TIME_FACTOR + TIME_SLACK
+        assert result[key] <= limit, "%s %.3fs exceeds %.3fs ( reference %.3fs, machine speed %.2f)" % (
+            key, result[key], limit, reference[key], machineSpeed[key])
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_build_scales_linearly(mode):
+    smallGrid, largeGrid = [generateGrid(nodeCount, None, 1.0, 2, 1.5, 0) for nodeCount in SCALING_GRIDS]
+    # both grids are built one after another, so load of the machine changing in time affects both of them
+    ratios = []
+    for _ in range(SCALING_REPEATS):
+        smallTime = measureBuild(smallGrid, mode)
+        ratios.append(measureBuild(largeGrid, mode) / smallTime)
+    assert statistics.median(ratios) < SCALING_LIMIT, "build time ratios %s" % ", ".join("%.2f" % ratio for ratio in ratios)
+
+
+if __name__ == '__main__':
+    if "--update" in sys.argv:
+        updateBaseline()
+        print("baseline written to %s" % BASELINE_FILE)
+    else:
+        sys.exit(pytest.main([__file__] + sys.argv[1:]))
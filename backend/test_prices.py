@@ -0,0 +1,57 @@
+"""
+Prices are checked against finite differences - objective change of the model solved again with a little more
+demand in a node, or a little more capacity of congested line. Scenario#2 in simple mode is linear program,
+so both differences match duals exactly as long as the step does not change the set of binding constraints.
+
+Run with:               pytest test_prices.py
+"""
+import os
+import pytest
+from ortools.linear_solver import pywraplp
+
+from GridRecords import networkFromScenario
+from ModelFunctions import buildModel, createDemandMatrix, getPowerBase, solveModel
+from Prices import computePrices
+from ScenarioLoader import loadScenario
+
+
+SCENARIO_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scenario#2")
+# demand scaling at which line n1n2 is congested, shortage is allowed
+GLOBAL_DEMAND = [1.5]
+# MW added to demand or capacity
+STEP = 0.01
+TOLERANCE = 1e-3
+
+
+def solve(nodes, edges, toolConfig, demandMatrix):
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    model = buildModel(solver, nodes, edges, toolConfig, GLOBAL_DEMAND, demandMatrix.copy())
+    assert solveModel(model) == pywraplp.Solver.OPTIMAL
+    return model, solver.Objective().Value() * getPowerBase(model)
+
+
+@pytest.mark.parametrize("perUnit", [False, True], ids=["MW", "perUnit"])
+def test_pricesMatchFiniteDifferences(perUnit):
+    scenario = loadScenario(SCENARIO_DIRECTORY)
+    network = networkFromScenario(scenario)
+    nodes = network.nodeDicts(scenario["demand"])
+    edges = network.edgeDicts()
+    toolConfig = {"mode": "simple", "enforceStrict": False, "timeMax": 1, "perUnit": perUnit}
+    demandMatrix = createDemandMatrix(nodes, GLOBAL_DEMAND, 1)
+    model, objective = solve(nodes, edges, toolConfig, demandMatrix)
+    prices = computePrices(model)["periods"][0]
+
+    nodePrices = {node["nodeName"]: node["price"] for node in prices["nodes"]}
+    nodeIndex = {node["nodeName"]: position for position, node in enumerate(nodes)}
+    # cheapest and most expensive node, both prices differ because n1n2 is congested
+    for nodeName in (min(nodePrices, key=nodePrices.get), max(nodePrices, key=nodePrices.get)):
+        moreDemand = demandMatrix.copy()
+        moreDemand[0, nodeIndex[nodeName]] += STEP
+        changed = solve(nodes, edges, toolConfig, moreDemand)[1]
+        assert (changed - objective) / STEP == pytest.approx(nodePrices[nodeName], abs=TOLERANCE)
+
+    congested = [line for line in prices["lines"] if line["reducedCost"] < -TOLERANCE]
+    assert [line["line"] for line in congested] == ["n1n2"]
+    moreCapacity = [dict(edge, capacity=edge["capacity"] + STEP) if edge["name"] == "n1n2" else edge for edge in edges]
+    changed = solve(nodes, moreCapacity, toolConfig, demandMatrix)[1]
+    assert (changed - objective) / STEP == pytest.approx(congested[0]["reducedCost"], abs=TOLERANCE)